@@ -1,6 +1,11 @@
+from typing import AsyncGenerator, Generator, Optional
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
+from app.services.graph_write_queue import get_graph_write_worker
+from app.services.knowledge_graph import KnowledgeGraphService
+from app.services.knowledge_graph_async import AsyncKnowledgeGraphService
 
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI
@@ -17,3 +22,38 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_knowledge_graph_service() -> Generator[KnowledgeGraphService, None, None]:
+    # Storages borrow sessions from the shared driver pool, so building one per
+    # request is cheap and closing it leaves the pool's connections open.
+    service = KnowledgeGraphService()
+    try:
+        yield service
+    finally:
+        service.close()
+
+
+async def get_async_knowledge_graph_service() -> AsyncGenerator[
+    AsyncKnowledgeGraphService, None
+]:
+    service = AsyncKnowledgeGraphService()
+    try:
+        yield service
+    finally:
+        await service.close()
+
+
+async def get_analysis_knowledge_graph_service() -> AsyncGenerator[
+    Optional[AsyncKnowledgeGraphService], None
+]:
+    # With the write-behind queue enabled the analysis only enqueues, so no
+    # graph session is opened for the request.
+    if get_graph_write_worker() is not None:
+        yield None
+        return
+    service = AsyncKnowledgeGraphService()
+    try:
+        yield service
+    finally:
+        await service.close()
@@ -1,52 +1,111 @@
-from typing import Generator
+import logging
+from functools import lru_cache
+from typing import Dict
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-from app.services.knowledge_graph import KnowledgeGraphService
+from app.api.dependencies import get_async_knowledge_graph_service
+from app.core.config import settings
+from app.nlp.dataset import load_legal_articles
+from app.services.hybrid_search import (
+    FUSION_METHODS,
+    HybridSearchService,
+    article_texts_by_key,
+    bm25_retriever,
+    cross_encoder_stage,
+    graph_retriever,
+    parse_weights,
+    vector_retriever,
+)
+from app.services.inference_executor import InferenceExecutor, get_inference_executor
+from app.services.knowledge_graph_async import AsyncKnowledgeGraphService
+from app.services.model_registry import ModelNotAvailableError, get_model_registry
 from app.services.vector_store import VectorStoreService
 
+LOGGER = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
-# Dependency injection for KnowledgeGraphService and VectorStoreService
-def get_knowledge_graph_service() -> Generator[KnowledgeGraphService, None, None]:
-    service = KnowledgeGraphService()
+# Dependency injection for VectorStoreService
+def get_vector_store_service() -> VectorStoreService:
+    # Storage and embedder are loaded once per process by the model registry.
+    registry = get_model_registry()
     try:
-        yield service
-    finally:
-        service.close()
+        return VectorStoreService(
+            registry.get("vector_storage"), embedder=registry.get("embedder")
+        )
+    except ModelNotAvailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
 
+@lru_cache(maxsize=1)
+def _article_texts() -> Dict[str, str]:
+    return article_texts_by_key(load_legal_articles())
 
-def get_vector_store_service():
-    # Replace with actual vector storage implementation
-    vector_storage = None  # Example placeholder
-    return VectorStoreService(vector_storage)
+
+def get_hybrid_search_service(
+    knowledge_graph_service: AsyncKnowledgeGraphService = Depends(
+        get_async_knowledge_graph_service
+    ),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+) -> HybridSearchService:
+    registry = get_model_registry()
+    retrievers = {"graph": graph_retriever(knowledge_graph_service)}
+    # Retrievers disabled by configuration are reported once at startup;
+    # only a registered one failing to load is worth a warning here.
+    if registry.is_registered("bm25_index"):
+        try:
+            retrievers["bm25"] = bm25_retriever(registry.get("bm25_index"), executor)
+        except ModelNotAvailableError as exc:
+            LOGGER.warning("Hybrid search running without BM25 retrieval: %s", exc)
+    if registry.is_registered("vector_storage"):
+        try:
+            retrievers["vector"] = vector_retriever(get_vector_store_service(), executor)
+        except HTTPException as exc:
+            # Without the vector store the other retrievers still answer.
+            LOGGER.warning("Hybrid search running without vector retrieval: %s", exc.detail)
+    reranker = None
+    if registry.is_registered("reranker"):
+        try:
+            reranker = cross_encoder_stage(registry.get("reranker"), executor, _article_texts())
+        except (ModelNotAvailableError, FileNotFoundError) as exc:
+            LOGGER.warning("Hybrid search running without reranking: %s", exc)
+    return HybridSearchService(
+        retrievers,
+        fusion=settings.HYBRID_SEARCH_FUSION,
+        weights=parse_weights(settings.HYBRID_SEARCH_WEIGHTS),
+        rrf_k=settings.HYBRID_SEARCH_RRF_K,
+        candidate_k=settings.HYBRID_SEARCH_CANDIDATES,
+        timeout_seconds=settings.HYBRID_SEARCH_TIMEOUT_SECONDS,
+        reranker=reranker,
+    )
 
 
 @router.get("/hybrid-search")
-def hybrid_search(
+async def hybrid_search(
     query: str,
-    knowledge_graph_service: KnowledgeGraphService = Depends(
-        get_knowledge_graph_service
-    ),
-    vector_store_service: VectorStoreService = Depends(get_vector_store_service),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    fusion: str = Query(None, description=f"One of {', '.join(FUSION_METHODS)}"),
+    hybrid_search_service: HybridSearchService = Depends(get_hybrid_search_service),
 ):
     """
-    Perform a hybrid search using both the Knowledge Graph and Vector Store.
+    Perform a hybrid search over BM25, the Knowledge Graph and the Vector Store.
+
+    Retrievers run concurrently and their rankings are fused per article; the
+    top candidates are then reranked by a cross-encoder within a time budget.
 
     :param query: The search query.
-    :param knowledge_graph_service: Service for Knowledge Graph operations.
-    :param vector_store_service: Service for Vector Store operations.
-    :return: Combined search results.
+    :param page: 1-based page of fused results.
+    :param page_size: Results per page.
+    :param fusion: ``rrf`` (reciprocal-rank fusion) or ``weighted`` scores.
+    :param hybrid_search_service: Service fusing the retrievers.
+    :return: One page of fused articles with per-stage timings.
     """
-    # Example logic for hybrid search (to be replaced with actual implementation)
-    graph_results = knowledge_graph_service.search(query)
-    vector_results = vector_store_service.search(query)
-
-    # Combine results (example logic)
-    combined_results = {
-        "graph_results": graph_results,
-        "vector_results": vector_results,
-    }
-
-    return {"message": "Hybrid search completed", "results": combined_results}
+    if fusion is not None and fusion not in FUSION_METHODS:
+        raise HTTPException(status_code=422, detail=f"fusion must be one of {FUSION_METHODS}")
+    results = await hybrid_search_service.search(
+        query, page=page, page_size=page_size, fusion=fusion
+    )
+    return {"message": "Hybrid search completed", "results": results}
@@ -1,10 +1,17 @@
 # Placeholder for additional API logic if needed in the future.
-from typing import Generator, List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.api.dependencies import get_db
+from app.api.dependencies import get_analysis_knowledge_graph_service, get_db
+from app.services.embedded_graph import peek_embedded_graph_storage
+from app.services.graph_query_profiler import (
+    GraphQueryProfiler,
+    get_graph_query_profiler,
+)
+from app.services.graph_write_queue import get_graph_write_worker
+from app.services.inference_executor import InferenceExecutor, get_inference_executor
 from app.repositories.legal_ontology_repository import LegalOntologyRepository
 from app.schemas.legal_article import (
     LegalArticleAnalysisError,
@@ -15,7 +22,11 @@ from app.schemas.legal_ontology import LegalOntologyCreate, LegalOntologyRead
 from app.services.legal_article.factory import build_legal_article_analysis_service
 from app.services.legal_article.mapper import map_analysis_to_response
 from app.services.legal_ontology_service import LegalOntologyService
-from app.services.knowledge_graph import KnowledgeGraphService
+from app.services.knowledge_graph import KnowledgeGraphService, peek_shared_driver_pool
+from app.services.knowledge_graph_async import (
+    AsyncKnowledgeGraphService,
+    peek_shared_async_driver_pool,
+)
 
 router = APIRouter()
 
@@ -31,31 +42,24 @@ def list_legal_ontologies(db: Session = Depends(get_db)):
     response_model=LegalArticleAnalysisResponse,
     responses={404: {"model": LegalArticleAnalysisError}},
 )
-def get_knowledge_graph_service() -> Generator[KnowledgeGraphService, None, None]:
-    service = KnowledgeGraphService()
-    try:
-        yield service
-    finally:
-        service.close()
-
-
-@router.post(
-    "/legal-articles/analyze",
-    response_model=LegalArticleAnalysisResponse,
-    responses={404: {"model": LegalArticleAnalysisError}},
-)
-def analyze_legal_article(
+async def analyze_legal_article(
     payload: LegalArticleAnalysisRequest,
-    knowledge_graph: KnowledgeGraphService = Depends(get_knowledge_graph_service),
+    knowledge_graph: Optional[AsyncKnowledgeGraphService] = Depends(
+        get_analysis_knowledge_graph_service
+    ),
+    executor: InferenceExecutor = Depends(get_inference_executor),
 ):
+    write_worker = get_graph_write_worker()
     service = build_legal_article_analysis_service(
-        knowledge_graph_service=knowledge_graph
+        async_knowledge_graph_service=knowledge_graph,
+        graph_writer=write_worker.queue if write_worker else None,
     )
     try:
-        analysis = service.analyze_article(
+        analysis = await service.analyze_article_async(
             article_number=payload.article_number,
             language=payload.language,
             text_override=payload.text,
+            executor=executor,
         )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -71,4 +75,57 @@ def create_legal_ontology(obj_in: LegalOntologyCreate, db: Session = Depends(get
 
 @router.get("/health")
 def health_check():
-    return {"status": "ok"}
+    write_worker = get_graph_write_worker()
+    write_queue = write_worker.stats() if write_worker else None
+    embedded_graph = peek_embedded_graph_storage()
+    if embedded_graph is not None:
+        return {
+            "status": "ok",
+            "embedded_graph": embedded_graph.stats(),
+            "graph_write_queue": write_queue,
+        }
+    pool = peek_shared_driver_pool()
+    if pool is None:
+        return {
+            "status": "degraded",
+            "neo4j": {"status": "not_connected"},
+            "graph_write_queue": write_queue,
+        }
+    schema = None
+    try:
+        pool.driver.verify_connectivity()
+        neo4j_status = "ok"
+        knowledge_graph = KnowledgeGraphService()
+        try:
+            schema = knowledge_graph.verify_schema()
+        finally:
+            knowledge_graph.close()
+    except Exception as exc:  # pragma: no cover - relies on external Neo4j instance
+        neo4j_status = f"unavailable: {exc}"
+    healthy = neo4j_status == "ok" and bool(schema and schema["ok"])
+    async_pool = peek_shared_async_driver_pool()
+    return {
+        "status": "ok" if healthy else "degraded",
+        "neo4j": {
+            "status": neo4j_status,
+            "pool": pool.stats(),
+            "async_pool": async_pool.stats() if async_pool else None,
+            "schema": schema,
+        },
+        "graph_write_queue": write_queue,
+    }
+
+
+@router.get(
+    "/graph/query-stats",
+    summary="Cypher query statistics",
+    description="Per-query-template latency histogram, row counts and sampled DB hits for this worker, slowest total time first.",
+)
+def graph_query_stats(
+    reset: bool = False,
+    profiler: GraphQueryProfiler = Depends(get_graph_query_profiler),
+):
+    stats = profiler.stats()
+    if reset:
+        profiler.reset()
+    return {"queries": stats}
@@ -0,0 +1,26 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from app.services.inference_executor import InferenceExecutor, get_inference_executor
+from app.services.model_registry import ModelRegistry, get_model_registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/models",
+    summary="List loaded models",
+    description="Reports load time, warm-up time and resident memory for every model loaded by this worker.",
+)
+def list_models(registry: ModelRegistry = Depends(get_model_registry)) -> Dict:
+    return {"models": registry.stats()}
+
+
+@router.get(
+    "/inference/stats",
+    summary="Inference executor statistics",
+    description="Reports pool size, queue depth, rejections and mean queue wait vs. compute time of the inference executor.",
+)
+def inference_stats(executor: InferenceExecutor = Depends(get_inference_executor)) -> Dict:
+    return executor.stats()
@@ -1,9 +1,27 @@
+import json
+import logging
+from functools import lru_cache
 
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional
 
+from app.core.config import settings
+from app.nlp.dataset import load_legal_articles
+from app.services.corpus_qa import CorpusQAService
+
+from app.services.inference_executor import (
+    InferenceExecutor,
+    InferenceOverloadedError,
+    get_inference_executor,
+)
+from app.services.model_registry import ModelNotAvailableError, get_model_registry
+from app.services.qa_batching import QABatchScheduler, get_qa_batch_scheduler
 from app.services.qa_service import QAService
+from app.services.vector_store import VectorStoreService
+
+LOGGER = logging.getLogger(__name__)
 
 # Define the router
 router = APIRouter()
@@ -12,18 +30,76 @@ router = APIRouter()
 
 class QARequest(BaseModel):
     question: str = Field(..., description="The question you want to ask.", example="ห้ามนายจ้างเรียกหลักประกันจากใคร")
-    context: str = Field(..., description="The body of text where the answer should be found.", example="มาตรา 12 ห้ามมิให้นายจ้างเรียกหรือรับหลักประกันเพื่อการใดๆ จากลูกจ้าง เว้นแต่ลักษณะหรือสภาพของงานที่ทำนั้น ลูกจ้างต้องรับผิดชอบเกี่ยวกับการเงินหรือทรัพย์สินของนายจ้าง")
+    context: Optional[str] = Field(None, description="The body of text where the answer should be found. Omit it to search the whole legal corpus and stream ranked answers.", example="มาตรา 12 ห้ามมิให้นายจ้างเรียกหรือรับหลักประกันเพื่อการใดๆ จากลูกจ้าง เว้นแต่ลักษณะหรือสภาพของงานที่ทำนั้น ลูกจ้างต้องรับผิดชอบเกี่ยวกับการเงินหรือทรัพย์สินของนายจ้าง")
+    long_context: bool = Field(False, description="Treat the context as a long document (e.g. a full chapter): split it by มาตรา and rank spans across all chunks.")
+    top_k: int = Field(3, ge=1, le=20, description="Number of ranked answers to return in long-context mode.")
+
+class QASpan(BaseModel):
+    score: float = Field(..., description="The model's confidence score (0.0 to 1.0).")
+    answer: str = Field(..., description="The extracted answer.")
+    start: int = Field(..., description="Character offset of the answer in the context.")
+    end: int = Field(..., description="Character offset just past the answer in the context.")
 
 class QAResponse(BaseModel):
     score: float = Field(..., description="The model's confidence score (0.0 to 1.0).")
     answer: str = Field(..., description="The extracted answer.")
+    start: Optional[int] = Field(None, description="Character offset of the answer in the context.")
+    end: Optional[int] = Field(None, description="Character offset just past the answer in the context.")
+    answers: Optional[List[QASpan]] = Field(None, description="Ranked answers across all chunks (long-context mode only).")
+
+class QABatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=64, description="Questions to answer against the same context.", example=["ห้ามนายจ้างเรียกหลักประกันจากใคร", "นายจ้างต้องคืนหลักประกันภายในกี่วัน"])
+    context: str = Field(..., description="The body of text shared by all questions.")
+
+class QABatchAnswer(BaseModel):
+    question: str = Field(..., description="The question this answer belongs to.")
+    score: float = Field(..., description="The model's confidence score (0.0 to 1.0).")
+    answer: str = Field(..., description="The extracted answer.")
+    start: int = Field(..., description="Character offset of the answer in the context.")
+    end: int = Field(..., description="Character offset just past the answer in the context.")
+
+class QABatchResponse(BaseModel):
+    answers: List[QABatchAnswer]
 
 # --- Dependency Injection ---
 
-# This function provides an instance of QAService to the route.
-# FastAPI will cache this instance for the duration of the request.
-def get_qa_service():
-    return QAService()
+# This function provides the worker's shared QAService instance to the route.
+# The model is loaded once at startup by the model registry, not per request.
+def get_qa_service() -> QAService:
+    try:
+        return get_model_registry().get("qa")
+    except ModelNotAvailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+@lru_cache(maxsize=1)
+def _corpus_articles() -> Dict[str, str]:
+    return load_legal_articles()
+
+def get_corpus_qa_service(
+    qa_service: QAService = Depends(get_qa_service),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+) -> CorpusQAService:
+    registry = get_model_registry()
+    try:
+        vector_store = VectorStoreService(
+            registry.get("vector_storage"), embedder=registry.get("embedder")
+        )
+    except ModelNotAvailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    reranker = None
+    if registry.is_registered("reranker"):
+        try:
+            reranker = registry.get("reranker")
+        except ModelNotAvailableError:
+            pass  # read the embedding ranking as-is
+    return CorpusQAService(
+        qa_service,
+        vector_store,
+        _corpus_articles(),
+        executor=executor,
+        reranker=reranker,
+        rerank_depth=settings.RERANKER_MAX_CANDIDATES,
+    )
 
 # --- API Endpoint Definition ---
 
@@ -34,15 +110,124 @@ def get_qa_service():
     summary="Ask a question based on a context",
     description="This endpoint uses a machine learning model to find the best answer to a question within the provided text (context)."
 )
-def ask_question(
+async def ask_question(
     request_data: QARequest = Body(...),
-    qa_service: QAService = Depends(get_qa_service)
-) -> Dict:
+    qa_service: QAService = Depends(get_qa_service),
+    scheduler: Optional[QABatchScheduler] = Depends(get_qa_batch_scheduler),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    accept: Optional[str] = Header(None),
+):
     """
     Receives a question and a context, then returns the most likely answer found within the context.
+
+    Concurrent requests are grouped by the micro-batching scheduler when it is enabled.
+    Without a context, the best-matching articles are retrieved from the corpus and ranked
+    answers are streamed back as NDJSON (or server-sent events when requested via Accept).
+    """
+    if request_data.context is None:
+        if not settings.CORPUS_QA_ENABLED:
+            raise HTTPException(status_code=422, detail="A context is required.")
+        corpus_qa = get_corpus_qa_service(qa_service, executor)
+        use_sse = bool(accept and "text/event-stream" in accept)
+        events = corpus_qa.stream_answers(
+            request_data.question,
+            top_n=settings.CORPUS_QA_TOP_N,
+            batch_size=settings.CORPUS_QA_BATCH_SIZE,
+        )
+        # Run retrieval and the first batch before the 200 headers go out, so an
+        # overloaded executor or a missing model is still a proper 503.
+        try:
+            first_event = await events.__anext__()
+        except ModelNotAvailableError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+        return StreamingResponse(
+            _stream_corpus_answers(first_event, events, use_sse=use_sse),
+            media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        )
+    if request_data.long_context:
+        return await executor.run(
+            qa_service.answer_long_document,
+            request_data.question,
+            request_data.context,
+            top_k=request_data.top_k,
+        )
+    if scheduler is None:
+        return await executor.run(
+            qa_service.answer_question,
+            question=request_data.question,
+            context=request_data.context,
+        )
+    return await scheduler.submit(request_data.question, request_data.context)
+
+
+async def _stream_corpus_answers(
+    first_event: Dict, events: AsyncIterator[Dict], *, use_sse: bool
+) -> AsyncIterator[str]:
+    """
+    Encodes corpus QA events; a failure after the headers were sent ends the
+    stream with an ``error`` event instead of silently truncating it.
     """
-    result = qa_service.answer_question(
-        question=request_data.question, 
-        context=request_data.context
+    yield _encode_event(first_event, use_sse=use_sse)
+    try:
+        async for event in events:
+            yield _encode_event(event, use_sse=use_sse)
+    except Exception as exc:
+        LOGGER.exception("Corpus QA stream failed: %s", exc)
+        status = 503 if isinstance(exc, (InferenceOverloadedError, ModelNotAvailableError)) else 500
+        yield _encode_event({"type": "error", "status": status, "detail": str(exc)}, use_sse=use_sse)
+
+
+def _encode_event(event: Dict, *, use_sse: bool) -> str:
+    payload = json.dumps(event, ensure_ascii=False)
+    if use_sse:
+        return f"event: {event['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@router.post(
+    "/ask-batch",
+    response_model=QABatchResponse,
+    tags=["Question Answering"],
+    summary="Ask several questions about one context",
+    description="Tokenizes the context once, reuses its sliding-window chunks for every question and answers them in batched forward passes."
+)
+async def ask_questions(
+    request_data: QABatchRequest = Body(...),
+    qa_service: QAService = Depends(get_qa_service),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+) -> Dict:
+    """
+    Receives a list of questions and one context, then returns one answer per question in order.
+    """
+    answers = await executor.run(
+        qa_service.answer_questions,
+        request_data.questions,
+        request_data.context,
     )
-    return result
+    return {"answers": answers}
+
+
+@router.get(
+    "/batching/stats",
+    tags=["Question Answering"],
+    summary="Micro-batching statistics",
+    description="Reports achieved batch sizes, queue wait and compute time of the QA micro-batching scheduler.",
+)
+def batching_stats(
+    scheduler: Optional[QABatchScheduler] = Depends(get_qa_batch_scheduler),
+) -> Dict:
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.stats()}
+
+
+@router.get(
+    "/cache/stats",
+    tags=["Question Answering"],
+    summary="Answer cache statistics",
+    description="Reports size, hit/miss counters and hit rate of the QA answer cache.",
+)
+def cache_stats(qa_service: QAService = Depends(get_qa_service)) -> Dict:
+    if qa_service.answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **qa_service.answer_cache.stats()}
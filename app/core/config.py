@@ -14,10 +14,126 @@ class Settings(BaseSettings):
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
 
     # Neo4j settings
+    GRAPH_BACKEND: str = Field("neo4j", env="GRAPH_BACKEND")
+    GRAPH_EMBEDDED_SNAPSHOT_PATH: Optional[str] = Field(
+        "data/graph_snapshot.msgpack", env="GRAPH_EMBEDDED_SNAPSHOT_PATH"
+    )
     NEO4J_URI: str = Field("neo4j://127.0.0.1:7687", env="NEO4J_URI")
     NEO4J_USER: Optional[str] = Field(None, env="NEO4J_USER")
     NEO4J_PASSWORD: Optional[str] = Field(None, env="NEO4J_PASSWORD")
     NEO4J_DATABASE: Optional[str] = Field(None, env="NEO4J_DATABASE")
+    NEO4J_MAX_POOL_SIZE: int = Field(50, env="NEO4J_MAX_POOL_SIZE")
+    # Share of NEO4J_MAX_POOL_SIZE given to the async driver; the sync pool gets the rest.
+    NEO4J_ASYNC_POOL_SHARE: float = Field(0.5, env="NEO4J_ASYNC_POOL_SHARE")
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = Field(
+        60.0, env="NEO4J_CONNECTION_ACQUISITION_TIMEOUT"
+    )
+    NEO4J_MAX_CONNECTION_LIFETIME: float = Field(
+        3600.0, env="NEO4J_MAX_CONNECTION_LIFETIME"
+    )
+    NEO4J_WRITE_CHUNK_SIZE: int = Field(500, env="NEO4J_WRITE_CHUNK_SIZE")
+    NEO4J_FULLTEXT_ANALYZER: str = Field("thai", env="NEO4J_FULLTEXT_ANALYZER")
+    # Comma-separated NER entity labels that also get id constraints.
+    GRAPH_SCHEMA_EXTRA_LABELS: str = Field("ACTOR,ITEM", env="GRAPH_SCHEMA_EXTRA_LABELS")
+    GRAPH_CHANGE_DETECTION_ENABLED: bool = Field(
+        True, env="GRAPH_CHANGE_DETECTION_ENABLED"
+    )
+    GRAPH_SLOW_QUERY_MS: float = Field(200.0, env="GRAPH_SLOW_QUERY_MS")
+    GRAPH_PROFILE_SAMPLE_RATE: float = Field(0.0, env="GRAPH_PROFILE_SAMPLE_RATE")
+    GRAPH_WRITE_QUEUE_ENABLED: bool = Field(True, env="GRAPH_WRITE_QUEUE_ENABLED")
+    GRAPH_WRITE_QUEUE_PATH: str = Field(
+        "data/graph_write_queue.sqlite3", env="GRAPH_WRITE_QUEUE_PATH"
+    )
+    GRAPH_WRITE_BATCH_SIZE: int = Field(50, env="GRAPH_WRITE_BATCH_SIZE")
+    GRAPH_WRITE_MAX_BACKOFF_SECONDS: float = Field(
+        300.0, env="GRAPH_WRITE_MAX_BACKOFF_SECONDS"
+    )
+    # Entries failing this often (with the graph reachable) are dead-lettered
+    GRAPH_WRITE_MAX_ATTEMPTS: int = Field(8, env="GRAPH_WRITE_MAX_ATTEMPTS")
+
+    # Model registry settings
+    QA_MODEL_NAME: str = Field(
+        "distilbert-base-multilingual-cased", env="QA_MODEL_NAME"
+    )
+    NER_MODEL_NAME: Optional[str] = Field(None, env="NER_MODEL_NAME")
+    CLASSIFIER_MODEL_NAME: Optional[str] = Field(None, env="CLASSIFIER_MODEL_NAME")
+    MODEL_WARMUP_ENABLED: bool = Field(True, env="MODEL_WARMUP_ENABLED")
+    EMBEDDING_MODEL_NAME: str = Field(
+        "paraphrase-multilingual-MiniLM-L12-v2", env="EMBEDDING_MODEL_NAME"
+    )
+    EMBEDDING_BATCH_SIZE: int = Field(32, env="EMBEDDING_BATCH_SIZE")
+    # Vectors keyed by (model id, text hash); unset to disable the cache.
+    EMBEDDING_CACHE_PATH: Optional[str] = Field(
+        "data/embedding_cache.sqlite3", env="EMBEDDING_CACHE_PATH"
+    )
+    VECTOR_STORE_ENABLED: bool = Field(False, env="VECTOR_STORE_ENABLED")
+    # "chroma" (persistent Chroma collection), "memmap" (float16 matrix shared
+    # across workers through the page cache, exact top-k search), or the
+    # approximate "ivf" (pure NumPy) / "hnsw" (needs hnswlib) indexes
+    VECTOR_STORE_BACKEND: str = Field("chroma", env="VECTOR_STORE_BACKEND")
+    VECTOR_STORE_PATH: str = Field("data/vector_store", env="VECTOR_STORE_PATH")
+    VECTOR_STORE_COLLECTION: str = Field("legal_articles", env="VECTOR_STORE_COLLECTION")
+    # Embed the legal articles into an empty store when it is first loaded.
+    VECTOR_STORE_INDEX_ON_STARTUP: bool = Field(True, env="VECTOR_STORE_INDEX_ON_STARTUP")
+    # IVF: 0 lists means 4 * sqrt(n); nprobe lists are scanned per query.
+    VECTOR_INDEX_NLIST: int = Field(0, env="VECTOR_INDEX_NLIST")
+    VECTOR_INDEX_NPROBE: int = Field(8, env="VECTOR_INDEX_NPROBE")
+    VECTOR_INDEX_EF: int = Field(64, env="VECTOR_INDEX_EF")
+
+    # In-process BM25 over the article dataset (PyThaiNLP segmentation)
+    BM25_ENABLED: bool = Field(False, env="BM25_ENABLED")
+    BM25_INDEX_PATH: Optional[str] = Field("data/bm25_index.npz", env="BM25_INDEX_PATH")
+    BM25_K1: float = Field(1.5, env="BM25_K1")
+    BM25_B: float = Field(0.75, env="BM25_B")
+    BM25_TOKENIZER_ENGINE: str = Field("newmm", env="BM25_TOKENIZER_ENGINE")
+
+    # Cross-encoder reranking of hybrid search / corpus QA candidates
+    RERANKER_ENABLED: bool = Field(False, env="RERANKER_ENABLED")
+    RERANKER_MODEL_NAME: str = Field(
+        "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", env="RERANKER_MODEL_NAME"
+    )
+    RERANKER_BATCH_SIZE: int = Field(16, env="RERANKER_BATCH_SIZE")
+    RERANKER_BUDGET_MS: float = Field(200.0, env="RERANKER_BUDGET_MS")
+    RERANKER_MAX_CANDIDATES: int = Field(50, env="RERANKER_MAX_CANDIDATES")
+    RERANKER_CACHE_MAX_ENTRIES: int = Field(20000, env="RERANKER_CACHE_MAX_ENTRIES")
+    RERANKER_CACHE_TTL_SECONDS: float = Field(86400.0, env="RERANKER_CACHE_TTL_SECONDS")
+
+    # Hybrid search: "rrf" (reciprocal-rank fusion) or "weighted" (min-max
+    # normalised scores); weights are "source=weight" pairs, default 1.0
+    HYBRID_SEARCH_FUSION: str = Field("rrf", env="HYBRID_SEARCH_FUSION")
+    HYBRID_SEARCH_WEIGHTS: str = Field("", env="HYBRID_SEARCH_WEIGHTS")
+    HYBRID_SEARCH_RRF_K: int = Field(60, env="HYBRID_SEARCH_RRF_K")
+    HYBRID_SEARCH_CANDIDATES: int = Field(50, env="HYBRID_SEARCH_CANDIDATES")
+    HYBRID_SEARCH_TIMEOUT_SECONDS: float = Field(5.0, env="HYBRID_SEARCH_TIMEOUT_SECONDS")
+
+    # Retrieve-then-read QA over the whole corpus when no context is supplied
+    CORPUS_QA_ENABLED: bool = Field(False, env="CORPUS_QA_ENABLED")
+    CORPUS_QA_TOP_N: int = Field(10, env="CORPUS_QA_TOP_N")
+    CORPUS_QA_BATCH_SIZE: int = Field(4, env="CORPUS_QA_BATCH_SIZE")
+
+    # Question answering inference backend ("torch" or "onnx")
+    QA_BACKEND: str = Field("torch", env="QA_BACKEND")
+    # Exports are kept per model version in subdirectories of QA_ONNX_DIR
+    QA_ONNX_DIR: str = Field("models/qa_onnx", env="QA_ONNX_DIR")
+    QA_ONNX_QUANTIZE: bool = Field(False, env="QA_ONNX_QUANTIZE")
+    QA_ONNX_THREADS: Optional[int] = Field(None, env="QA_ONNX_THREADS")
+
+    # Question answering answer cache
+    QA_CACHE_ENABLED: bool = Field(True, env="QA_CACHE_ENABLED")
+    QA_CACHE_MAX_ENTRIES: int = Field(4096, env="QA_CACHE_MAX_ENTRIES")
+    QA_CACHE_TTL_SECONDS: float = Field(3600.0, env="QA_CACHE_TTL_SECONDS")
+    QA_CACHE_DISK_PATH: Optional[str] = Field(None, env="QA_CACHE_DISK_PATH")
+    QA_CACHE_DISK_MAX_ROWS: Optional[int] = Field(100000, env="QA_CACHE_DISK_MAX_ROWS")
+
+    # Question answering micro-batching
+    QA_BATCHING_ENABLED: bool = Field(True, env="QA_BATCHING_ENABLED")
+    QA_BATCH_MAX_SIZE: int = Field(16, env="QA_BATCH_MAX_SIZE")
+    QA_BATCH_MAX_LATENCY_MS: float = Field(10.0, env="QA_BATCH_MAX_LATENCY_MS")
+
+    # Dedicated inference executor
+    INFERENCE_MAX_WORKERS: int = Field(2, env="INFERENCE_MAX_WORKERS")
+    INFERENCE_MAX_QUEUE_DEPTH: int = Field(64, env="INFERENCE_MAX_QUEUE_DEPTH")
+    INFERENCE_TORCH_THREADS: Optional[int] = Field(None, env="INFERENCE_TORCH_THREADS")
 
     class Config:
         env_file = ".env"
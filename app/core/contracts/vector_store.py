@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Sequence
+
+VectorRecord = Mapping[str, Any]  # {"id": str, "vector": Sequence[float], "metadata": dict}
+VectorHit = Dict[str, Any]  # {"id": str, "score": float, "metadata": dict}
+
+
+class VectorStorageProtocol(Protocol):
+    def add_vector(
+        self, vector_id: str, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Insert or replace one vector."""
+
+    def add_vectors(self, records: Sequence[VectorRecord]) -> int:
+        """Insert or replace many vectors; returns how many were written."""
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[VectorHit]:
+        """Return the ``k`` most similar vectors whose metadata matches ``filter``."""
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+
+    def count(self) -> int:
+        """Number of stored vectors."""
@@ -0,0 +1,166 @@
+"""Application lifespan hook: per-worker startup and shutdown of shared resources."""
+
+from __future__ import annotations
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.services.embedded_graph import (
+    get_embedded_graph_storage,
+    peek_embedded_graph_storage,
+)
+from app.services.graph_write_queue import (
+    GraphWriteQueue,
+    GraphWriteWorker,
+    set_graph_write_worker,
+)
+from app.services.knowledge_graph import (
+    KnowledgeGraphService,
+    create_driver_pool_from_settings,
+    set_shared_driver_pool,
+)
+from app.services.knowledge_graph_async import (
+    create_async_driver_pool_from_settings,
+    set_shared_async_driver_pool,
+)
+from app.services.inference_executor import InferenceExecutor, set_inference_executor
+from app.services.model_registry import (
+    ModelNotAvailableError,
+    ModelRegistry,
+    get_model_registry,
+    register_default_models,
+)
+from app.services.qa_batching import QABatchScheduler, set_qa_batch_scheduler
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _bootstrap_graph_schema() -> None:
+    """Create missing id constraints and search indexes, then log what is still missing."""
+
+    service = KnowledgeGraphService()
+    try:
+        service.ensure_schema()
+        service.ensure_search_indexes()
+        report = service.verify_schema()
+        if not report["ok"]:
+            LOGGER.warning(
+                "Graph labels without an id uniqueness constraint: %s",
+                ", ".join(report["missing"]),
+            )
+    except Exception as exc:  # pragma: no cover - relies on external Neo4j instance
+        LOGGER.warning("Graph schema bootstrap failed: %s", exc)
+    finally:
+        service.close()
+
+
+def _log_hybrid_search_stages(registry: ModelRegistry) -> None:
+    """Name the hybrid search stages switched off by configuration, once per worker."""
+
+    disabled = [
+        stage
+        for stage, model in (
+            ("BM25 retrieval", "bm25_index"),
+            ("vector retrieval", "vector_storage"),
+            ("reranking", "reranker"),
+        )
+        if not registry.is_registered(model)
+    ]
+    if disabled:
+        LOGGER.info("Hybrid search running without %s (disabled in settings)", ", ".join(disabled))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Created before the models load so torch thread tuning applies to them.
+    executor = InferenceExecutor(
+        max_workers=settings.INFERENCE_MAX_WORKERS,
+        max_queue_depth=settings.INFERENCE_MAX_QUEUE_DEPTH,
+        torch_threads=settings.INFERENCE_TORCH_THREADS,
+    )
+    set_inference_executor(executor)
+
+    # One sync and one async driver per worker, splitting NEO4J_MAX_POOL_SIZE;
+    # request-scoped graph services borrow sessions instead of reconnecting.
+    driver_pool = None
+    async_pool = None
+    if settings.GRAPH_BACKEND == "neo4j":
+        try:
+            driver_pool = create_driver_pool_from_settings()
+        except Exception as exc:  # pragma: no cover - relies on external Neo4j instance
+            LOGGER.warning("Neo4j driver pool not created at startup: %s", exc)
+        else:
+            set_shared_driver_pool(driver_pool)
+            _bootstrap_graph_schema()
+
+        async_pool = create_async_driver_pool_from_settings()
+        try:
+            await async_pool.verify_connectivity()
+        except Exception as exc:  # pragma: no cover - relies on external Neo4j instance
+            LOGGER.warning("Neo4j async driver could not connect at startup: %s", exc)
+        set_shared_async_driver_pool(async_pool)
+    elif settings.GRAPH_BACKEND == "embedded":
+        # Claims the snapshot now, so a second worker fails at startup
+        # instead of overwriting this one's graph later.
+        get_embedded_graph_storage()
+
+    write_worker = None
+    if settings.GRAPH_WRITE_QUEUE_ENABLED:
+        write_worker = GraphWriteWorker(
+            GraphWriteQueue(settings.GRAPH_WRITE_QUEUE_PATH),
+            KnowledgeGraphService,
+            batch_size=settings.GRAPH_WRITE_BATCH_SIZE,
+            max_backoff_seconds=settings.GRAPH_WRITE_MAX_BACKOFF_SECONDS,
+            max_attempts=settings.GRAPH_WRITE_MAX_ATTEMPTS,
+        )
+        write_worker.start()
+        set_graph_write_worker(write_worker)
+
+    registry = get_model_registry()
+    register_default_models(registry)
+    registry.load_all(warmup=settings.MODEL_WARMUP_ENABLED)
+    _log_hybrid_search_stages(registry)
+
+    scheduler = None
+    if settings.QA_BATCHING_ENABLED:
+        try:
+            qa_service = registry.get("qa")
+        except ModelNotAvailableError as exc:
+            LOGGER.warning("QA micro-batching disabled: %s", exc)
+        else:
+            scheduler = QABatchScheduler(
+                qa_service.answer_batch,
+                max_batch_size=settings.QA_BATCH_MAX_SIZE,
+                max_latency_ms=settings.QA_BATCH_MAX_LATENCY_MS,
+                executor=executor,
+                max_pending=settings.INFERENCE_MAX_QUEUE_DEPTH,
+            )
+            await scheduler.start()
+            set_qa_batch_scheduler(scheduler)
+
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            set_qa_batch_scheduler(None)
+            await scheduler.stop()
+        registry.clear()
+        if write_worker is not None:
+            # Undrained entries stay in the queue file for the next start.
+            set_graph_write_worker(None)
+            write_worker.stop()
+        set_inference_executor(None)
+        executor.shutdown(wait=False)
+        if driver_pool is not None:
+            set_shared_driver_pool(None)
+            driver_pool.close()
+        if async_pool is not None:
+            set_shared_async_driver_pool(None)
+            await async_pool.close()
+        embedded_graph = peek_embedded_graph_storage()
+        if embedded_graph is not None:
+            embedded_graph.release()
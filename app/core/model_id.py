@@ -0,0 +1,20 @@
+"""Version-aware identifiers for models loaded by name or from a local directory."""
+
+from __future__ import annotations
+
+import os
+
+
+def resolve_model_id(model_name: str) -> str:
+    """Return ``model_name``, or ``<abspath>@<newest mtime_ns>`` for a local directory.
+
+    A local (fine-tuned) model directory can be retrained in place; its
+    modification time keeps cached vectors, answers and exports from
+    different trainings apart.
+    """
+
+    if os.path.isdir(model_name):
+        with os.scandir(model_name) as entries:
+            modified = max((entry.stat().st_mtime_ns for entry in entries), default=0)
+        return f"{os.path.abspath(model_name)}@{modified}"
+    return model_name
@@ -5,7 +5,7 @@ from __future__ import annotations
 import os
 import re
 from collections import OrderedDict
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "dataset")
@@ -14,6 +14,7 @@ DEFAULT_ARTICLE_FILE = os.path.join(DATA_DIR, "data1.txt")
 
 _ARTICLE_SPLIT_PATTERN = re.compile(r"\n\s*มาตรา[\s๐-๙\d/]+")
 _ARTICLE_TITLE_PATTERN = re.compile(r"มาตรา[\s๐-๙\d/]+")
+_ARTICLE_BOUNDARY_PATTERN = re.compile(r"(?:^|\n)\s*(มาตรา[\s๐-๙\d/]+)")
 _CLAUSE_SPLIT_PATTERN = re.compile(r"[\.|\?|!|\n]|(?:\s{2,})")
 
 
@@ -42,6 +43,25 @@ def load_legal_articles(data_file_path: str | None = None) -> Dict[str, str]:
 	return results
 
 
+def iter_article_sections(text: str) -> Iterator[Tuple[int, int]]:
+	"""Yield ``(start, end)`` character spans of each article in ``text``.
+
+	Sections begin at a "มาตรา" heading that starts a line, matching the
+	boundaries used by :func:`load_legal_articles`. Any preamble before the
+	first heading is yielded as its own section. Spans are produced lazily so
+	callers can walk long documents without copying them.
+	"""
+
+	section_start = 0
+	for match in _ARTICLE_BOUNDARY_PATTERN.finditer(text):
+		boundary = match.start(1)
+		if boundary > section_start and text[section_start:boundary].strip():
+			yield section_start, boundary
+		section_start = boundary
+	if text[section_start:].strip():
+		yield section_start, len(text)
+
+
 def cleanup_whitespace(text: str) -> str:
 	"""Collapse repeated whitespace and strip leading/trailing spaces."""
 
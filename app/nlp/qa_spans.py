@@ -0,0 +1,136 @@
+"""Sliding-window and answer-span helpers for extractive question answering."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+
+Offset = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class ContextWindow:
+    """A slice of the tokenized context that fits next to a question."""
+
+    token_ids: List[int]
+    offsets: List[Offset]
+
+
+@dataclass(frozen=True)
+class AnswerSpan:
+    score: float
+    start: int
+    end: int
+
+
+def build_context_windows(
+    token_ids: Sequence[int],
+    offsets: Sequence[Offset],
+    *,
+    max_tokens: int,
+    stride: int,
+) -> List[ContextWindow]:
+    """Split context tokens into windows of ``max_tokens`` overlapping by ``stride``."""
+
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1")
+    if not 0 <= stride < max_tokens:
+        raise ValueError("stride must be in [0, max_tokens)")
+
+    windows: List[ContextWindow] = []
+    step = max_tokens - stride
+    start = 0
+    while True:
+        end = min(start + max_tokens, len(token_ids))
+        windows.append(
+            ContextWindow(
+                token_ids=list(token_ids[start:end]),
+                offsets=[tuple(offset) for offset in offsets[start:end]],
+            )
+        )
+        if end >= len(token_ids):
+            return windows
+        start += step
+
+
+def split_long_span(
+    text: str,
+    start: int,
+    end: int,
+    *,
+    max_chars: int,
+    overlap: int = 0,
+) -> Iterator[Offset]:
+    """Cut ``text[start:end]`` into pieces of at most ``max_chars`` characters.
+
+    Consecutive pieces share ``overlap`` characters so an answer near a cut
+    still appears whole in one piece. Cuts fall on the last whitespace in the
+    second half of a piece when there is one, so words are not split.
+    """
+
+    if max_chars < 2:
+        raise ValueError("max_chars must be at least 2")
+    if not 0 <= overlap < max_chars // 2:
+        raise ValueError("overlap must be in [0, max_chars // 2)")
+
+    while end - start > max_chars:
+        cut = start + max_chars
+        boundary = max(text.rfind(space, start + max_chars // 2, cut) for space in (" ", "\n"))
+        if boundary > start:
+            cut = boundary
+        yield start, cut
+        start = cut - overlap
+    yield start, end
+
+
+def best_spans(
+    start_logits: Sequence[float],
+    end_logits: Sequence[float],
+    *,
+    context_start: int,
+    offsets: Sequence[Offset],
+    top_k: int = 1,
+    max_answer_tokens: int = 30,
+    candidates: int = 20,
+) -> List[AnswerSpan]:
+    """Return the ``top_k`` best character spans of one window.
+
+    ``start_logits``/``end_logits`` cover the whole encoded feature; only the
+    ``len(offsets)`` positions beginning at ``context_start`` are eligible.
+    Scores are ``p(start) * p(end)`` with the softmax taken over the context.
+    """
+
+    length = len(offsets)
+    if length == 0:
+        return []
+
+    starts = _softmax(np.asarray(start_logits, dtype=np.float64)[context_start : context_start + length])
+    ends = _softmax(np.asarray(end_logits, dtype=np.float64)[context_start : context_start + length])
+
+    pool = min(candidates, length)
+    start_candidates = np.argpartition(-starts, pool - 1)[:pool]
+    end_candidates = np.argpartition(-ends, pool - 1)[:pool]
+
+    spans: List[AnswerSpan] = []
+    for start_index in start_candidates:
+        for end_index in end_candidates:
+            if end_index < start_index or end_index - start_index + 1 > max_answer_tokens:
+                continue
+            spans.append(
+                AnswerSpan(
+                    score=float(starts[start_index] * ends[end_index]),
+                    start=int(offsets[start_index][0]),
+                    end=int(offsets[end_index][1]),
+                )
+            )
+
+    spans.sort(key=lambda span: span.score, reverse=True)
+    return spans[:top_k]
+
+
+def _softmax(values: np.ndarray) -> np.ndarray:
+    shifted = np.exp(values - values.max())
+    return shifted / shifted.sum()
@@ -1,3 +1,6 @@
+from app.services.graph_planning import ARTICLE_CONTEXT_RELATIONSHIPS
+
+
 class AnswerSynthesisService:
     """
     Service class responsible for synthesizing answers with references to sections, pages, and cases.
@@ -24,12 +27,39 @@ class AnswerSynthesisService:
         # Perform hybrid search
         graph_results = self.knowledge_graph_service.search(query)
         vector_results = self.vector_store_service.search(query)
+        graph_context = self._load_article_context(graph_results)
 
         # Combine and process results to generate an answer
         answer = self._generate_answer(graph_results, vector_results)
         references = self._extract_references(graph_results, vector_results)
 
-        return {"answer": answer, "references": references}
+        return {
+            "answer": answer,
+            "references": references,
+            "graph_context": graph_context,
+        }
+
+    def _load_article_context(self, graph_results):
+        """
+        Fetch matched articles with their obligations, exceptions, timelines and
+        compliance steps in a single graph round-trip.
+
+        :param graph_results: Results from the Knowledge Graph search.
+        :return: Columnar subgraph, or None when nothing matched.
+        """
+        article_ids = [
+            result["id"]
+            for result in graph_results.get("results", [])
+            if "LegalArticle" in result.get("labels", [])
+        ]
+        if not article_ids:
+            return None
+        return self.knowledge_graph_service.get_subgraph(
+            article_ids,
+            depth=1,
+            rel_types=ARTICLE_CONTEXT_RELATIONSHIPS,
+            root_label="LegalArticle",
+        )
 
     def _generate_answer(self, graph_results, vector_results):
         """
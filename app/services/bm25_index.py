@@ -0,0 +1,301 @@
+"""In-process BM25 index over Thai-segmented legal articles."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+Tokenizer = Callable[[str], List[str]]
+
+FORMAT_VERSION = 1
+DEFAULT_TOKENIZER_ENGINE = "newmm"
+
+# Same token filter as scripts/build_vocabulary.py: Thai, word characters and
+# digits only, so whitespace and punctuation never become terms.
+_TOKEN_PATTERN = re.compile(r"^[฀-๿\w\d]+$")
+
+
+def thai_word_tokenizer(engine: str = DEFAULT_TOKENIZER_ENGINE) -> Tokenizer:
+    """PyThaiNLP word segmentation with the vocabulary script's token filter."""
+
+    from pythainlp.tokenize import word_tokenize
+
+    def tokenize(text: str) -> List[str]:
+        return [
+            token.lower()
+            for token in word_tokenize(text, engine=engine, keep_whitespace=False)
+            if _TOKEN_PATTERN.match(token)
+        ]
+
+    return tokenize
+
+
+class BM25Index:
+    """Okapi BM25 with CSR postings: per term, a slice of doc ids and term frequencies.
+
+    The per-posting BM25 contribution is precomputed when the index is built
+    or loaded, so a query is a gather over its terms' slices followed by one
+    ``bincount``. ``tokenizer_engine`` names the PyThaiNLP engine the terms
+    were segmented with; it is saved with the index so queries are segmented
+    the same way.
+    """
+
+    def __init__(
+        self,
+        doc_ids: Sequence[str],
+        vocabulary: Mapping[str, int],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        *,
+        tokenizer: Optional[Tokenizer] = None,
+        tokenizer_engine: Optional[str] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        corpus_digest: Optional[str] = None,
+    ) -> None:
+        self.doc_ids = list(doc_ids)
+        self.corpus_digest = corpus_digest
+        self.tokenizer_engine = tokenizer_engine
+        self._vocabulary = dict(vocabulary)
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._postings = np.asarray(postings, dtype=np.int32)
+        self._term_freqs = np.asarray(term_freqs, dtype=np.uint16)
+        self._doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self._tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self._impacts = self._compute_impacts()
+
+    @classmethod
+    def build(
+        cls,
+        documents: Mapping[str, str],
+        *,
+        tokenizer: Optional[Tokenizer] = None,
+        tokenizer_engine: Optional[str] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        if tokenizer is None:
+            tokenizer_engine = tokenizer_engine or DEFAULT_TOKENIZER_ENGINE
+            tokenizer = thai_word_tokenizer(tokenizer_engine)
+        doc_ids = list(documents.keys())
+        vocabulary: Dict[str, int] = {}
+        term_docs: List[List[int]] = []
+        term_counts: List[List[int]] = []
+        doc_lengths = np.zeros(len(doc_ids), dtype=np.float32)
+
+        for doc, text in enumerate(documents.values()):
+            tokens = tokenizer(text)
+            doc_lengths[doc] = len(tokens)
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term = vocabulary.get(token)
+                if term is None:
+                    term = vocabulary[token] = len(term_docs)
+                    term_docs.append([])
+                    term_counts.append([])
+                term_docs[term].append(doc)
+                term_counts[term].append(min(count, np.iinfo(np.uint16).max))
+
+        lengths = np.fromiter((len(docs) for docs in term_docs), dtype=np.int64, count=len(term_docs))
+        offsets = np.zeros(len(term_docs) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        postings = np.fromiter(
+            (doc for docs in term_docs for doc in docs), dtype=np.int32, count=int(offsets[-1])
+        )
+        term_freqs = np.fromiter(
+            (count for counts in term_counts for count in counts), dtype=np.uint16, count=int(offsets[-1])
+        )
+        return cls(
+            doc_ids,
+            vocabulary,
+            offsets,
+            postings,
+            term_freqs,
+            doc_lengths,
+            tokenizer=tokenizer,
+            tokenizer_engine=tokenizer_engine,
+            k1=k1,
+            b=b,
+            corpus_digest=corpus_digest(documents),
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._vocabulary)
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        return self.search_batch([query], k=k)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = 10) -> List[List[Dict[str, Any]]]:
+        """Score several queries with one gather and one ``bincount`` over all their postings."""
+
+        tokenize = self._get_tokenizer()
+        doc_count = len(self.doc_ids)
+        slices: List[np.ndarray] = []
+        owners: List[np.ndarray] = []
+        for position, query in enumerate(queries):
+            for token in set(tokenize(query)):
+                term = self._vocabulary.get(token)
+                if term is None:
+                    continue
+                start, end = self._offsets[term], self._offsets[term + 1]
+                slices.append(np.arange(start, end))
+                owners.append(np.full(end - start, position, dtype=np.int64))
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not slices or k <= 0:
+            return results
+
+        positions = np.concatenate(slices)
+        keys = np.concatenate(owners) * doc_count + self._postings[positions]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=self._impacts[positions])
+        query_of = unique_keys // doc_count
+        doc_of = unique_keys % doc_count
+
+        # unique_keys is sorted, so each query's candidates are one contiguous run.
+        bounds = np.searchsorted(query_of, np.arange(len(queries) + 1))
+        for position in range(len(queries)):
+            start, end = bounds[position], bounds[position + 1]
+            if start == end:
+                continue
+            candidate_scores = scores[start:end]
+            top_n = min(k, end - start)
+            top = np.argpartition(-candidate_scores, top_n - 1)[:top_n]
+            top = top[np.argsort(-candidate_scores[top], kind="stable")]
+            results[position] = [
+                {"id": self.doc_ids[doc_of[start + i]], "score": float(candidate_scores[i])}
+                for i in top
+            ]
+        return results
+
+    def save(self, path: str) -> None:
+        """Write the whole index to one ``.npz`` file, atomically replacing the old one."""
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        terms = sorted(self._vocabulary, key=self._vocabulary.__getitem__)
+        header = {
+            "version": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "corpus_digest": self.corpus_digest,
+            "tokenizer_engine": self.tokenizer_engine,
+            "doc_ids": self.doc_ids,
+            "terms": terms,
+        }
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as handle:
+            np.savez(
+                handle,
+                header=np.array(json.dumps(header, ensure_ascii=False)),
+                offsets=self._offsets,
+                postings=self._postings,
+                term_freqs=self._term_freqs,
+                doc_lengths=self._doc_lengths,
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, *, tokenizer: Optional[Tokenizer] = None) -> "BM25Index":
+        """Load a saved index; without ``tokenizer`` queries use the saved engine."""
+
+        with np.load(path, allow_pickle=False) as archive:
+            header = json.loads(str(archive["header"]))
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported BM25 index format in {path}: {header.get('version')}")
+            return cls(
+                header["doc_ids"],
+                {term: index for index, term in enumerate(header["terms"])},
+                archive["offsets"],
+                archive["postings"],
+                archive["term_freqs"],
+                archive["doc_lengths"],
+                tokenizer=tokenizer,
+                tokenizer_engine=header.get("tokenizer_engine"),
+                k1=header["k1"],
+                b=header["b"],
+                corpus_digest=header.get("corpus_digest"),
+            )
+
+    def _get_tokenizer(self) -> Tokenizer:
+        if self._tokenizer is None:
+            self._tokenizer = thai_word_tokenizer(self.tokenizer_engine or DEFAULT_TOKENIZER_ENGINE)
+        return self._tokenizer
+
+    def _compute_impacts(self) -> np.ndarray:
+        doc_count = len(self.doc_ids)
+        if not doc_count or not len(self._postings):
+            return np.zeros(len(self._postings), dtype=np.float32)
+        document_frequency = np.diff(self._offsets).astype(np.float32)
+        idf = np.log1p((doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+        term_of_posting = np.repeat(np.arange(len(document_frequency)), np.diff(self._offsets))
+        average_length = float(self._doc_lengths.mean()) or 1.0
+        tf = self._term_freqs.astype(np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[self._postings] / average_length)
+        return (idf[term_of_posting] * tf * (self.k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+
+def load_or_build_bm25_index(
+    path: Optional[str],
+    documents_loader: Callable[[], Mapping[str, str]],
+    *,
+    tokenizer: Optional[Tokenizer] = None,
+    tokenizer_engine: Optional[str] = None,
+    k1: float = 1.5,
+    b: float = 0.75,
+) -> BM25Index:
+    """Load the persisted index, or (re)build it from ``documents_loader`` and save it.
+
+    Reading the corpus is cheap next to segmenting it, so the documents are
+    always loaded and the saved index is reused only if their digest, the
+    tokenizer engine and the BM25 parameters still match. ``tokenizer_engine``
+    should name the engine behind ``tokenizer``; without a ``tokenizer`` it
+    defaults to ``newmm``.
+    """
+
+    if tokenizer is None:
+        tokenizer_engine = tokenizer_engine or DEFAULT_TOKENIZER_ENGINE
+    documents = documents_loader()
+    if path and os.path.exists(path):
+        index = BM25Index.load(path, tokenizer=tokenizer)
+        expected = (k1, b, corpus_digest(documents), tokenizer_engine)
+        if (index.k1, index.b, index.corpus_digest, index.tokenizer_engine) == expected:
+            return index
+        LOGGER.info("Corpus, tokenizer or BM25 parameters changed; rebuilding %s", path)
+    index = BM25Index.build(
+        documents, tokenizer=tokenizer, tokenizer_engine=tokenizer_engine, k1=k1, b=b
+    )
+    if path:
+        index.save(path)
+    LOGGER.info("Built BM25 index: %d documents, %d terms", len(index), index.vocabulary_size)
+    return index
+
+
+def corpus_digest(documents: Mapping[str, str]) -> str:
+    digest = hashlib.sha256()
+    for doc_id, text in documents.items():
+        for part in (doc_id, text):
+            encoded = part.encode("utf-8")
+            # Length-prefix each part so different splits never collide.
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+    return digest.hexdigest()
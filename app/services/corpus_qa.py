@@ -0,0 +1,110 @@
+"""Retrieve-then-read question answering over the whole legal corpus."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Mapping
+
+from app.services.inference_executor import InferenceExecutor
+from app.services.vector_store import VectorStoreService
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _Candidate:
+    article: str
+    text: str
+    retrieval_score: float
+
+
+class CorpusQAService:
+    """Answers a question without a context by reading the best-matching articles.
+
+    The question is embedded, the top ``top_n`` articles are pulled from the
+    vector store (indexed by :func:`~app.services.vector_store.index_articles`)
+    and extractive QA runs over their ``articles`` text ``batch_size`` at a
+    time. Each batch is yielded as soon as it finishes so the first answers reach
+    the client before the whole candidate list has been read. With a
+    ``reranker``, ``rerank_depth`` articles are retrieved and the cross-encoder
+    picks which ``top_n`` of them are read.
+    """
+
+    def __init__(
+        self,
+        qa_service: Any,
+        vector_store: VectorStoreService,
+        articles: Mapping[str, str],
+        *,
+        executor: InferenceExecutor,
+        reranker: Any = None,
+        rerank_depth: int = 50,
+    ) -> None:
+        self._qa_service = qa_service
+        self._vector_store = vector_store
+        self._articles = articles
+        self._executor = executor
+        self._reranker = reranker
+        self._rerank_depth = rerank_depth
+
+    async def stream_answers(
+        self, question: str, *, top_n: int = 10, batch_size: int = 4
+    ) -> AsyncIterator[Dict[str, Any]]:
+        depth = max(top_n, self._rerank_depth) if self._reranker is not None else top_n
+        candidates = await self._executor.run(self._retrieve, question, depth)
+        if self._reranker is not None and candidates:
+            reranked, _ = await self._executor.run(
+                self._reranker.rerank,
+                question,
+                [{"position": position} for position in range(len(candidates))],
+                [candidate.text for candidate in candidates],
+            )
+            candidates = [candidates[item["position"]] for item in reranked]
+        candidates = candidates[:top_n]
+        ranked: List[Dict[str, Any]] = []
+
+        for batch_number, offset in enumerate(range(0, len(candidates), batch_size), start=1):
+            batch = candidates[offset : offset + batch_size]
+            results = await self._executor.run(
+                self._qa_service.answer_batch,
+                [(question, candidate.text) for candidate in batch],
+            )
+            answers = sorted(
+                (
+                    {
+                        "article": candidate.article,
+                        "retrieval_score": candidate.retrieval_score,
+                        "score": float(result.get("score", 0.0)),
+                        "answer": result.get("answer", ""),
+                        "start": result.get("start"),
+                        "end": result.get("end"),
+                    }
+                    for candidate, result in zip(batch, results)
+                ),
+                key=lambda item: item["score"],
+                reverse=True,
+            )
+            ranked.extend(answers)
+            yield {"type": "answers", "batch": batch_number, "answers": answers}
+
+        ranked.sort(key=lambda item: item["score"], reverse=True)
+        yield {
+            "type": "done",
+            "ranking": [
+                {"article": item["article"], "score": item["score"], "answer": item["answer"]}
+                for item in ranked
+            ],
+        }
+
+    def _retrieve(self, question: str, top_n: int) -> List[_Candidate]:
+        # Vectors whose article is no longer in the dataset have nothing to read.
+        return [
+            _Candidate(
+                article=hit["id"],
+                text=self._articles[hit["id"]],
+                retrieval_score=float(hit["score"]),
+            )
+            for hit in self._vector_store.search(question, k=top_n)
+            if hit["id"] in self._articles
+        ]
@@ -0,0 +1,585 @@
+"""In-process graph storage implementing the ``Neo4jGraphStorage`` interface.
+
+Nodes live in a dict keyed by id with adjacency dicts for outgoing and
+incoming relationships, a label index, an exact-match property index and a
+character-trigram index that narrows substring search to candidate nodes.
+The whole graph is snapshotted to a single file (msgpack when installed,
+JSON otherwise) and reloaded on start, which is enough for tests,
+benchmarks and single-node deployments without a Neo4j server.
+
+Each process holds its own copy of the graph, so a snapshot has exactly
+one owner: opening it takes an exclusive lock on ``<snapshot>.lock`` and a
+second process (e.g. another uvicorn worker) fails instead of silently
+overwriting the first one's writes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.services.graph_planning import (
+    CHILD_IDS_PROPERTY,
+    FINGERPRINT_PROPERTY,
+    MAX_SUBGRAPH_DEPTH,
+    WrittenState,
+    decode_subgraph,
+    deserialize_properties,
+    public_properties,
+    sanitize_label,
+    sanitize_properties,
+)
+
+try:  # pragma: no cover - optional dependency
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:  # pragma: no cover - not available on Windows
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+EdgeKey = Tuple[str, str]  # (relationship type, other node id)
+
+# Property values indexed for exact lookups; long free text is only scanned.
+_MAX_INDEXED_VALUE_LENGTH = 128
+# Search needles shorter than one gram scan the (label) candidates instead.
+_GRAM_SIZE = 3
+
+
+class EmbeddedGraphLockedError(RuntimeError):
+    """Raised when another process already owns the embedded graph snapshot."""
+
+
+class EmbeddedGraphStorage:
+    """Thread-safe in-memory property graph with snapshot persistence.
+
+    Nodes are keyed by ``id`` alone (one label per node), mirroring how this
+    service always MERGEs on ``{id}`` with a single label.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[str] = None,
+        *,
+        autosave_interval_seconds: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._snapshot_path = snapshot_path
+        self._autosave_interval = autosave_interval_seconds
+        self._logger = logger or LOGGER
+        self._lock = threading.RLock()
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._out: Dict[str, Dict[EdgeKey, Dict[str, Any]]] = defaultdict(dict)
+        self._in: Dict[str, Set[EdgeKey]] = defaultdict(set)
+        self._label_index: Dict[str, Set[str]] = defaultdict(set)
+        self._property_index: Dict[Tuple[str, Any], Set[str]] = defaultdict(set)
+        self._gram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._dirty = False
+        self._last_saved = time.monotonic()
+        self._snapshot_lock = _lock_snapshot(snapshot_path) if snapshot_path else None
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+
+    # ---------------------------------------------------------------------
+    # lifecycle helpers
+    # ---------------------------------------------------------------------
+    def close(self) -> None:
+        # Request-scoped services share one process-wide instance; flushing
+        # happens on the autosave interval and at shutdown instead.
+        return None
+
+    def release(self) -> None:
+        """Flush and give up ownership of the snapshot; used at shutdown."""
+
+        self.flush()
+        with self._lock:
+            if self._snapshot_lock is not None:
+                self._snapshot_lock.close()
+                self._snapshot_lock = None
+
+    def flush(self) -> bool:
+        """Write a snapshot if anything changed since the last one."""
+
+        with self._lock:
+            if not self._dirty or not self._snapshot_path:
+                return False
+            self.save_snapshot(self._snapshot_path)
+            return True
+
+    def save_snapshot(self, path: str) -> None:
+        # Property maps are shallow-copied under the lock. ``flush`` holds the
+        # same (re-entrant) lock around this call, so on the autosave and
+        # shutdown paths writers also wait while the snapshot is encoded.
+        with self._lock:
+            payload = {
+                "nodes": [
+                    {"id": node_id, "label": node["label"], "properties": dict(node["properties"])}
+                    for node_id, node in self._nodes.items()
+                ],
+                "edges": [
+                    {"source": source, "type": rel_type, "target": target, "properties": dict(props)}
+                    for source, edges in self._out.items()
+                    for (rel_type, target), props in edges.items()
+                ],
+            }
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as handle:
+            if msgpack is not None:
+                handle.write(msgpack.packb(payload, use_bin_type=True, default=str))
+            else:
+                handle.write(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+        # Atomic rename so a crash mid-write never leaves a truncated snapshot.
+        os.replace(temporary, path)
+
+    def load_snapshot(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        if raw[:1] in (b"{", b"["):
+            payload = json.loads(raw.decode("utf-8"))
+        elif msgpack is not None:
+            payload = msgpack.unpackb(raw, raw=False)
+        else:
+            raise RuntimeError(
+                f"Graph snapshot {path} is msgpack-encoded; install msgpack to load it"
+            )
+
+        with self._lock:
+            for node in payload.get("nodes", []):
+                self._put_node(node["id"], node["label"], node["properties"], touch=False)
+            for edge in payload.get("edges", []):
+                self._put_edge(
+                    edge["source"], edge["target"], edge["type"], edge["properties"], touch=False
+                )
+            self._dirty = False
+        self._logger.info(
+            "Loaded embedded graph snapshot %s (%d nodes)", path, len(self._nodes)
+        )
+
+    # ------------------------------------------------------------------
+    # public operations
+    # ------------------------------------------------------------------
+    def add_node(
+        self,
+        node_id: str,
+        *,
+        label: str = "Entity",
+        properties: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            self._put_node(node_id, label, properties or {})
+        self._maybe_autosave()
+
+    def add_edge(
+        self,
+        source_id: str,
+        target_id: str,
+        *,
+        relationship_type: str = "RELATED_TO",
+        source_label: str = "Entity",
+        target_label: str = "Entity",
+        properties: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            self._put_edge(source_id, target_id, relationship_type, properties or {})
+        self._maybe_autosave()
+
+    def bulk_write(
+        self,
+        nodes: Sequence[Dict[str, Any]],
+        edges: Sequence[Dict[str, Any]] = (),
+        *,
+        stale_children: Sequence[Dict[str, Any]] = (),
+        chunk_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self._lock:
+            for node in nodes:
+                self._put_node(node["id"], node.get("label"), node.get("properties") or {})
+            for edge in edges:
+                self._put_edge(
+                    edge["source_id"],
+                    edge["target_id"],
+                    edge.get("relationship_type") or "RELATED_TO",
+                    edge.get("properties") or {},
+                )
+            for row in stale_children:
+                self._delete_stale_children(
+                    row["parent_id"], row["child_ids"], row.get("keep_ids") or ()
+                )
+        elapsed = time.perf_counter() - started
+        self._maybe_autosave()
+
+        row_count = len(nodes) + len(edges)
+        return {
+            "nodes": len(nodes),
+            "edges": len(edges),
+            "transactions": 1,
+            "seconds": elapsed,
+            "rows_per_second": row_count / elapsed if elapsed > 0 else float(row_count),
+        }
+
+    def fetch_fingerprints(self, nodes: Sequence[Dict[str, Any]]) -> Dict[str, WrittenState]:
+        states: Dict[str, WrittenState] = {}
+        with self._lock:
+            for node in nodes:
+                stored = self._nodes.get(node["id"])
+                if stored and stored["properties"].get(FINGERPRINT_PROPERTY):
+                    properties = stored["properties"]
+                    states[node["id"]] = (
+                        properties[FINGERPRINT_PROPERTY],
+                        list(properties.get(CHILD_IDS_PROPERTY) or []),
+                    )
+        return states
+
+    def ensure_fulltext_index(self) -> str:
+        # The trigram index is maintained on every write; there is nothing to manage.
+        return "unchanged"
+
+    def find(self, key: str, value: Any, *, label: Optional[str] = None) -> List[str]:
+        """Ids of nodes whose property ``key`` equals ``value`` (exact match)."""
+
+        with self._lock:
+            ids = set(self._property_index.get((key, _index_value(value)), ()))
+            if label is not None:
+                ids &= self._label_index.get(sanitize_label(label), set())
+            return sorted(ids)
+
+    def search(
+        self,
+        query: str,
+        *,
+        label: Optional[str] = None,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Case-insensitive substring match over property values, best matches first.
+
+        The score is the number of property values containing the query. Only
+        nodes holding every trigram of the query are checked.
+        """
+
+        needle = query.lower()
+        with self._lock:
+            candidates = self._gram_candidates(needle)
+            if label:
+                label_ids = self._label_index.get(sanitize_label(label), set())
+                candidates = label_ids if candidates is None else candidates & label_ids
+            elif candidates is None:
+                candidates = self._nodes.keys()
+            scored: List[Tuple[int, str]] = []
+            for node_id in candidates:
+                properties = self._nodes[node_id]["properties"]
+                score = sum(
+                    needle in str(value).lower()
+                    for value in public_properties(properties).values()
+                )
+                if score:
+                    scored.append((score, node_id))
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            return [
+                {
+                    "id": node_id,
+                    "labels": [self._nodes[node_id]["label"]],
+                    "properties": public_properties(
+                        deserialize_properties(dict(self._nodes[node_id]["properties"]))
+                    ),
+                    "score": float(score),
+                }
+                for score, node_id in scored[offset : offset + limit]
+            ]
+
+    def get_subgraph(
+        self,
+        ids: Sequence[str],
+        *,
+        depth: int = 1,
+        rel_types: Optional[Sequence[str]] = None,
+        limit: int = 500,
+        root_label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        depth = min(max(int(depth), 1), MAX_SUBGRAPH_DEPTH)
+        allowed = {sanitize_label(rel_type) for rel_type in rel_types or ()}
+        label = sanitize_label(root_label) if root_label else None
+
+        with self._lock:
+            roots = [
+                node_id
+                for node_id in dict.fromkeys(ids)
+                if node_id in self._nodes
+                and (label is None or self._nodes[node_id]["label"] == label)
+            ]
+            # Breadth-first over relationships in both directions, one hop per
+            # level like the Neo4j query, stopping once ``limit`` nodes are seen.
+            seen: Dict[str, int] = {node_id: 0 for node_id in roots[:limit]}
+            frontier = deque(seen)
+            while frontier and len(seen) < limit:
+                node_id = frontier.popleft()
+                if seen[node_id] >= depth:
+                    continue
+                for rel_type, neighbour in self._neighbours(node_id):
+                    if allowed and rel_type not in allowed:
+                        continue
+                    if neighbour not in seen and len(seen) < limit:
+                        seen[neighbour] = seen[node_id] + 1
+                        frontier.append(neighbour)
+
+            included = list(seen)
+            members = set(included)
+            edges = [
+                (source, target, rel_type, props)
+                for source in included
+                for (rel_type, target), props in self._out.get(source, {}).items()
+                if target in members and (not allowed or rel_type in allowed)
+            ]
+            return decode_subgraph(
+                {
+                    "node_ids": included,
+                    "node_labels": [[self._nodes[node_id]["label"]] for node_id in included],
+                    "node_properties": [
+                        self._nodes[node_id]["properties"] for node_id in included
+                    ],
+                    "edge_sources": [edge[0] for edge in edges],
+                    "edge_targets": [edge[1] for edge in edges],
+                    "edge_types": [edge[2] for edge in edges],
+                    "edge_properties": [edge[3] for edge in edges],
+                }
+            )
+
+    def health_check(self) -> bool:
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "nodes": len(self._nodes),
+                "edges": sum(len(edges) for edges in self._out.values()),
+                "labels": {label: len(ids) for label, ids in self._label_index.items()},
+                "dirty": self._dirty,
+            }
+
+    # ------------------------------------------------------------------
+    # internal mutations (callers hold the lock)
+    # ------------------------------------------------------------------
+    def _put_node(
+        self,
+        node_id: str,
+        label: Optional[str],
+        properties: Dict[str, Any],
+        *,
+        touch: bool = True,
+    ) -> None:
+        safe_label = sanitize_label(label)
+        node = self._nodes.get(node_id)
+        if node is None:
+            node = {"label": safe_label, "properties": {"id": node_id}}
+            self._nodes[node_id] = node
+            self._label_index[safe_label].add(node_id)
+        elif node["label"] != safe_label:
+            # SET n:NewLabel on the single-label model: move it between indexes.
+            self._discard_label(node_id, node["label"])
+            node["label"] = safe_label
+            self._label_index[safe_label].add(node_id)
+            if touch:
+                self._dirty = True
+        self._unindex_properties(node_id, node["properties"])
+        # SET n += props semantics: merge into the existing property map.
+        node["properties"].update(sanitize_properties(properties))
+        node["properties"]["id"] = node_id
+        if touch:
+            node["properties"]["updated_at"] = _now()
+            self._dirty = True
+        self._index_properties(node_id, node["properties"])
+
+    def _put_edge(
+        self,
+        source_id: str,
+        target_id: str,
+        relationship_type: str,
+        properties: Dict[str, Any],
+        *,
+        touch: bool = True,
+    ) -> None:
+        # MATCH (a), (b) ... MERGE: edges to unknown nodes are not created.
+        if source_id not in self._nodes or target_id not in self._nodes:
+            return
+        rel_type = sanitize_label(relationship_type)
+        props = self._out[source_id].setdefault((rel_type, target_id), {})
+        props.update(sanitize_properties(properties))
+        if touch:
+            props["updated_at"] = _now()
+            self._dirty = True
+        self._in[target_id].add((rel_type, source_id))
+
+    def _delete_stale_children(
+        self, parent_id: str, child_ids: Iterable[str], keep_ids: Iterable[str]
+    ) -> None:
+        keep = set(keep_ids)
+        outgoing = self._out.get(parent_id, {})
+        for child_id in child_ids:
+            keys = [key for key in outgoing if key[1] == child_id]
+            if not keys:
+                continue
+            # The parent's relationship always goes; the child only once orphaned.
+            for rel_type, _ in keys:
+                del outgoing[(rel_type, child_id)]
+                self._in[child_id].discard((rel_type, parent_id))
+            self._dirty = True
+            if child_id not in keep and not self._in.get(child_id):
+                self._delete_node(child_id)
+
+    def _delete_node(self, node_id: str) -> None:
+        node = self._nodes.pop(node_id)
+        self._discard_label(node_id, node["label"])
+        self._unindex_properties(node_id, node["properties"])
+        for rel_type, target in self._out.pop(node_id, {}):
+            self._in[target].discard((rel_type, node_id))
+        for rel_type, source in self._in.pop(node_id, set()):
+            self._out[source].pop((rel_type, node_id), None)
+        self._dirty = True
+
+    def _neighbours(self, node_id: str) -> Iterable[EdgeKey]:
+        yield from self._out.get(node_id, {})
+        yield from self._in.get(node_id, ())
+
+    def _discard_label(self, node_id: str, label: str) -> None:
+        ids = self._label_index.get(label)
+        if ids is not None:
+            ids.discard(node_id)
+            if not ids:
+                del self._label_index[label]
+
+    def _gram_candidates(self, needle: str) -> Optional[Set[str]]:
+        """Nodes holding every trigram of ``needle``; ``None`` when it is too short."""
+
+        grams = _grams(needle)
+        if not grams:
+            return None
+        postings = sorted(
+            (self._gram_index.get(gram, set()) for gram in grams), key=len
+        )
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        return candidates
+
+    def _index_properties(self, node_id: str, properties: Dict[str, Any]) -> None:
+        for key, value in properties.items():
+            indexed = _index_value(value)
+            if indexed is not None:
+                self._property_index[(key, indexed)].add(node_id)
+        for gram in _property_grams(properties):
+            self._gram_index[gram].add(node_id)
+
+    def _unindex_properties(self, node_id: str, properties: Dict[str, Any]) -> None:
+        for key, value in properties.items():
+            indexed = _index_value(value)
+            if indexed is None:
+                continue
+            ids = self._property_index.get((key, indexed))
+            if ids is not None:
+                ids.discard(node_id)
+                if not ids:
+                    del self._property_index[(key, indexed)]
+        for gram in _property_grams(properties):
+            ids = self._gram_index.get(gram)
+            if ids is not None:
+                ids.discard(node_id)
+                if not ids:
+                    del self._gram_index[gram]
+
+    def _maybe_autosave(self) -> None:
+        if (
+            self._snapshot_path
+            and self._dirty
+            and time.monotonic() - self._last_saved >= self._autosave_interval
+        ):
+            self.flush()
+
+
+def _index_value(value: Any) -> Optional[Any]:
+    if isinstance(value, bool) or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and len(value) <= _MAX_INDEXED_VALUE_LENGTH:
+        return value
+    return None
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[start : start + _GRAM_SIZE] for start in range(len(text) - _GRAM_SIZE + 1)}
+
+
+def _property_grams(properties: Dict[str, Any]) -> Set[str]:
+    # Same lower-cased text ``search`` matches against.
+    grams: Set[str] = set()
+    for value in public_properties(properties).values():
+        grams |= _grams(str(value).lower())
+    return grams
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lock_snapshot(path: str) -> Optional[Any]:
+    """Take the exclusive, process-lifetime lock that makes ``path`` ours."""
+
+    if fcntl is None:  # pragma: no cover - not available on Windows
+        LOGGER.warning("Cannot lock %s on this platform; run a single worker", path)
+        return None
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle = open(f"{path}.lock", "a+", encoding="utf-8")
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.seek(0)
+        owner = handle.read().strip() or "unknown"
+        handle.close()
+        raise EmbeddedGraphLockedError(
+            f"Embedded graph snapshot {path} is owned by another process (pid {owner}); "
+            "run a single worker or set GRAPH_BACKEND=neo4j"
+        ) from None
+    handle.truncate(0)
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+
+_embedded_storage: Optional[EmbeddedGraphStorage] = None
+_embedded_storage_lock = threading.Lock()
+
+
+def get_embedded_graph_storage() -> EmbeddedGraphStorage:
+    """Return the process-wide embedded graph, loading its snapshot on first use."""
+
+    global _embedded_storage
+    with _embedded_storage_lock:
+        if _embedded_storage is None:
+            _embedded_storage = EmbeddedGraphStorage(
+                settings.GRAPH_EMBEDDED_SNAPSHOT_PATH or None
+            )
+        return _embedded_storage
+
+
+def peek_embedded_graph_storage() -> Optional[EmbeddedGraphStorage]:
+    return _embedded_storage
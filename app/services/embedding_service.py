@@ -0,0 +1,260 @@
+"""Sentence embeddings with length-sorted batching and a persistent content-hash cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.model_id import resolve_model_id
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Stay well under SQLite's limit on bound parameters per statement.
+_LOOKUP_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form hashed for the cache: NFC with single spaces (case is kept)."""
+
+    normalized = unicodedata.normalize("NFC", text or "")
+    return _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingCache:
+    """Vectors keyed by ``(model id, sha256 of normalised text)``, shared by every process."""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model_id TEXT NOT NULL, text_hash TEXT NOT NULL, "
+                "dimension INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model_id, text_hash)) WITHOUT ROWID"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, model_id: str, digests: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        connection = self._connection()
+        for offset in range(0, len(digests), _LOOKUP_CHUNK):
+            chunk = digests[offset : offset + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = connection.execute(
+                "SELECT text_hash, dimension, vector FROM embeddings "
+                f"WHERE model_id = ? AND text_hash IN ({placeholders})",
+                (model_id, *chunk),
+            ).fetchall()
+            for text_hash, dimension, vector in rows:
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32, count=dimension)
+        return found
+
+    def set_many(self, model_id: str, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        rows = [
+            (model_id, digest, int(vector.shape[0]), np.asarray(vector, dtype=np.float32).tobytes())
+            for digest, vector in items
+        ]
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, text_hash, dimension, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def count(self, model_id: Optional[str] = None, *, include_options: bool = False) -> int:
+        """Rows cached for ``model_id`` (all rows when ``None``).
+
+        With ``include_options`` the rows the model encoded with extra
+        ``encode`` options (keyed ``"<model_id>|<options>"``) are counted too.
+        """
+
+        if model_id is None:
+            query, params = "SELECT COUNT(*) FROM embeddings", ()
+        elif include_options:
+            prefix = f"{model_id}|"
+            query = (
+                "SELECT COUNT(*) FROM embeddings "
+                "WHERE model_id = ? OR substr(model_id, 1, ?) = ?"
+            )
+            params = (model_id, len(prefix), prefix)
+        else:
+            query, params = "SELECT COUNT(*) FROM embeddings WHERE model_id = ?", (model_id,)
+        return int(self._connection().execute(query, params).fetchone()[0])
+
+
+class EmbeddingService:
+    """Owns one sentence-embedding model and encodes only texts it has not seen.
+
+    ``encode`` accepts the ``SentenceTransformer.encode`` arguments the code base
+    uses, so the service can stand in wherever the raw model was passed
+    around. Cache misses are sorted by length before batching so each batch
+    pads to a similar length.
+    """
+
+    def __init__(
+        self,
+        model: Any = None,
+        *,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        model_id: Optional[str] = None,
+        cache: Optional[SQLiteEmbeddingCache] = None,
+        batch_size: int = 32,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._model = model
+        self._model_name = model_name
+        self._model_id = model_id or resolve_model_id(model_name)
+        self._cache = cache
+        self._batch_size = max(batch_size, 1)
+        self._logger = logger or LOGGER
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._logger.info("Loading embedding model %s", self._model_name)
+                    self._model = SentenceTransformer(self._model_name)
+        return self._model
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        *,
+        batch_size: Optional[int] = None,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        use_cache: bool = True,
+        **encode_kwargs: Any,
+    ) -> np.ndarray:
+        """Embed ``texts`` in input order; repeated and cached texts are encoded once.
+
+        ``show_progress_bar`` and ``convert_to_numpy`` are accepted for
+        compatibility; the result is always a float32 array. Any other
+        ``encode_kwargs`` (e.g. ``normalize_embeddings``) change the vectors,
+        so they are part of the cache key. ``use_cache=False`` skips the
+        persistent cache entirely.
+        """
+
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        digests = [text_digest(text) for text in texts]
+        unique: Dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            unique.setdefault(digest, normalize_text(text))
+
+        cache = self._cache if use_cache else None
+        cache_key = _cache_model_id(self._model_id, encode_kwargs)
+        vectors: Dict[str, np.ndarray] = {}
+        if cache is not None:
+            vectors.update(cache.get_many(cache_key, list(unique)))
+        missing = [digest for digest in unique if digest not in vectors]
+
+        if missing:
+            fresh = self._encode_sorted(
+                [(digest, unique[digest]) for digest in missing],
+                batch_size or self._batch_size,
+                **encode_kwargs,
+            )
+            vectors.update(fresh)
+            if cache is not None:
+                cache.set_many(cache_key, fresh.items())
+
+        if cache is not None:
+            with self._stats_lock:
+                self._hits += len(unique) - len(missing)
+                self._misses += len(missing)
+        return np.stack([vectors[digest] for digest in digests])
+
+    def encode_query(self, text: str, **encode_kwargs: Any) -> np.ndarray:
+        """Embed one search query, bypassing the persistent cache.
+
+        Queries rarely repeat, so caching them would only grow the cache file
+        and cost a disk round trip per search.
+        """
+
+        return self.encode([text], use_cache=False, **encode_kwargs)[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                "model_id": self._model_id,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "cached": (
+                    self._cache.count(self._model_id, include_options=True)
+                    if self._cache is not None
+                    else 0
+                ),
+            }
+
+    def _encode_sorted(
+        self,
+        items: List[Tuple[str, str]],
+        batch_size: int,
+        **encode_kwargs: Any,
+    ) -> Dict[str, np.ndarray]:
+        ordered = sorted(items, key=lambda item: len(item[1]), reverse=True)
+        encoded: Dict[str, np.ndarray] = {}
+        for offset in range(0, len(ordered), batch_size):
+            batch = ordered[offset : offset + batch_size]
+            output = self.model.encode(
+                [text for _, text in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                **encode_kwargs,
+            )
+            for (digest, _), vector in zip(batch, np.asarray(output, dtype=np.float32)):
+                encoded[digest] = vector
+        return encoded
+
+
+def _cache_model_id(model_id: str, encode_kwargs: Dict[str, Any]) -> str:
+    if not encode_kwargs:
+        return model_id
+    options = json.dumps(encode_kwargs, sort_keys=True, default=str)
+    return f"{model_id}|{options}"
+
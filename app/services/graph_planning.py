@@ -0,0 +1,649 @@
+"""Cypher builders and write planning shared by the graph storages.
+
+Everything here is pure: statements are built and change-detection plans
+are computed without touching a driver, so the sync and async Neo4j
+storages (and the embedded store) only differ in how they run them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+FULLTEXT_INDEX_NAME = "legal_text_search"
+FULLTEXT_INDEXED_LABELS = (
+    "LegalArticle",
+    "LegalObligation",
+    "LegalException",
+    "LegalTimeline",
+    "ComplianceStep",
+)
+FULLTEXT_INDEXED_PROPERTIES = (
+    "article_number",
+    "summary",
+    "actor",
+    "action",
+    "timeline",
+    "description",
+    "rationale",
+)
+
+_LUCENE_SPECIAL_CHARACTERS = set('+-&|!(){}[]^"~*?:\\/')
+
+# Labels emitted by article analysis; each gets an ``id`` uniqueness constraint.
+# NER entity labels are added from ``settings.GRAPH_SCHEMA_EXTRA_LABELS``.
+SCHEMA_NODE_LABELS = (
+    "LegalArticle",
+    "LegalObligation",
+    "LegalException",
+    "LegalTimeline",
+    "ComplianceStep",
+    "Entity",
+)
+
+# Relationships linking an article to the entities extracted from it.
+ARTICLE_CONTEXT_RELATIONSHIPS = (
+    "HAS_OBLIGATION",
+    "HAS_EXCEPTION",
+    "HAS_TIMELINE",
+    "HAS_COMPLIANCE_STEP",
+)
+MAX_SUBGRAPH_DEPTH = 3
+
+# Node properties used by change detection; excluded from the fingerprint itself.
+FINGERPRINT_PROPERTY = "fingerprint"
+CHILD_IDS_PROPERTY = "child_ids"
+
+WrittenState = Tuple[Optional[str], List[str]]
+Statement = Tuple[str, Dict[str, Any]]
+
+
+def schema_labels() -> List[str]:
+    extra = [label.strip() for label in settings.GRAPH_SCHEMA_EXTRA_LABELS.split(",")]
+    return list(dict.fromkeys([*SCHEMA_NODE_LABELS, *(label for label in extra if label)]))
+
+
+FULLTEXT_INDEX_LOOKUP = (
+    "SHOW FULLTEXT INDEXES YIELD name, state, labelsOrTypes, properties, options "
+    "WHERE name = $name "
+    "RETURN state, labelsOrTypes, properties, options"
+)
+
+
+def node_merge_statement(
+    node_id: str, label: Optional[str], properties: Optional[Dict[str, Any]]
+) -> Statement:
+    props = sanitize_properties(properties or {})
+    props["id"] = node_id
+    query = (
+        f"MERGE (n:{sanitize_label(label)} {{id: $node_id}}) "
+        "SET n += $props, n.updated_at = datetime()"
+    )
+    return query, {"node_id": node_id, "props": props}
+
+
+def edge_merge_statement(
+    source_id: str,
+    target_id: str,
+    *,
+    relationship_type: str,
+    source_label: Optional[str],
+    target_label: Optional[str],
+    properties: Optional[Dict[str, Any]],
+) -> Statement:
+    query = (
+        f"MATCH (a:{sanitize_label(source_label)} {{id: $source_id}}), "
+        f"(b:{sanitize_label(target_label)} {{id: $target_id}}) "
+        f"MERGE (a)-[r:{sanitize_label(relationship_type)}]->(b) "
+        "SET r += $props, r.updated_at = datetime()"
+    )
+    return query, {
+        "source_id": source_id,
+        "target_id": target_id,
+        "props": sanitize_properties(properties or {}),
+    }
+
+
+def bulk_write_statements(
+    nodes: Sequence[Dict[str, Any]],
+    edges: Sequence[Dict[str, Any]],
+    chunk_size: int,
+    stale_children: Sequence[Dict[str, Any]] = (),
+) -> List[Statement]:
+    statements: List[Statement] = []
+
+    node_groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for node in nodes:
+        props = sanitize_properties(node.get("properties") or {})
+        props["id"] = node["id"]
+        node_groups[sanitize_label(node.get("label"))].append(
+            {"id": node["id"], "props": props}
+        )
+    for label, rows in node_groups.items():
+        query = (
+            "UNWIND $rows AS row "
+            f"MERGE (n:{label} {{id: row.id}}) "
+            "SET n += row.props, n.updated_at = datetime()"
+        )
+        statements.extend((query, {"rows": chunk}) for chunk in _chunks(rows, chunk_size))
+
+    edge_groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+    for edge in edges:
+        key = (
+            sanitize_label(edge.get("relationship_type") or "RELATED_TO"),
+            sanitize_label(edge.get("source_label")),
+            sanitize_label(edge.get("target_label")),
+        )
+        edge_groups[key].append(
+            {
+                "source_id": edge["source_id"],
+                "target_id": edge["target_id"],
+                "props": sanitize_properties(edge.get("properties") or {}),
+            }
+        )
+    for (rel_type, source_label, target_label), rows in edge_groups.items():
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (a:{source_label} {{id: row.source_id}}), "
+            f"(b:{target_label} {{id: row.target_id}}) "
+            f"MERGE (a)-[r:{rel_type}]->(b) "
+            "SET r += row.props, r.updated_at = datetime()"
+        )
+        statements.extend((query, {"rows": chunk}) for chunk in _chunks(rows, chunk_size))
+
+    stale_groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in stale_children:
+        stale_groups[sanitize_label(row.get("parent_label"))].append(
+            {
+                "parent_id": row["parent_id"],
+                "child_ids": list(row["child_ids"]),
+                "keep_ids": list(row.get("keep_ids") or []),
+            }
+        )
+    for parent_label, rows in stale_groups.items():
+        # The parent's relationship always goes; the child only once nothing
+        # else references it and the same payload does not write it again.
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (p:{parent_label} {{id: row.parent_id}})-[r]->(c) "
+            "WHERE c.id IN row.child_ids "
+            "DELETE r "
+            "WITH DISTINCT row, c "
+            "WHERE NOT c.id IN row.keep_ids AND NOT EXISTS { MATCH (c)<--() } "
+            "DETACH DELETE c"
+        )
+        statements.extend((query, {"rows": chunk}) for chunk in _chunks(rows, chunk_size))
+
+    return statements
+
+
+@lru_cache(maxsize=64)
+def subgraph_query(
+    depth: int, rel_types: Tuple[str, ...], root_labels: Tuple[str, ...]
+) -> str:
+    """Bounded subgraph read: index-backed root lookup, then one hop per level.
+
+    Each level expands only the previous level's new nodes and keeps at most
+    ``$limit`` distinct ones, so no path is ever materialized and the node
+    list never grows past ``$limit``. Edges are read between the kept nodes
+    once the expansion has finished.
+    """
+
+    rel_filter = f":{'|'.join(rel_types)}" if rel_types else ""
+    lookups = [
+        f"UNWIND $ids AS root_id MATCH (root:{label} {{id: root_id}}) RETURN root"
+        for label in root_labels
+    ]
+    # Hop counts and labels cannot be parameters, so the unrolled levels, the
+    # types and the labels are baked into a template cached per combination.
+    parts = [
+        f"CALL {{ {' UNION '.join(lookups)} }} "
+        "WITH DISTINCT root LIMIT $limit "
+        "WITH collect(root) AS nodes "
+        "WITH nodes, nodes AS frontier "
+    ]
+    for _ in range(depth):
+        parts.append(
+            "CALL { WITH nodes, frontier "
+            "UNWIND frontier AS n "
+            f"MATCH (n)-[{rel_filter}]-(m) WHERE NOT m IN nodes "
+            "WITH DISTINCT m LIMIT $limit "
+            "RETURN collect(m) AS found } "
+            "WITH nodes, found[..($limit - size(nodes))] AS found "
+            "WITH nodes + found AS nodes, found AS frontier "
+        )
+    parts.append(
+        "CALL { WITH nodes "
+        "UNWIND nodes AS a "
+        f"MATCH (a)-[r{rel_filter}]->(b) WHERE b IN nodes "
+        "RETURN collect(r) AS rels } "
+        "RETURN [n IN nodes | n.id] AS node_ids, "
+        "[n IN nodes | labels(n)] AS node_labels, "
+        "[n IN nodes | properties(n)] AS node_properties, "
+        "[r IN rels | startNode(r).id] AS edge_sources, "
+        "[r IN rels | endNode(r).id] AS edge_targets, "
+        "[r IN rels | type(r)] AS edge_types, "
+        "[r IN rels | properties(r)] AS edge_properties"
+    )
+    return "".join(parts)
+
+
+def subgraph_statement(
+    ids: Sequence[str],
+    depth: int,
+    rel_types: Optional[Sequence[str]],
+    limit: int,
+    root_label: Optional[str],
+) -> Statement:
+    depth = min(max(int(depth), 1), MAX_SUBGRAPH_DEPTH)
+    types = tuple(sorted({sanitize_label(rel_type) for rel_type in rel_types or ()}))
+    # Without a label the roots are looked up under every schema label, so the
+    # lookup stays on the id constraints instead of scanning all nodes.
+    labels = (sanitize_label(root_label),) if root_label else tuple(schema_labels())
+    query = subgraph_query(depth, types, labels)
+    return query, {"ids": list(ids), "limit": max(int(limit), 1)}
+
+
+def decode_subgraph(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Columnar subgraph: parallel lists per field instead of one dict per item."""
+
+    record = record or {}
+    return {
+        "nodes": {
+            "id": list(record.get("node_ids") or []),
+            "labels": [list(labels) for labels in record.get("node_labels") or []],
+            "properties": [
+                public_properties(properties)
+                for properties in record.get("node_properties") or []
+            ],
+        },
+        "edges": {
+            "source": list(record.get("edge_sources") or []),
+            "target": list(record.get("edge_targets") or []),
+            "type": list(record.get("edge_types") or []),
+            "properties": [dict(props) for props in record.get("edge_properties") or []],
+        },
+    }
+
+
+ID_CONSTRAINT_LOOKUP = (
+    "SHOW CONSTRAINTS YIELD type, entityType, labelsOrTypes, properties "
+    "RETURN type, entityType, labelsOrTypes, properties"
+)
+
+
+def id_constraint_statement(label: str) -> str:
+    return (
+        f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS "
+        f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+    )
+
+
+def constrained_labels(records: Iterable[Dict[str, Any]]) -> set:
+    """Labels with a single-property uniqueness (or node key) constraint on ``id``."""
+
+    labels = set()
+    for record in records:
+        # "UNIQUENESS" before Neo4j 5.7, "NODE_PROPERTY_UNIQUENESS"/"NODE_KEY" after.
+        kind = str(record.get("type") or "")
+        if "UNIQUENESS" not in kind and kind != "NODE_KEY":
+            continue
+        if record.get("entityType") not in (None, "NODE"):
+            continue
+        if list(record.get("properties") or []) == ["id"]:
+            labels.update(record.get("labelsOrTypes") or [])
+    return labels
+
+
+def fingerprint_lookup_statements(nodes: Sequence[Dict[str, Any]]) -> List[Statement]:
+    ids_by_label: Dict[str, List[str]] = defaultdict(list)
+    for node in nodes:
+        ids_by_label[sanitize_label(node.get("label"))].append(node["id"])
+    return [
+        (
+            "UNWIND $ids AS node_id "
+            f"MATCH (n:{label} {{id: node_id}}) "
+            f"RETURN n.id AS id, n.{FINGERPRINT_PROPERTY} AS fingerprint, "
+            f"n.{CHILD_IDS_PROPERTY} AS child_ids",
+            {"ids": ids},
+        )
+        for label, ids in ids_by_label.items()
+    ]
+
+
+def written_states(records: Iterable[Dict[str, Any]]) -> Dict[str, WrittenState]:
+    return {
+        record.get("id"): (record.get("fingerprint"), list(record.get("child_ids") or []))
+        for record in records
+        if record.get("fingerprint")
+    }
+
+
+def entity_fingerprint(
+    node: Dict[str, Any], outgoing_edges: Sequence[Dict[str, Any]] = ()
+) -> str:
+    """Stable hash of a node's label, properties and outgoing relationships."""
+
+    properties = public_properties(node.get("properties") or {})
+    relationships = sorted(
+        (
+            [
+                edge.get("relationship_type"),
+                edge.get("target_id"),
+                edge.get("target_label"),
+                edge.get("properties") or {},
+            ]
+            for edge in outgoing_edges
+        ),
+        key=lambda item: json.dumps(item, sort_keys=True, ensure_ascii=False, default=str),
+    )
+    payload = json.dumps(
+        {"label": node.get("label"), "properties": properties, "relationships": relationships},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plan_incremental_write(
+    nodes: Sequence[Dict[str, Any]],
+    edges: Sequence[Dict[str, Any]],
+    previous: Dict[str, WrittenState],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Drop unchanged nodes (and their outgoing edges) and find stale children.
+
+    Each written node records its fingerprint and the ids of its relationship
+    targets. When a node changes, children it pointed to last time but no
+    longer does (e.g. obligation 3 disappeared) are returned as stale; those
+    the payload still writes are listed again under ``keep_ids``.
+
+    Returns ``(nodes, edges, stale_children, skipped_count)``.
+    """
+
+    outgoing: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for edge in edges:
+        outgoing[edge["source_id"]].append(edge)
+    # A later payload for the same id supersedes an earlier one.
+    latest = {node["id"]: node for node in nodes}
+
+    changed_nodes: List[Dict[str, Any]] = []
+    changed_edges: List[Dict[str, Any]] = []
+    stale: List[Dict[str, Any]] = []
+    skipped = 0
+    for node_id, node in latest.items():
+        node_edges = outgoing.get(node_id, [])
+        fingerprint = entity_fingerprint(node, node_edges)
+        previous_fingerprint, previous_children = previous.get(node_id, (None, []))
+        if fingerprint == previous_fingerprint:
+            skipped += 1
+            continue
+
+        child_ids = sorted({edge["target_id"] for edge in node_edges})
+        properties = dict(node.get("properties") or {})
+        properties[FINGERPRINT_PROPERTY] = fingerprint
+        properties[CHILD_IDS_PROPERTY] = child_ids
+        changed_nodes.append({**node, "properties": properties})
+        changed_edges.extend(node_edges)
+
+        removed = sorted(set(previous_children) - set(child_ids))
+        if removed:
+            stale.append(
+                {
+                    "parent_id": node_id,
+                    "parent_label": node.get("label"),
+                    "child_ids": removed,
+                    "keep_ids": [child_id for child_id in removed if child_id in latest],
+                }
+            )
+    return changed_nodes, changed_edges, stale, skipped
+
+
+def bulk_write_stats(
+    nodes: Sequence[Dict[str, Any]],
+    edges: Sequence[Dict[str, Any]],
+    statements: Sequence[Statement],
+    elapsed: float,
+    logger: logging.Logger,
+) -> Dict[str, Any]:
+    row_count = len(nodes) + len(edges)
+    stats = {
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "transactions": len(statements),
+        "seconds": elapsed,
+        "rows_per_second": row_count / elapsed if elapsed > 0 else float(row_count),
+    }
+    logger.info(
+        "Bulk wrote %d nodes and %d edges in %d transactions (%.0f rows/s)",
+        stats["nodes"],
+        stats["edges"],
+        stats["transactions"],
+        stats["rows_per_second"],
+    )
+    return stats
+
+
+def graph_save_result(stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "message": "Entities and relationships saved to Knowledge Graph.",
+        "stats": stats,
+    }
+
+
+def fulltext_index_plan(
+    records: Sequence[Dict[str, Any]], analyzer: str
+) -> Tuple[str, List[Statement]]:
+    """Return the status and the statements needed to bring the index up to date."""
+
+    statements: List[Statement] = []
+    status = "created"
+    if records:
+        existing = records[0]
+        existing_analyzer = (existing.get("options") or {}).get("indexConfig", {}).get(
+            "fulltext.analyzer"
+        )
+        if (
+            set(existing.get("labelsOrTypes") or []) == set(FULLTEXT_INDEXED_LABELS)
+            and set(existing.get("properties") or []) == set(FULLTEXT_INDEXED_PROPERTIES)
+            and existing_analyzer == analyzer
+        ):
+            return "unchanged", statements
+        statements.append((f"DROP INDEX {FULLTEXT_INDEX_NAME} IF EXISTS", {}))
+        status = "migrated"
+
+    labels = "|".join(FULLTEXT_INDEXED_LABELS)
+    properties = ", ".join(f"n.{name}" for name in FULLTEXT_INDEXED_PROPERTIES)
+    statements.append(
+        (
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} IF NOT EXISTS "
+            f"FOR (n:{labels}) ON EACH [{properties}] "
+            "OPTIONS {indexConfig: {`fulltext.analyzer`: $analyzer}}",
+            {"analyzer": analyzer},
+        )
+    )
+    return status, statements
+
+
+def fulltext_index_online(
+    records: Sequence[Dict[str, Any]], statements: Sequence[Statement]
+) -> bool:
+    """Whether the index described by ``records`` can serve queries as is.
+
+    A just created or migrated index is still populating and would return
+    partial (usually empty) results.
+    """
+
+    return bool(records) and not statements and records[0].get("state") == "ONLINE"
+
+
+def fulltext_search_statement(
+    query: str, label: Optional[str], limit: int, offset: int
+) -> Statement:
+    label_filter = f"WHERE node:{sanitize_label(label)} " if label else ""
+    cypher = (
+        "CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score "
+        f"{label_filter}"
+        "RETURN labels(node) AS labels, node.id AS id, properties(node) AS props, score "
+        "ORDER BY score DESC SKIP $offset LIMIT $limit"
+    )
+    return cypher, {
+        "index": FULLTEXT_INDEX_NAME,
+        "query": _escape_lucene(query),
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+def scan_search_statement(
+    query: str, label: Optional[str], limit: int, offset: int
+) -> Statement:
+    safe_label = f":{sanitize_label(label)}" if label else ""
+    cypher = (
+        f"MATCH (n{safe_label}) "
+        "WHERE any(key IN keys(n) "
+        "WHERE toLower(toString(n[key])) CONTAINS toLower($query)) "
+        "RETURN labels(n) AS labels, n.id AS id, properties(n) AS props "
+        "SKIP $offset LIMIT $limit"
+    )
+    return cypher, {"query": query, "offset": offset, "limit": limit}
+
+
+def collect_graph_rows(
+    entities: Iterable[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Flatten entity payloads into node rows and edge rows."""
+
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    for entity in entities:
+        node_id = _coalesce_entity_id(entity)
+        label = entity.get("label") or entity.get("entity") or "Entity"
+
+        properties = {
+            key: value
+            for key, value in entity.items()
+            if key not in {"id", "entity", "label", "relationships"}
+        }
+        nodes.append({"id": node_id, "label": label, "properties": properties})
+
+        for relationship in entity.get("relationships", []):
+            target_id = _coalesce_entity_id(relationship, fallback_key="target")
+            rel_type = relationship.get("type") or "RELATED_TO"
+            target_label = (
+                relationship.get("target_label")
+                or relationship.get("label")
+                or "Entity"
+            )
+
+            rel_properties = {
+                key: value
+                for key, value in relationship.items()
+                if key
+                not in {
+                    "target",
+                    "type",
+                    "label",
+                    "target_label",
+                    "source_label",
+                    "id",
+                }
+            }
+
+            edges.append(
+                {
+                    "source_id": node_id,
+                    "target_id": target_id,
+                    "relationship_type": rel_type,
+                    "source_label": relationship.get("source_label", label),
+                    "target_label": target_label,
+                    "properties": rel_properties,
+                }
+            )
+    return nodes, edges
+
+
+def format_search_records(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for record in records:
+        node_props: Dict[str, Any] = dict(record.get("props", {}))
+        results.append(
+            {
+                "id": record.get("id"),
+                "labels": list(record.get("labels", [])),
+                "properties": public_properties(deserialize_properties(node_props)),
+            }
+        )
+    return results
+
+
+def format_scored_records(records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results = format_search_records(records)
+    for result, record in zip(results, records):
+        result["score"] = record.get("score")
+    return results
+
+
+def _escape_lucene(query: str) -> str:
+    """Escape Lucene syntax so user input is matched as plain terms."""
+
+    return "".join(
+        f"\\{char}" if char in _LUCENE_SPECIAL_CHARACTERS else char for char in query
+    )
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    size = max(size, 1)
+    for offset in range(0, len(rows), size):
+        yield rows[offset : offset + size]
+
+
+def _coalesce_entity_id(data: Dict[str, Any], *, fallback_key: str = "id") -> str:
+    for key in (fallback_key, "id", "entity", "name"):
+        value = data.get(key)
+        if value:
+            return str(value)
+    raise ValueError("Entity data must include an identifier field")
+
+
+def sanitize_label(label: Optional[str]) -> str:
+    if not label:
+        return "Entity"
+    allowed = {"_"}.union({chr(code) for code in range(ord("0"), ord("9") + 1)})
+    allowed.update(chr(code) for code in range(ord("A"), ord("Z") + 1))
+    allowed.update(chr(code) for code in range(ord("a"), ord("z") + 1))
+    cleaned = "".join(char for char in label if char in allowed)
+    if not cleaned:
+        raise ValueError(f"Invalid Cypher label: {label}")
+    return cleaned
+
+
+def public_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the change-detection bookkeeping stored on nodes."""
+
+    return {
+        key: value
+        for key, value in dict(properties).items()
+        if key not in (FINGERPRINT_PROPERTY, CHILD_IDS_PROPERTY)
+    }
+
+
+def sanitize_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    sanitized: Dict[str, Any] = {}
+    for key, value in properties.items():
+        if isinstance(value, (dict, list)):
+            sanitized[key] = value
+        else:
+            sanitized[key] = value
+    return sanitized
+
+
+def deserialize_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return properties
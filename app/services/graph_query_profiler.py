@@ -0,0 +1,201 @@
+"""Per-query-template latency, row and DB-hit statistics for Cypher execution."""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import random
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Statements that can be prefixed with PROFILE (SHOW / schema commands cannot).
+_PROFILABLE_PREFIXES = ("MATCH", "OPTIONAL MATCH", "UNWIND", "CALL DB.INDEX", "WITH")
+
+
+class _TemplateStats:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "rows", "buckets", "profiled", "db_hits")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.profiled = 0
+        self.db_hits = 0
+
+
+class GraphQueryProfiler:
+    """Aggregates Cypher timings per query template and logs slow queries.
+
+    Queries are already parameterised, so the query text itself is the
+    template. ``profile_sample_rate`` is the fraction of eligible reads run
+    under ``PROFILE`` to collect DB hits.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_query_ms: float = 200.0,
+        profile_sample_rate: float = 0.0,
+        random_source: Callable[[], float] = random.random,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._slow_query_ms = slow_query_ms
+        self._profile_sample_rate = profile_sample_rate
+        self._random = random_source
+        self._logger = logger or LOGGER
+        self._templates: Dict[str, _TemplateStats] = {}
+        self._lock = threading.Lock()
+
+    def should_profile(self, query: str) -> bool:
+        if self._profile_sample_rate <= 0:
+            return False
+        if not _normalize(query).upper().startswith(_PROFILABLE_PREFIXES):
+            return False
+        return self._random() < self._profile_sample_rate
+
+    def record(
+        self,
+        query: str,
+        seconds: float,
+        *,
+        rows: int = 0,
+        db_hits: Optional[int] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        error: bool = False,
+    ) -> None:
+        template = _normalize(query)
+        elapsed_ms = seconds * 1000.0
+        with self._lock:
+            stats = self._templates.get(template)
+            if stats is None:
+                stats = self._templates[template] = _TemplateStats()
+            stats.count += 1
+            stats.errors += int(error)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if db_hits is not None:
+                stats.profiled += 1
+                stats.db_hits += db_hits
+
+        if elapsed_ms >= self._slow_query_ms:
+            self._logger.warning(
+                "Slow Cypher query (%.1f ms, %d rows%s): %s params=%s",
+                elapsed_ms,
+                rows,
+                f", {db_hits} db hits" if db_hits is not None else "",
+                template,
+                redact_parameters(parameters or {}),
+            )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-template statistics, most total time first."""
+
+        with self._lock:
+            items = list(self._templates.items())
+            report = [
+                {
+                    "query": template,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "total_ms": stats.total_ms,
+                    "mean_ms": stats.total_ms / stats.count,
+                    "p50_ms": _percentile(stats.buckets, stats.count, 0.50, stats.max_ms),
+                    "p95_ms": _percentile(stats.buckets, stats.count, 0.95, stats.max_ms),
+                    "max_ms": stats.max_ms,
+                    "mean_rows": stats.rows / stats.count,
+                    "latency_histogram_ms": _histogram(stats.buckets),
+                    "profiled": stats.profiled,
+                    "mean_db_hits": stats.db_hits / stats.profiled if stats.profiled else None,
+                }
+                for template, stats in items
+            ]
+        report.sort(key=lambda item: item["total_ms"], reverse=True)
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+
+def redact_parameters(parameters: Dict[str, Any]) -> Dict[str, str]:
+    """Describe parameter shapes without their values (which may hold legal text)."""
+
+    redacted: Dict[str, str] = {}
+    for key, value in parameters.items():
+        if isinstance(value, (list, tuple)):
+            redacted[key] = f"<list len={len(value)}>"
+        elif isinstance(value, dict):
+            redacted[key] = f"<map keys={len(value)}>"
+        elif isinstance(value, str):
+            redacted[key] = f"<str len={len(value)}>"
+        elif value is None:
+            redacted[key] = "<null>"
+        else:
+            redacted[key] = f"<{type(value).__name__}>"
+    return redacted
+
+
+def total_db_hits(profile: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Sum ``dbHits`` over a ``ResultSummary.profile`` plan tree."""
+
+    if not profile:
+        return None
+    hits = 0
+    pending = [profile]
+    while pending:
+        operator = pending.pop()
+        hits += int(operator.get("dbHits") or 0)
+        pending.extend(operator.get("children") or [])
+    return hits
+
+
+def _normalize(query: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", query).strip()
+
+
+def _histogram(buckets: List[int]) -> Dict[str, int]:
+    labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+    return {label: count for label, count in zip(labels, buckets) if count}
+
+
+def _percentile(buckets: List[int], count: int, fraction: float, max_ms: float) -> float:
+    """Upper bound of the bucket holding the requested percentile (capped at the max)."""
+
+    threshold = fraction * count
+    seen = 0
+    for index, bucket in enumerate(buckets):
+        seen += bucket
+        if seen >= threshold and bucket:
+            if index < len(LATENCY_BUCKETS_MS):
+                return min(float(LATENCY_BUCKETS_MS[index]), max_ms)
+            break
+    return max_ms
+
+
+_profiler: Optional[GraphQueryProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_graph_query_profiler() -> GraphQueryProfiler:
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = GraphQueryProfiler(
+                slow_query_ms=settings.GRAPH_SLOW_QUERY_MS,
+                profile_sample_rate=settings.GRAPH_PROFILE_SAMPLE_RATE,
+            )
+        return _profiler
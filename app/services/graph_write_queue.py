@@ -0,0 +1,419 @@
+"""Durable write-behind queue for knowledge-graph persistence.
+
+Analysis requests enqueue the entity payloads built for the graph and return
+immediately; a background worker drains the queue in batches. Writes are
+idempotent ``MERGE`` statements keyed on entity ids, so an entry that is
+retried after a partial failure (or a worker crash) converges to the same
+graph.
+
+Each entry is written on its own, because the incremental writer deletes an
+article's stale children relative to the payload it is given; merging two
+analyses of one article would keep children the newer one removed. For the
+same reason, enqueueing an article supersedes its older queued entries,
+which are then acknowledged without being written.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# (entry id, entity payload, failed attempts, superseded by a newer entry)
+QueuedEntry = Tuple[int, List[Dict[str, Any]], int, bool]
+
+_ROOT_LABEL = "LegalArticle"
+
+
+class GraphWriteQueue:
+    """SQLite-backed FIFO of entity payloads, shared by every worker on the host.
+
+    Claimed rows carry a lease; if the claiming worker dies before acking,
+    the lease expires and another worker picks the rows up again. Entries
+    that keep failing are moved to a dead-letter table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        lease_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._lease = lease_seconds
+        self._clock = clock
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS graph_writes ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL, "
+                "enqueued_at REAL NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "next_attempt_at REAL NOT NULL, "
+                "claimed_until REAL, "
+                "last_error TEXT)"
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(graph_writes)")}
+            if "article_key" not in columns:
+                connection.execute("ALTER TABLE graph_writes ADD COLUMN article_key TEXT")
+            if "superseded" not in columns:
+                connection.execute(
+                    "ALTER TABLE graph_writes ADD COLUMN superseded INTEGER NOT NULL DEFAULT 0"
+                )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS graph_writes_ready "
+                "ON graph_writes (next_attempt_at, id)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS graph_writes_article "
+                "ON graph_writes (article_key)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS graph_writes_dead ("
+                "id INTEGER PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "enqueued_at REAL NOT NULL, "
+                "attempts INTEGER NOT NULL, "
+                "failed_at REAL NOT NULL, "
+                "last_error TEXT)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, entities: Sequence[Dict[str, Any]]) -> int:
+        """Queue one article's entities, superseding its older queued entries."""
+
+        now = self._clock()
+        key = payload_key(entities)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if key is not None:
+                # Superseded entries drain right away: they are acked unwritten.
+                connection.execute(
+                    "UPDATE graph_writes SET superseded = 1, "
+                    "next_attempt_at = MIN(next_attempt_at, ?) WHERE article_key = ?",
+                    (now, key),
+                )
+            cursor = connection.execute(
+                "INSERT INTO graph_writes (payload, enqueued_at, next_attempt_at, article_key) "
+                "VALUES (?, ?, ?, ?)",
+                (json.dumps(list(entities), ensure_ascii=False, default=str), now, now, key),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return int(cursor.lastrowid)
+
+    def claim(self, limit: int) -> List[QueuedEntry]:
+        """Lease up to ``limit`` ready entries, oldest first."""
+
+        now = self._clock()
+        connection = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front so two workers never
+        # lease the same rows.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, payload, attempts, superseded FROM graph_writes "
+                "WHERE next_attempt_at <= ? "
+                "AND (claimed_until IS NULL OR claimed_until <= ?) "
+                "ORDER BY id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE graph_writes SET claimed_until = ? WHERE id = ?",
+                [(now + self._lease, row[0]) for row in rows],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return [(row[0], json.loads(row[1]), row[2], bool(row[3])) for row in rows]
+
+    def ack(self, ids: Sequence[int]) -> None:
+        self._connection().executemany(
+            "DELETE FROM graph_writes WHERE id = ?", [(entry_id,) for entry_id in ids]
+        )
+
+    def retry(
+        self,
+        ids: Sequence[int],
+        *,
+        delay_seconds: float,
+        error: str,
+        count_attempt: bool = True,
+    ) -> None:
+        """Release ``ids`` until ``delay_seconds`` from now.
+
+        ``count_attempt=False`` is for failures that are not the entries' fault
+        (the graph being unreachable), so they do not move towards dead-lettering.
+        """
+
+        next_attempt_at = self._clock() + delay_seconds
+        self._connection().executemany(
+            "UPDATE graph_writes SET attempts = attempts + ?, next_attempt_at = ?, "
+            "claimed_until = NULL, last_error = ? WHERE id = ?",
+            [(int(count_attempt), next_attempt_at, error, entry_id) for entry_id in ids],
+        )
+
+    def dead_letter(self, entry_id: int, *, error: str) -> None:
+        """Move an entry that keeps failing out of the queue, keeping it for inspection."""
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO graph_writes_dead "
+                "(id, payload, enqueued_at, attempts, failed_at, last_error) "
+                "SELECT id, payload, enqueued_at, attempts + 1, ?, ? "
+                "FROM graph_writes WHERE id = ?",
+                (self._clock(), error, entry_id),
+            )
+            connection.execute("DELETE FROM graph_writes WHERE id = ?", (entry_id,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connection()
+        depth, oldest, retrying = connection.execute(
+            "SELECT COUNT(*), MIN(enqueued_at), SUM(attempts > 0) FROM graph_writes"
+        ).fetchone()
+        (dead,) = connection.execute("SELECT COUNT(*) FROM graph_writes_dead").fetchone()
+        return {
+            "depth": depth,
+            "retrying": retrying or 0,
+            "dead_letter": dead,
+            "lag_seconds": self._clock() - oldest if oldest is not None else 0.0,
+        }
+
+
+class GraphWriteWorker:
+    """Background thread draining a :class:`GraphWriteQueue` into the knowledge graph.
+
+    ``knowledge_graph_factory`` is called lazily (and again after a failure),
+    so the worker starts even while Neo4j is unreachable and the queue simply
+    grows until it comes back.
+
+    Entries are written one ``save_entities_and_relationships`` call each, so
+    a failing entry only delays itself. When a write fails and the graph
+    still answers its health check, the entry is retried with exponential
+    backoff and dead-lettered after ``max_attempts``; when the graph is
+    unreachable, the rest of the batch is deferred without being charged an
+    attempt.
+    """
+
+    def __init__(
+        self,
+        queue: GraphWriteQueue,
+        knowledge_graph_factory: Callable[[], Any],
+        *,
+        batch_size: int = 50,
+        poll_interval_seconds: float = 0.5,
+        base_backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 300.0,
+        max_attempts: int = 8,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._queue = queue
+        self._factory = knowledge_graph_factory
+        self._batch_size = max(batch_size, 1)
+        self._poll_interval = poll_interval_seconds
+        self._base_backoff = base_backoff_seconds
+        self._max_backoff = max_backoff_seconds
+        self._max_attempts = max(max_attempts, 1)
+        self._logger = logger or LOGGER
+        self._knowledge_graph: Optional[Any] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._written = 0
+        self._batches = 0
+        self._failures = 0
+        self._superseded = 0
+        self._dead_lettered = 0
+        self._outages = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def queue(self) -> GraphWriteQueue:
+        return self._queue
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="graph-write-worker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close_knowledge_graph()
+
+    def drain_once(self) -> int:
+        """Write one batch; returns how many queue entries were acknowledged."""
+
+        claimed = self._queue.claim(self._batch_size)
+        if not claimed:
+            return 0
+        try:
+            if self._knowledge_graph is None:
+                self._knowledge_graph = self._factory()
+        except Exception as exc:
+            self._defer(claimed, exc)
+            return 0
+
+        acknowledged = 0
+        written = 0
+        for position, (entry_id, payload, attempts, superseded) in enumerate(claimed):
+            if superseded:
+                self._queue.ack([entry_id])
+                self._superseded += 1
+                acknowledged += 1
+                continue
+            try:
+                self._knowledge_graph.save_entities_and_relationships(payload)
+            except Exception as exc:
+                if not self._graph_is_healthy():
+                    self._defer(claimed[position:], exc)
+                    break
+                self._fail_entry(entry_id, attempts, exc)
+                continue
+            self._queue.ack([entry_id])
+            self._outages = 0
+            acknowledged += 1
+            written += 1
+        if written:
+            self._written += written
+            self._batches += 1
+        return acknowledged
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._queue.stats()
+        stats.update(
+            {
+                "written": self._written,
+                "batches": self._batches,
+                "failures": self._failures,
+                "superseded": self._superseded,
+                "dead_lettered": self._dead_lettered,
+                "last_error": self._last_error,
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+        )
+        return stats
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                drained = self.drain_once()
+            except Exception:  # pragma: no cover - defensive logging
+                self._logger.exception("Graph write worker iteration failed")
+                drained = 0
+            if drained < self._batch_size:
+                self._stop.wait(self._poll_interval)
+
+    def _fail_entry(self, entry_id: int, attempts: int, exc: Exception) -> None:
+        self._failures += 1
+        self._last_error = str(exc)
+        if attempts + 1 >= self._max_attempts:
+            self._logger.error(
+                "Graph write of queue entry %d failed %d times; dead-lettering it: %s",
+                entry_id,
+                attempts + 1,
+                exc,
+            )
+            self._queue.dead_letter(entry_id, error=str(exc))
+            self._dead_lettered += 1
+            return
+        delay = min(self._base_backoff * (2**attempts), self._max_backoff)
+        self._logger.warning(
+            "Graph write of queue entry %d failed (retry in %.1fs): %s", entry_id, delay, exc
+        )
+        self._queue.retry([entry_id], delay_seconds=delay, error=str(exc))
+
+    def _defer(self, entries: Sequence[QueuedEntry], exc: Exception) -> None:
+        """Back off the whole batch while the graph is unreachable."""
+
+        delay = min(self._base_backoff * (2**self._outages), self._max_backoff)
+        self._outages += 1
+        self._failures += 1
+        self._last_error = str(exc)
+        self._logger.warning(
+            "Knowledge graph unavailable; deferring %d queued entries by %.1fs: %s",
+            len(entries),
+            delay,
+            exc,
+        )
+        self._queue.retry(
+            [entry[0] for entry in entries],
+            delay_seconds=delay,
+            error=str(exc),
+            count_attempt=False,
+        )
+        self._close_knowledge_graph()
+
+    def _graph_is_healthy(self) -> bool:
+        health_check = getattr(self._knowledge_graph, "health_check", None)
+        if not callable(health_check):
+            return True
+        try:
+            return bool(health_check())
+        except Exception:
+            return False
+
+    def _close_knowledge_graph(self) -> None:
+        if self._knowledge_graph is None:
+            return
+        try:
+            self._knowledge_graph.close()
+        except Exception:  # pragma: no cover - defensive logging
+            pass
+        self._knowledge_graph = None
+
+
+_worker: Optional[GraphWriteWorker] = None
+
+
+def set_graph_write_worker(worker: Optional[GraphWriteWorker]) -> None:
+    global _worker
+    _worker = worker
+
+
+def get_graph_write_worker() -> Optional[GraphWriteWorker]:
+    return _worker
+
+
+def payload_key(entities: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """Id of the article a queued payload describes, if it names one."""
+
+    for entity in entities:
+        if entity.get("label") == _ROOT_LABEL and entity.get("id"):
+            return str(entity["id"])
+    return None
@@ -1,7 +1,286 @@
-# Placeholder for hybrid search, vector DB, or graph DB logic if needed in the future.
+"""Hybrid retrieval: run several retrievers concurrently and fuse them per article."""
 
+from __future__ import annotations
 
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any, Tuple
-import numpy as np
-from datetime import datetime
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# ``(query, k) -> hits``; a hit is a dict with at least an ``id``, best first.
+Retriever = Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+# ``(query, fused results) -> (reordered results, stage statistics)``
+RerankStage = Callable[
+    [str, List[Dict[str, Any]]], Awaitable[Tuple[List[Dict[str, Any]], Dict[str, Any]]]
+]
+
+FUSION_METHODS = ("rrf", "weighted")
+DEFAULT_RRF_K = 60
+
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+_ARTICLE_PREFIX_PATTERN = re.compile(r"^(?:article::|มาตรา)\s*")
+_LANGUAGE_SUFFIX_PATTERN = re.compile(r"_[a-z]{2}$")
+
+
+def article_key(hit: Dict[str, Any]) -> str:
+    """Identify the article a hit belongs to, whichever retriever produced it.
+
+    Graph nodes (``article::43_1_th`` and children such as
+    ``43_1_th::obligation::2``), vector ids and dataset titles (``มาตรา ๔๓/๑``)
+    all map to ``"43/1"``. Hits that name no article keep their own id.
+    """
+
+    for container in (hit.get("metadata"), hit.get("properties"), hit):
+        if isinstance(container, Mapping) and container.get("article_number"):
+            return _normalize_article_number(str(container["article_number"]))
+
+    raw = str(hit.get("id", ""))
+    stripped = _ARTICLE_PREFIX_PATTERN.sub("", raw)
+    if stripped != raw or "::" in raw:
+        slug = _LANGUAGE_SUFFIX_PATTERN.sub("", stripped.split("::", 1)[0])
+        return _normalize_article_number(slug.replace("_", "/"))
+    return raw
+
+
+class HybridSearchService:
+    """Fuses lexical, vector and graph retrieval into one ranked list of articles.
+
+    Retrievers run concurrently; one that fails or times out is reported in
+    the stage timings and the rest are still fused. Each source contributes
+    only its best hit per article, so an article is never counted twice.
+    An optional ``reranker`` reorders the fused list before pagination.
+    """
+
+    def __init__(
+        self,
+        retrievers: Mapping[str, Retriever],
+        *,
+        fusion: str = "rrf",
+        weights: Optional[Mapping[str, float]] = None,
+        rrf_k: int = DEFAULT_RRF_K,
+        candidate_k: int = 50,
+        timeout_seconds: Optional[float] = None,
+        reranker: Optional[RerankStage] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if not retrievers:
+            raise ValueError("HybridSearchService needs at least one retriever")
+        _check_fusion(fusion)
+        self._retrievers = dict(retrievers)
+        self._fusion = fusion
+        self._weights = dict(weights or {})
+        self._rrf_k = rrf_k
+        self._candidate_k = candidate_k
+        self._timeout = timeout_seconds
+        self._reranker = reranker
+        self._logger = logger or LOGGER
+
+    async def search(
+        self,
+        query: str,
+        *,
+        page: int = 1,
+        page_size: int = 10,
+        fusion: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        fusion = fusion or self._fusion
+        _check_fusion(fusion)
+        page = max(page, 1)
+        page_size = max(page_size, 1)
+        started = time.perf_counter()
+        depth = max(self._candidate_k, page * page_size)
+
+        names = list(self._retrievers)
+        outcomes = await asyncio.gather(
+            *(self._run_retriever(name, query, depth) for name in names)
+        )
+        stages = {name: stage for name, (_, stage) in zip(names, outcomes)}
+        rankings = {name: hits for name, (hits, _) in zip(names, outcomes)}
+
+        fusion_started = time.perf_counter()
+        fused = self._fuse(rankings, fusion)
+        fusion_ms = (time.perf_counter() - fusion_started) * 1000.0
+        timings: Dict[str, Any] = {"stages": stages, "fusion_ms": fusion_ms}
+
+        if self._reranker is not None and fused:
+            fused, timings["rerank"] = await self._rerank(query, fused)
+
+        start = (page - 1) * page_size
+        timings["total_ms"] = (time.perf_counter() - started) * 1000.0
+        return {
+            "query": query,
+            "fusion": fusion,
+            "total": len(fused),
+            "page": page,
+            "page_size": page_size,
+            "results": fused[start : start + page_size],
+            "timings": timings,
+        }
+
+    async def _run_retriever(
+        self, name: str, query: str, k: int
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        started = time.perf_counter()
+        stage: Dict[str, Any] = {}
+        hits: List[Dict[str, Any]] = []
+        try:
+            hits = await asyncio.wait_for(self._retrievers[name](query, k), self._timeout)
+        except asyncio.TimeoutError:
+            stage["error"] = f"timed out after {self._timeout:.2f}s"
+            self._logger.warning("Hybrid search retriever %s timed out", name)
+        except Exception as exc:
+            stage["error"] = str(exc)
+            self._logger.warning("Hybrid search retriever %s failed: %s", name, exc)
+        stage["ms"] = (time.perf_counter() - started) * 1000.0
+        stage["hits"] = len(hits)
+        return hits, stage
+
+    async def _rerank(
+        self, query: str, fused: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return await self._reranker(query, fused)
+        except Exception as exc:
+            # Reranking only refines the order; fall back to the fused ranking.
+            self._logger.warning("Hybrid search rerank failed: %s", exc)
+            return fused, {"error": str(exc), "ms": (time.perf_counter() - started) * 1000.0}
+
+    def _fuse(
+        self, rankings: Mapping[str, List[Dict[str, Any]]], fusion: str
+    ) -> List[Dict[str, Any]]:
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, hits in rankings.items():
+            weight = self._weights.get(source, 1.0)
+            best = _best_hit_per_article(hits)
+            normalized = _min_max([hit.get("score") for _, hit in best]) if fusion == "weighted" else []
+            for rank, (key, hit) in enumerate(best, start=1):
+                if fusion == "rrf":
+                    contribution = weight / (self._rrf_k + rank)
+                else:
+                    contribution = weight * normalized[rank - 1]
+                entry = fused.get(key)
+                if entry is None:
+                    entry = fused[key] = {
+                        "article": key,
+                        "score": 0.0,
+                        "best_rank": rank,
+                        "sources": {},
+                        "metadata": {},
+                    }
+                entry["score"] += contribution
+                entry["best_rank"] = min(entry["best_rank"], rank)
+                entry["sources"][source] = {
+                    "id": hit.get("id"),
+                    "rank": rank,
+                    "score": hit.get("score"),
+                }
+                for field in ("metadata", "properties"):
+                    if isinstance(hit.get(field), Mapping):
+                        for name, value in hit[field].items():
+                            entry["metadata"].setdefault(name, value)
+
+        results = sorted(
+            fused.values(),
+            key=lambda entry: (-entry["score"], entry["best_rank"], entry["article"]),
+        )
+        for entry in results:
+            del entry["best_rank"]
+        return results
+
+
+def _best_hit_per_article(hits: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    seen = set()
+    best: List[Tuple[str, Dict[str, Any]]] = []
+    for hit in hits:
+        key = article_key(hit)
+        if key and key not in seen:
+            seen.add(key)
+            best.append((key, hit))
+    return best
+
+
+def _min_max(scores: List[Any]) -> List[float]:
+    """Scale one source's scores to [0, 1]; rank decides where scores are missing."""
+
+    if not scores:
+        return []
+    if any(score is None for score in scores):
+        count = len(scores)
+        return [1.0 - index / count for index in range(count)]
+    values = [float(score) for score in scores]
+    low, high = min(values), max(values)
+    if high == low:
+        return [1.0] * len(values)
+    return [(value - low) / (high - low) for value in values]
+
+
+def _normalize_article_number(value: str) -> str:
+    value = _ARTICLE_PREFIX_PATTERN.sub("", value.strip()).translate(_THAI_DIGITS)
+    return re.sub(r"\s+", "", value)
+
+
+def _check_fusion(fusion: str) -> None:
+    if fusion not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {fusion!r}; expected one of {FUSION_METHODS}")
+
+
+def graph_retriever(knowledge_graph_service: Any) -> Retriever:
+    """Retriever over ``AsyncKnowledgeGraphService.search`` (full-text or scan)."""
+
+    async def retrieve(query: str, k: int) -> List[Dict[str, Any]]:
+        response = await knowledge_graph_service.search(query, limit=k)
+        return list(response.get("results", []))
+
+    return retrieve
+
+
+def bm25_retriever(bm25_index: Any, executor: Any) -> Retriever:
+    """Retriever over the BM25 index; tokenizing and scoring run on the inference executor."""
+
+    async def retrieve(query: str, k: int) -> List[Dict[str, Any]]:
+        return await executor.run(bm25_index.search, query, k)
+
+    return retrieve
+
+
+def vector_retriever(vector_store_service: Any, executor: Any) -> Retriever:
+    """Retriever embedding the query and searching on the inference executor."""
+
+    async def retrieve(query: str, k: int) -> List[Dict[str, Any]]:
+        return await executor.run(vector_store_service.search, query, k)
+
+    return retrieve
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse ``"bm25=1.0,vector=0.8"`` into a weight per retriever."""
+
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def article_texts_by_key(articles: Mapping[str, str]) -> Dict[str, str]:
+    """Index dataset articles (titled ``มาตรา ...``) by :func:`article_key`."""
+
+    return {article_key({"id": title}): text for title, text in articles.items()}
+
+
+def cross_encoder_stage(reranker: Any, executor: Any, article_texts: Mapping[str, str]) -> RerankStage:
+    """Rerank stage scoring fused results against their article text on the inference executor."""
+
+    async def rerank(
+        query: str, results: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        texts = [article_texts.get(result["article"]) for result in results]
+        return await executor.run(reranker.rerank, query, results, texts)
+
+    return rerank
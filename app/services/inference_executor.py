@@ -0,0 +1,164 @@
+"""Dedicated, bounded executor for blocking model and graph calls."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InferenceOverloadedError(RuntimeError):
+    """Raised when the executor queue is full; surfaced to clients as HTTP 503."""
+
+
+class InferenceExecutor:
+    """Runs blocking inference off the event loop on a sized thread pool.
+
+    At most ``max_workers`` calls compute concurrently and at most
+    ``max_queue_depth`` more may wait; anything beyond that is rejected
+    immediately instead of piling up latency.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        max_queue_depth: int = 64,
+        torch_threads: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue_depth < 0:
+            raise ValueError("max_queue_depth must not be negative")
+        self._max_workers = max_workers
+        self._max_queue_depth = max_queue_depth
+        self._logger = logger or LOGGER
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._queue_wait_seconds = 0.0
+        self._compute_seconds = 0.0
+
+        self._torch_threads = _configure_torch_threads(torch_threads, self._logger)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self._in_flight >= self._max_workers + self._max_queue_depth:
+                self._rejected += 1
+                raise InferenceOverloadedError(
+                    "Inference queue is full, please retry shortly."
+                )
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+        submitted = time.perf_counter()
+        call = functools.partial(self._timed_call, fn, submitted, *args, **kwargs)
+        try:
+            future = self._pool.submit(call)
+        except BaseException:
+            self._release()
+            raise
+        # Release the slot when the thread finishes, not when the caller stops
+        # waiting: a cancelled request must not free a slot that is still computing.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _timed_call(
+        self, fn: Callable[..., T], submitted: float, *args: Any, **kwargs: Any
+    ) -> T:
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._queue_wait_seconds += started - submitted
+                self._compute_seconds += finished - started
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._completed + self._failed
+            return {
+                "max_workers": self._max_workers,
+                "max_queue_depth": self._max_queue_depth,
+                "torch_threads": self._torch_threads,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self._max_workers, 0),
+                "peak_in_flight": self._peak_in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "mean_queue_wait_ms": (
+                    self._queue_wait_seconds / calls * 1000.0 if calls else 0.0
+                ),
+                "mean_compute_ms": (
+                    self._compute_seconds / calls * 1000.0 if calls else 0.0
+                ),
+            }
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+def _configure_torch_threads(
+    torch_threads: Optional[int], logger: logging.Logger
+) -> Optional[int]:
+    """Size torch's intra-op pool so workers do not oversubscribe the CPU.
+
+    The setting is process-wide: every pool thread shares the same intra-op
+    pool, so ``max_workers * torch_threads`` should not exceed the core count.
+    """
+
+    try:
+        import torch
+    except ImportError:
+        return None
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+        logger.info("torch intra-op threads set to %d", torch_threads)
+    return torch.get_num_threads()
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def set_inference_executor(executor: Optional[InferenceExecutor]) -> None:
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor()
+        return _executor
@@ -3,18 +3,124 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Iterable, List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from neo4j import Driver, GraphDatabase
+from neo4j import Driver, GraphDatabase, Session
 from neo4j.exceptions import AuthError, Neo4jError, ServiceUnavailable
 
 from app.core.config import settings
+from app.services.embedded_graph import get_embedded_graph_storage
+from app.services.graph_planning import (
+    FULLTEXT_INDEX_LOOKUP,
+    FULLTEXT_INDEX_NAME,
+    FULLTEXT_INDEXED_LABELS,
+    ID_CONSTRAINT_LOOKUP,
+    WrittenState,
+    bulk_write_statements,
+    bulk_write_stats,
+    collect_graph_rows,
+    constrained_labels,
+    decode_subgraph,
+    edge_merge_statement,
+    fingerprint_lookup_statements,
+    format_scored_records,
+    format_search_records,
+    fulltext_index_online,
+    fulltext_index_plan,
+    fulltext_search_statement,
+    graph_save_result,
+    id_constraint_statement,
+    node_merge_statement,
+    plan_incremental_write,
+    sanitize_label,
+    scan_search_statement,
+    schema_labels,
+    subgraph_statement,
+    written_states,
+)
+from app.services.graph_query_profiler import (
+    GraphQueryProfiler,
+    get_graph_query_profiler,
+    total_db_hits,
+)
 
 LOGGER = logging.getLogger(__name__)
 
 
-class Neo4jGraphStorage:
-    """Thin wrapper around the Neo4j driver providing graph operations."""
+class FulltextIndexState:
+    """Whether a database's full-text index was last seen ONLINE by this process.
+
+    Until it is, searches fall back to the property scan, and at most one
+    request per backoff interval rechecks the index (re-creating it if it is
+    missing) instead of every request running the index DDL.
+    """
+
+    def __init__(
+        self,
+        *,
+        retry_seconds: float = 30.0,
+        max_retry_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._retry_seconds = retry_seconds
+        self._max_retry_seconds = max_retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._online = False
+        self._failures = 0
+        self._next_check = 0.0
+
+    @property
+    def online(self) -> bool:
+        return self._online
+
+    def claim_check(self) -> bool:
+        """Return True if the caller should recheck the index now.
+
+        Claiming pushes the next check out, so concurrent requests do not all
+        recheck at once.
+        """
+
+        with self._lock:
+            now = self._clock()
+            if self._online or now < self._next_check:
+                return False
+            self._next_check = now + self._delay()
+            return True
+
+    def record(self, online: bool) -> None:
+        with self._lock:
+            self._online = online
+            if online:
+                self._failures = 0
+                return
+            self._next_check = self._clock() + self._delay()
+            self._failures += 1
+
+    def _delay(self) -> float:
+        return min(self._retry_seconds * 2**self._failures, self._max_retry_seconds)
+
+
+_FULLTEXT_STATES: Dict[Tuple[str, Optional[str]], FulltextIndexState] = {}
+_FULLTEXT_STATES_LOCK = threading.Lock()
+
+
+def fulltext_index_state(uri: str, database: Optional[str]) -> FulltextIndexState:
+    """Process-wide index state per (uri, database), shared by the sync and async storages."""
+
+    with _FULLTEXT_STATES_LOCK:
+        return _FULLTEXT_STATES.setdefault((uri, database), FulltextIndexState())
+
+
+class Neo4jDriverPool:
+    """Application-scoped Neo4j driver whose connection pool is shared by all storages.
+
+    Request-scoped storages borrow sessions through :meth:`session`, which also
+    keeps the usage counters reported by the health endpoint.
+    """
 
     def __init__(
         self,
@@ -23,14 +129,29 @@ class Neo4jGraphStorage:
         user: Optional[str] = None,
         password: Optional[str] = None,
         database: Optional[str] = None,
+        max_connection_pool_size: int = 50,
+        connection_acquisition_timeout: float = 60.0,
+        max_connection_lifetime: float = 3600.0,
         logger: Optional[logging.Logger] = None,
     ) -> None:
         self._uri = uri
         self._user = user
         self._password = password
         self._database = database
+        self._max_connection_pool_size = max_connection_pool_size
+        self._connection_acquisition_timeout = connection_acquisition_timeout
+        self._max_connection_lifetime = max_connection_lifetime
         self._logger = logger or LOGGER
-        self._driver: Driver = self._create_driver()
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._acquisitions = 0
+        self._busy_seconds = 0.0
+        self.driver: Driver = self._create_driver()
+
+    @property
+    def database(self) -> Optional[str]:
+        return self._database
 
     # ---------------------------------------------------------------------
     # lifecycle helpers
@@ -39,14 +160,19 @@ class Neo4jGraphStorage:
         auth = None
         if self._user and self._password:
             auth = (self._user, self._password)
+        pool_config = {
+            "max_connection_pool_size": self._max_connection_pool_size,
+            "connection_acquisition_timeout": self._connection_acquisition_timeout,
+            "max_connection_lifetime": self._max_connection_lifetime,
+        }
 
         try:
-            driver = GraphDatabase.driver(self._uri, auth=auth)
+            driver = GraphDatabase.driver(self._uri, auth=auth, **pool_config)
             # Verify connectivity eagerly to fail fast during startup.
             driver.verify_connectivity()
             return driver
         except AttributeError:
-            driver = GraphDatabase.driver(self._uri, auth=auth)
+            driver = GraphDatabase.driver(self._uri, auth=auth, **pool_config)
             with driver.session(database=self._database) as session:
                 session.run("RETURN 1").consume()
             return driver
@@ -58,8 +184,90 @@ class Neo4jGraphStorage:
             raise
 
     def close(self) -> None:
-        if self._driver:
-            self._driver.close()
+        if self.driver:
+            self.driver.close()
+
+    # ------------------------------------------------------------------
+    # public operations
+    # ------------------------------------------------------------------
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        with self._lock:
+            self._in_use += 1
+            self._acquisitions += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        started = time.perf_counter()
+        try:
+            with self.driver.session(database=self._database) as session:
+                yield session
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_connection_pool_size": self._max_connection_pool_size,
+                "connection_acquisition_timeout": self._connection_acquisition_timeout,
+                "max_connection_lifetime": self._max_connection_lifetime,
+                "sessions_in_use": self._in_use,
+                "peak_sessions_in_use": self._peak_in_use,
+                "session_acquisitions": self._acquisitions,
+                "mean_session_ms": (
+                    self._busy_seconds / self._acquisitions * 1000.0
+                    if self._acquisitions
+                    else 0.0
+                ),
+            }
+
+
+class Neo4jGraphStorage:
+    """Thin wrapper around the Neo4j driver providing graph operations.
+
+    Pass ``driver_pool`` to borrow sessions from an application-scoped driver;
+    otherwise the storage creates (and closes) a driver of its own.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        *,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        database: Optional[str] = None,
+        write_chunk_size: int = 500,
+        fulltext_analyzer: str = "thai",
+        driver_pool: Optional[Neo4jDriverPool] = None,
+        profiler: Optional[GraphQueryProfiler] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._uri = uri
+        self._user = user
+        self._password = password
+        self._database = database
+        self._write_chunk_size = write_chunk_size
+        self._fulltext_analyzer = fulltext_analyzer
+        self._logger = logger or LOGGER
+        self._owns_pool = driver_pool is None
+        self._pool = driver_pool or Neo4jDriverPool(
+            uri,
+            user=user,
+            password=password,
+            database=database,
+            logger=self._logger,
+        )
+        self._driver: Driver = self._pool.driver
+        self._fulltext_state = fulltext_index_state(uri, database)
+        self._profiler = profiler or get_graph_query_profiler()
+
+    # ---------------------------------------------------------------------
+    # lifecycle helpers
+    # ---------------------------------------------------------------------
+    def close(self) -> None:
+        # A borrowed pool belongs to the application and outlives this storage.
+        if self._owns_pool and self._pool:
+            self._pool.close()
 
     def __del__(self) -> None:  # pragma: no cover - non deterministic
         try:
@@ -77,16 +285,8 @@ class Neo4jGraphStorage:
         label: str = "Entity",
         properties: Optional[Dict[str, Any]] = None,
     ) -> None:
-        safe_label = _sanitize_label(label)
-        props = _sanitize_properties(properties or {})
-        props["id"] = node_id
-
-        query = (
-            f"MERGE (n:{safe_label} {{id: $node_id}}) "
-            "SET n += $props, n.updated_at = datetime()"
-        )
-
-        self._execute_write(query, node_id=node_id, props=props)
+        query, parameters = node_merge_statement(node_id, label, properties)
+        self._execute_write(query, **parameters)
 
     def add_edge(
         self,
@@ -98,24 +298,77 @@ class Neo4jGraphStorage:
         target_label: str = "Entity",
         properties: Optional[Dict[str, Any]] = None,
     ) -> None:
-        safe_rel = _sanitize_label(relationship_type)
-        safe_source_label = _sanitize_label(source_label)
-        safe_target_label = _sanitize_label(target_label)
-        props = _sanitize_properties(properties or {})
-
-        query = (
-            f"MATCH (a:{safe_source_label} {{id: $source_id}}), "
-            f"(b:{safe_target_label} {{id: $target_id}}) "
-            f"MERGE (a)-[r:{safe_rel}]->(b) "
-            "SET r += $props, r.updated_at = datetime()"
+        query, parameters = edge_merge_statement(
+            source_id,
+            target_id,
+            relationship_type=relationship_type,
+            source_label=source_label,
+            target_label=target_label,
+            properties=properties,
         )
+        self._execute_write(query, **parameters)
 
-        self._execute_write(
-            query,
-            source_id=source_id,
-            target_id=target_id,
-            props=props,
+    def bulk_write(
+        self,
+        nodes: Sequence[Dict[str, Any]],
+        edges: Sequence[Dict[str, Any]] = (),
+        *,
+        stale_children: Sequence[Dict[str, Any]] = (),
+        chunk_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Write many nodes and edges with one ``UNWIND`` MERGE per group and chunk.
+
+        Nodes are grouped by label and edges by (type, source label, target
+        label) so each statement can name its labels statically. Every chunk of
+        ``chunk_size`` rows is one transaction; all chunks share one session.
+        ``stale_children`` rows (see :func:`plan_incremental_write`) are
+        deleted in the same session after the upserts.
+        """
+
+        statements = bulk_write_statements(
+            nodes, edges, chunk_size or self._write_chunk_size, stale_children
         )
+        started = time.perf_counter()
+        self._execute_write_batches(statements)
+        return bulk_write_stats(
+            nodes, edges, statements, time.perf_counter() - started, self._logger
+        )
+
+    def fetch_fingerprints(self, nodes: Sequence[Dict[str, Any]]) -> Dict[str, WrittenState]:
+        """Return the fingerprint and child ids stored on each of ``nodes``.
+
+        Always read from Neo4j: other workers write the same graph, so only the
+        stored state can justify skipping a write.
+        """
+
+        states: Dict[str, WrittenState] = {}
+        for query, parameters in fingerprint_lookup_statements(nodes):
+            states.update(written_states(self._execute_read(query, **parameters)))
+        return states
+
+    def ensure_fulltext_index(self) -> str:
+        """Create the managed full-text index, or migrate it if its definition drifted.
+
+        Returns ``"created"``, ``"migrated"`` or ``"unchanged"``. Searches use
+        the index only once Neo4j reports it ONLINE.
+        """
+
+        records = list(
+            self._execute_read(FULLTEXT_INDEX_LOOKUP, name=FULLTEXT_INDEX_NAME)
+        )
+        status, statements = fulltext_index_plan(records, self._fulltext_analyzer)
+        for query, parameters in statements:
+            self._execute_write(query, **parameters)
+        online = fulltext_index_online(records, statements)
+        self._fulltext_state.record(online)
+        if statements:
+            self._logger.info("Full-text index %s %s", FULLTEXT_INDEX_NAME, status)
+        if not online:
+            self._logger.info(
+                "Full-text index %s is not ONLINE yet; searches scan until it is",
+                FULLTEXT_INDEX_NAME,
+            )
+        return status
 
     def search(
         self,
@@ -123,29 +376,98 @@ class Neo4jGraphStorage:
         *,
         label: Optional[str] = None,
         limit: int = 25,
+        offset: int = 0,
     ) -> List[Dict[str, Any]]:
-        safe_label = f":{_sanitize_label(label)}" if label else ""
-
-        cypher = (
-            f"MATCH (n{safe_label}) "
-            "WHERE any(key IN keys(n) "
-            "WHERE toLower(toString(n[key])) CONTAINS toLower($query)) "
-            "RETURN labels(n) AS labels, n.id AS id, properties(n) AS props "
-            "LIMIT $limit"
-        )
+        """Search nodes by text, ranked by full-text score where the index covers them.
+
+        Labels outside ``FULLTEXT_INDEXED_LABELS``, or an index that is not
+        ONLINE, fall back to the property scan.
+        """
+
+        if label is None or label in FULLTEXT_INDEXED_LABELS:
+            try:
+                if self._fulltext_online():
+                    return self._search_fulltext(
+                        query, label=label, limit=limit, offset=offset
+                    )
+            except Neo4jError as exc:
+                self._fulltext_state.record(False)
+                self._logger.warning(
+                    "Full-text search unavailable, falling back to scan: %s", exc
+                )
+        return self._search_scan(query, label=label, limit=limit, offset=offset)
 
-        records = self._execute_read(cypher, query=query, limit=limit)
-        results: List[Dict[str, Any]] = []
-        for record in records:
-            node_props: Dict[str, Any] = dict(record.get("props", {}))
-            results.append(
-                {
-                    "id": record.get("id"),
-                    "labels": list(record.get("labels", [])),
-                    "properties": _deserialize_properties(node_props),
-                }
-            )
-        return results
+    def _fulltext_online(self) -> bool:
+        if self._fulltext_state.claim_check():
+            self.ensure_fulltext_index()
+        return self._fulltext_state.online
+
+    def _search_fulltext(
+        self, query: str, *, label: Optional[str], limit: int, offset: int
+    ) -> List[Dict[str, Any]]:
+        cypher, parameters = fulltext_search_statement(query, label, limit, offset)
+        return format_scored_records(self._execute_read(cypher, **parameters))
+
+    def _search_scan(
+        self, query: str, *, label: Optional[str], limit: int, offset: int
+    ) -> List[Dict[str, Any]]:
+        cypher, parameters = scan_search_statement(query, label, limit, offset)
+        return format_search_records(self._execute_read(cypher, **parameters))
+
+    def get_subgraph(
+        self,
+        ids: Sequence[str],
+        *,
+        depth: int = 1,
+        rel_types: Optional[Sequence[str]] = None,
+        limit: int = 500,
+        root_label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Fetch the nodes within ``depth`` hops of ``ids`` and the edges between them.
+
+        One query regardless of how many roots are requested; see
+        :func:`decode_subgraph` for the columnar result layout.
+        """
+
+        if not ids:
+            return decode_subgraph(None)
+        cypher, parameters = subgraph_statement(ids, depth, rel_types, limit, root_label)
+        records = list(self._execute_read(cypher, **parameters))
+        return decode_subgraph(records[0] if records else None)
+
+    def ensure_schema(self, labels: Sequence[str]) -> Dict[str, str]:
+        """Idempotently create an ``id`` uniqueness constraint per label.
+
+        Returns ``{label: "exists" | "created" | "failed"}``. Creation fails
+        when existing data already holds duplicate ids for a label.
+        """
+
+        labels = [sanitize_label(label) for label in labels]
+        existing = constrained_labels(self._execute_read(ID_CONSTRAINT_LOOKUP))
+        statuses: Dict[str, str] = {}
+        for label in labels:
+            if label in existing:
+                statuses[label] = "exists"
+                continue
+            try:
+                self._execute_write(id_constraint_statement(label))
+                statuses[label] = "created"
+            except Neo4jError as exc:
+                statuses[label] = "failed"
+                self._logger.error("Could not create id constraint for %s: %s", label, exc)
+        created = [label for label, status in statuses.items() if status == "created"]
+        if created:
+            self._logger.info("Created id uniqueness constraints for %s", ", ".join(created))
+        return statuses
+
+    def verify_schema(self, labels: Sequence[str]) -> Dict[str, Any]:
+        """Report which labels lack an ``id`` uniqueness constraint."""
+
+        existing = constrained_labels(self._execute_read(ID_CONSTRAINT_LOOKUP))
+        missing = [
+            label for label in (sanitize_label(label) for label in labels) if label not in existing
+        ]
+        return {"ok": not missing, "missing": missing}
 
     def health_check(self) -> bool:
         try:
@@ -158,135 +480,237 @@ class Neo4jGraphStorage:
     # execution helpers
     # ------------------------------------------------------------------
     def _execute_write(self, query: str, **parameters: Any) -> None:
-        try:
-            with self._driver.session(database=self._database) as session:
-                session.execute_write(lambda tx: tx.run(query, **parameters).consume())
-        except Neo4jError as exc:
-            self._logger.exception("Neo4j write failed: %s", exc)
-            raise
+        self._execute_write_batches([(query, parameters)])
 
-    def _execute_read(self, query: str, **parameters: Any) -> Iterable[Dict[str, Any]]:
+    def _execute_write_batches(
+        self, statements: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> None:
+        if not statements:
+            return
+        with self._pool.session() as session:
+            for query, parameters in statements:
+                started = time.perf_counter()
+                try:
+                    session.execute_write(
+                        lambda tx, query=query, parameters=parameters: tx.run(
+                            query, **parameters
+                        ).consume()
+                    )
+                except Neo4jError as exc:
+                    self._profiler.record(
+                        query,
+                        time.perf_counter() - started,
+                        parameters=parameters,
+                        error=True,
+                    )
+                    self._logger.exception("Neo4j write failed: %s", exc)
+                    raise
+                self._profiler.record(
+                    query,
+                    time.perf_counter() - started,
+                    rows=len(parameters.get("rows") or ()),
+                    parameters=parameters,
+                )
+
+    def _execute_read(self, query: str, **parameters: Any) -> List[Any]:
+        profile = self._profiler.should_profile(query)
+        started = time.perf_counter()
         try:
-            with self._driver.session(database=self._database) as session:
-                result = session.execute_read(lambda tx: tx.run(query, **parameters))
-                return list(result)
+            with self._pool.session() as session:
+                records, db_hits = session.execute_read(
+                    _read_records, f"PROFILE {query}" if profile else query, parameters
+                )
         except Neo4jError as exc:
+            self._profiler.record(
+                query, time.perf_counter() - started, parameters=parameters, error=True
+            )
             self._logger.exception("Neo4j read failed: %s", exc)
             raise
+        self._profiler.record(
+            query,
+            time.perf_counter() - started,
+            rows=len(records),
+            db_hits=db_hits if profile else None,
+            parameters=parameters,
+        )
+        return records
+
+
+def _read_records(tx: Any, query: str, parameters: Dict[str, Any]) -> Tuple[List[Any], Optional[int]]:
+    # Records must be drained inside the transaction function.
+    result = tx.run(query, **parameters)
+    records = list(result)
+    return records, total_db_hits(result.consume().profile)
 
 
 class KnowledgeGraphService:
     """Facade exposing business-level graph operations."""
 
-    def __init__(self, graph_storage: Optional[Neo4jGraphStorage] = None) -> None:
+    def __init__(
+        self,
+        graph_storage: Optional[Neo4jGraphStorage] = None,
+        *,
+        change_detection: Optional[bool] = None,
+    ) -> None:
+        if change_detection is None:
+            change_detection = settings.GRAPH_CHANGE_DETECTION_ENABLED
+        self._change_detection = change_detection
         if graph_storage is None:
-            graph_storage = Neo4jGraphStorage(
-                settings.NEO4J_URI,
-                user=settings.NEO4J_USER,
-                password=settings.NEO4J_PASSWORD,
-                database=settings.NEO4J_DATABASE,
-            )
+            graph_storage = create_graph_storage_from_settings()
         self.graph_storage = graph_storage
 
     def save_entities_and_relationships(
         self, entities: Iterable[Dict[str, Any]]
     ) -> Dict[str, Any]:
-        for entity in entities:
-            node_id = _coalesce_entity_id(entity)
-            label = entity.get("label") or entity.get("entity") or "Entity"
-
-            properties = {
-                key: value
-                for key, value in entity.items()
-                if key not in {"id", "entity", "label", "relationships"}
-            }
+        nodes, edges = collect_graph_rows(entities)
 
-            self.graph_storage.add_node(
-                node_id,
-                label=label,
-                properties=properties,
+        bulk_write = getattr(self.graph_storage, "bulk_write", None)
+        fetch_fingerprints = getattr(self.graph_storage, "fetch_fingerprints", None)
+        if callable(bulk_write) and self._change_detection and callable(fetch_fingerprints):
+            nodes, edges, stale, skipped = plan_incremental_write(
+                nodes, edges, fetch_fingerprints(nodes)
             )
-
-            for relationship in entity.get("relationships", []):
-                target_id = _coalesce_entity_id(relationship, fallback_key="target")
-                rel_type = relationship.get("type") or "RELATED_TO"
-                source_label = label
-                target_label = (
-                    relationship.get("target_label")
-                    or relationship.get("label")
-                    or "Entity"
+            stats = bulk_write(nodes, edges, stale_children=stale)
+            stats["skipped"] = skipped
+        elif callable(bulk_write):
+            stats = bulk_write(nodes, edges)
+        else:
+            for node in nodes:
+                self.graph_storage.add_node(
+                    node["id"],
+                    label=node["label"],
+                    properties=node["properties"],
                 )
-
-                rel_properties = {
-                    key: value
-                    for key, value in relationship.items()
-                    if key
-                    not in {
-                        "target",
-                        "type",
-                        "label",
-                        "target_label",
-                        "source_label",
-                        "id",
-                    }
-                }
-
+            for edge in edges:
                 self.graph_storage.add_edge(
-                    node_id,
-                    target_id,
-                    relationship_type=rel_type,
-                    source_label=relationship.get("source_label", source_label),
-                    target_label=target_label,
-                    properties=rel_properties,
+                    edge["source_id"],
+                    edge["target_id"],
+                    relationship_type=edge["relationship_type"],
+                    source_label=edge["source_label"],
+                    target_label=edge["target_label"],
+                    properties=edge["properties"],
                 )
-
-        return {
-            "status": "success",
-            "message": "Entities and relationships saved to Knowledge Graph.",
-        }
+            stats = {"nodes": len(nodes), "edges": len(edges)}
+        return graph_save_result(stats)
 
     def search(
-        self, query: str, *, label: Optional[str] = None, limit: int = 25
+        self,
+        query: str,
+        *,
+        label: Optional[str] = None,
+        limit: int = 25,
+        offset: int = 0,
     ) -> Dict[str, Any]:
-        records = self.graph_storage.search(query, label=label, limit=limit)
+        records = self.graph_storage.search(
+            query, label=label, limit=limit, offset=offset
+        )
         return {"count": len(records), "results": records}
 
-    def health_check(self) -> bool:
-        return self.graph_storage.health_check()
-
-    def close(self) -> None:
-        self.graph_storage.close()
-
+    def get_subgraph(
+        self,
+        ids: Sequence[str],
+        *,
+        depth: int = 1,
+        rel_types: Optional[Sequence[str]] = None,
+        limit: int = 500,
+        root_label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return self.graph_storage.get_subgraph(
+            ids, depth=depth, rel_types=rel_types, limit=limit, root_label=root_label
+        )
 
-def _coalesce_entity_id(data: Dict[str, Any], *, fallback_key: str = "id") -> str:
-    for key in (fallback_key, "id", "entity", "name"):
-        value = data.get(key)
-        if value:
-            return str(value)
-    raise ValueError("Entity data must include an identifier field")
+    def ensure_search_indexes(self) -> Optional[str]:
+        ensure = getattr(self.graph_storage, "ensure_fulltext_index", None)
+        return ensure() if callable(ensure) else None
 
+    def ensure_schema(self) -> Optional[Dict[str, str]]:
+        ensure = getattr(self.graph_storage, "ensure_schema", None)
+        return ensure(schema_labels()) if callable(ensure) else None
 
-def _sanitize_label(label: Optional[str]) -> str:
-    if not label:
-        return "Entity"
-    allowed = {"_"}.union({chr(code) for code in range(ord("0"), ord("9") + 1)})
-    allowed.update(chr(code) for code in range(ord("A"), ord("Z") + 1))
-    allowed.update(chr(code) for code in range(ord("a"), ord("z") + 1))
-    cleaned = "".join(char for char in label if char in allowed)
-    if not cleaned:
-        raise ValueError(f"Invalid Cypher label: {label}")
-    return cleaned
+    def verify_schema(self) -> Dict[str, Any]:
+        verify = getattr(self.graph_storage, "verify_schema", None)
+        if not callable(verify):
+            return {"ok": True, "missing": []}
+        return verify(schema_labels())
 
+    def health_check(self) -> bool:
+        return self.graph_storage.health_check()
 
-def _sanitize_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
-    sanitized: Dict[str, Any] = {}
-    for key, value in properties.items():
-        if isinstance(value, (dict, list)):
-            sanitized[key] = value
-        else:
-            sanitized[key] = value
-    return sanitized
+    def close(self) -> None:
+        self.graph_storage.close()
 
 
-def _deserialize_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
-    return properties
+_shared_pool: Optional[Neo4jDriverPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def create_graph_storage_from_settings() -> Any:
+    """Storage for ``settings.GRAPH_BACKEND``: ``"neo4j"`` or ``"embedded"``."""
+
+    if settings.GRAPH_BACKEND == "embedded":
+        return get_embedded_graph_storage()
+    if settings.GRAPH_BACKEND != "neo4j":
+        raise ValueError(f"Unsupported GRAPH_BACKEND: {settings.GRAPH_BACKEND!r}")
+    return Neo4jGraphStorage(
+        settings.NEO4J_URI,
+        user=settings.NEO4J_USER,
+        password=settings.NEO4J_PASSWORD,
+        database=settings.NEO4J_DATABASE,
+        write_chunk_size=settings.NEO4J_WRITE_CHUNK_SIZE,
+        fulltext_analyzer=settings.NEO4J_FULLTEXT_ANALYZER,
+        driver_pool=get_shared_driver_pool(),
+    )
+
+
+def pool_budget_from_settings() -> Tuple[int, int]:
+    """Split ``NEO4J_MAX_POOL_SIZE`` into ``(sync, async)`` driver pool sizes.
+
+    Each worker runs both drivers, so together they must stay within the one
+    connection budget the database was sized for.
+    """
+
+    total = max(settings.NEO4J_MAX_POOL_SIZE, 2)
+    share = min(max(settings.NEO4J_ASYNC_POOL_SHARE, 0.0), 1.0)
+    async_size = min(max(round(total * share), 1), total - 1)
+    return total - async_size, async_size
+
+
+def create_driver_pool_from_settings() -> Neo4jDriverPool:
+    return Neo4jDriverPool(
+        settings.NEO4J_URI,
+        user=settings.NEO4J_USER,
+        password=settings.NEO4J_PASSWORD,
+        database=settings.NEO4J_DATABASE,
+        max_connection_pool_size=pool_budget_from_settings()[0],
+        connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+    )
+
+
+def set_shared_driver_pool(pool: Optional[Neo4jDriverPool]) -> None:
+    global _shared_pool
+    with _shared_pool_lock:
+        _shared_pool = pool
+
+
+def get_shared_driver_pool() -> Neo4jDriverPool:
+    """Return the worker's driver pool, creating it on first use if startup could not."""
+
+    global _shared_pool
+    pool = _shared_pool
+    if pool is not None:
+        return pool
+    # Creating the pool verifies connectivity, which can block for the full
+    # connection timeout; do it outside the lock so other threads are not held up.
+    created = create_driver_pool_from_settings()
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = created
+            return created
+        pool = _shared_pool
+    created.close()
+    return pool
+
+
+def peek_shared_driver_pool() -> Optional[Neo4jDriverPool]:
+    return _shared_pool
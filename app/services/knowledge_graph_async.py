@@ -0,0 +1,492 @@
+"""Asyncio variant of the Neo4j knowledge graph storage and service.
+
+Built on ``neo4j.AsyncGraphDatabase`` so graph I/O awaits on the event loop
+instead of pinning a threadpool thread per in-flight query. The Cypher and
+write planning come from :mod:`app.services.graph_planning`, shared with
+:mod:`app.services.knowledge_graph`.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncSession
+from neo4j.exceptions import Neo4jError, ServiceUnavailable
+
+from app.core.config import settings
+from app.services.embedded_graph import get_embedded_graph_storage
+from app.services.graph_planning import (
+    FULLTEXT_INDEX_LOOKUP,
+    FULLTEXT_INDEX_NAME,
+    FULLTEXT_INDEXED_LABELS,
+    Statement,
+    WrittenState,
+    bulk_write_statements,
+    bulk_write_stats,
+    collect_graph_rows,
+    decode_subgraph,
+    edge_merge_statement,
+    fingerprint_lookup_statements,
+    format_scored_records,
+    format_search_records,
+    fulltext_index_online,
+    fulltext_index_plan,
+    fulltext_search_statement,
+    graph_save_result,
+    node_merge_statement,
+    plan_incremental_write,
+    scan_search_statement,
+    subgraph_statement,
+    written_states,
+)
+from app.services.graph_query_profiler import (
+    GraphQueryProfiler,
+    get_graph_query_profiler,
+    total_db_hits,
+)
+from app.services.knowledge_graph import fulltext_index_state, pool_budget_from_settings
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncNeo4jDriverPool:
+    """Async counterpart of :class:`~app.services.knowledge_graph.Neo4jDriverPool`.
+
+    Keeps the same session counters so the health endpoint can report both
+    pools side by side.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        *,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        database: Optional[str] = None,
+        max_connection_pool_size: int = 50,
+        connection_acquisition_timeout: float = 60.0,
+        max_connection_lifetime: float = 3600.0,
+        driver: Optional[AsyncDriver] = None,
+    ) -> None:
+        self._database = database
+        self._max_connection_pool_size = max_connection_pool_size
+        self._connection_acquisition_timeout = connection_acquisition_timeout
+        self._max_connection_lifetime = max_connection_lifetime
+        # stats() is read from the threadpool by the sync health endpoint.
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._acquisitions = 0
+        self._busy_seconds = 0.0
+        auth = (user, password) if user and password else None
+        self.driver: AsyncDriver = driver or AsyncGraphDatabase.driver(
+            uri,
+            auth=auth,
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime,
+        )
+
+    @property
+    def database(self) -> Optional[str]:
+        return self._database
+
+    async def verify_connectivity(self) -> None:
+        await self.driver.verify_connectivity()
+
+    async def close(self) -> None:
+        await self.driver.close()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        with self._lock:
+            self._in_use += 1
+            self._acquisitions += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        started = time.perf_counter()
+        try:
+            async with self.driver.session(database=self._database) as session:
+                yield session
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_connection_pool_size": self._max_connection_pool_size,
+                "connection_acquisition_timeout": self._connection_acquisition_timeout,
+                "max_connection_lifetime": self._max_connection_lifetime,
+                "sessions_in_use": self._in_use,
+                "peak_sessions_in_use": self._peak_in_use,
+                "session_acquisitions": self._acquisitions,
+                "mean_session_ms": (
+                    self._busy_seconds / self._acquisitions * 1000.0
+                    if self._acquisitions
+                    else 0.0
+                ),
+            }
+
+
+class AsyncNeo4jGraphStorage:
+    """Async counterpart of :class:`~app.services.knowledge_graph.Neo4jGraphStorage`.
+
+    Pass ``driver_pool`` to borrow the application's async driver (and its
+    connection pool); otherwise the storage creates and closes its own.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        *,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        database: Optional[str] = None,
+        write_chunk_size: int = 500,
+        fulltext_analyzer: str = "thai",
+        driver_pool: Optional[AsyncNeo4jDriverPool] = None,
+        profiler: Optional[GraphQueryProfiler] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._uri = uri
+        self._database = database
+        self._write_chunk_size = write_chunk_size
+        self._fulltext_analyzer = fulltext_analyzer
+        self._logger = logger or LOGGER
+        self._owns_pool = driver_pool is None
+        self._pool = driver_pool or AsyncNeo4jDriverPool(
+            uri, user=user, password=password, database=database
+        )
+        self._fulltext_state = fulltext_index_state(uri, database)
+        self._profiler = profiler or get_graph_query_profiler()
+
+    async def close(self) -> None:
+        # A borrowed pool belongs to the application and outlives this storage.
+        if self._owns_pool:
+            await self._pool.close()
+
+    # ------------------------------------------------------------------
+    # public operations
+    # ------------------------------------------------------------------
+    async def add_node(
+        self,
+        node_id: str,
+        *,
+        label: str = "Entity",
+        properties: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        query, parameters = node_merge_statement(node_id, label, properties)
+        await self._execute_write(query, **parameters)
+
+    async def add_edge(
+        self,
+        source_id: str,
+        target_id: str,
+        *,
+        relationship_type: str = "RELATED_TO",
+        source_label: str = "Entity",
+        target_label: str = "Entity",
+        properties: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        query, parameters = edge_merge_statement(
+            source_id,
+            target_id,
+            relationship_type=relationship_type,
+            source_label=source_label,
+            target_label=target_label,
+            properties=properties,
+        )
+        await self._execute_write(query, **parameters)
+
+    async def bulk_write(
+        self,
+        nodes: Sequence[Dict[str, Any]],
+        edges: Sequence[Dict[str, Any]] = (),
+        *,
+        stale_children: Sequence[Dict[str, Any]] = (),
+        chunk_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        statements = bulk_write_statements(
+            nodes, edges, chunk_size or self._write_chunk_size, stale_children
+        )
+        started = time.perf_counter()
+        await self._execute_write_batches(statements)
+        return bulk_write_stats(
+            nodes, edges, statements, time.perf_counter() - started, self._logger
+        )
+
+    async def fetch_fingerprints(
+        self, nodes: Sequence[Dict[str, Any]]
+    ) -> Dict[str, WrittenState]:
+        states: Dict[str, WrittenState] = {}
+        for query, parameters in fingerprint_lookup_statements(nodes):
+            states.update(written_states(await self._execute_read(query, **parameters)))
+        return states
+
+    async def ensure_fulltext_index(self) -> str:
+        records = await self._execute_read(
+            FULLTEXT_INDEX_LOOKUP, name=FULLTEXT_INDEX_NAME
+        )
+        status, statements = fulltext_index_plan(records, self._fulltext_analyzer)
+        await self._execute_write_batches(statements)
+        online = fulltext_index_online(records, statements)
+        self._fulltext_state.record(online)
+        if statements:
+            self._logger.info("Full-text index %s %s", FULLTEXT_INDEX_NAME, status)
+        if not online:
+            self._logger.info(
+                "Full-text index %s is not ONLINE yet; searches scan until it is",
+                FULLTEXT_INDEX_NAME,
+            )
+        return status
+
+    async def search(
+        self,
+        query: str,
+        *,
+        label: Optional[str] = None,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        if label is None or label in FULLTEXT_INDEXED_LABELS:
+            try:
+                if self._fulltext_state.claim_check():
+                    await self.ensure_fulltext_index()
+                if self._fulltext_state.online:
+                    cypher, parameters = fulltext_search_statement(
+                        query, label, limit, offset
+                    )
+                    return format_scored_records(
+                        await self._execute_read(cypher, **parameters)
+                    )
+            except Neo4jError as exc:
+                self._fulltext_state.record(False)
+                self._logger.warning(
+                    "Full-text search unavailable, falling back to scan: %s", exc
+                )
+        cypher, parameters = scan_search_statement(query, label, limit, offset)
+        return format_search_records(await self._execute_read(cypher, **parameters))
+
+    async def get_subgraph(
+        self,
+        ids: Sequence[str],
+        *,
+        depth: int = 1,
+        rel_types: Optional[Sequence[str]] = None,
+        limit: int = 500,
+        root_label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        if not ids:
+            return decode_subgraph(None)
+        cypher, parameters = subgraph_statement(ids, depth, rel_types, limit, root_label)
+        records = await self._execute_read(cypher, **parameters)
+        return decode_subgraph(records[0] if records else None)
+
+    async def health_check(self) -> bool:
+        try:
+            await self._execute_read("RETURN 1 AS ok")
+            return True
+        except (ServiceUnavailable, Neo4jError):
+            return False
+
+    # ------------------------------------------------------------------
+    # execution helpers
+    # ------------------------------------------------------------------
+    async def _execute_write(self, query: str, **parameters: Any) -> None:
+        await self._execute_write_batches([(query, parameters)])
+
+    async def _execute_write_batches(self, statements: Sequence[Statement]) -> None:
+        if not statements:
+            return
+
+        async def _run(tx, query: str, parameters: Dict[str, Any]) -> None:
+            result = await tx.run(query, **parameters)
+            await result.consume()
+
+        async with self._pool.session() as session:
+            for query, parameters in statements:
+                started = time.perf_counter()
+                try:
+                    await session.execute_write(_run, query, parameters)
+                except Neo4jError as exc:
+                    self._profiler.record(
+                        query,
+                        time.perf_counter() - started,
+                        parameters=parameters,
+                        error=True,
+                    )
+                    self._logger.exception("Neo4j write failed: %s", exc)
+                    raise
+                self._profiler.record(
+                    query,
+                    time.perf_counter() - started,
+                    rows=len(parameters.get("rows") or ()),
+                    parameters=parameters,
+                )
+
+    async def _execute_read(self, query: str, **parameters: Any) -> List[Dict[str, Any]]:
+        async def _run(tx, statement: str):
+            result = await tx.run(statement, **parameters)
+            records = [record.data() async for record in result]
+            summary = await result.consume()
+            return records, total_db_hits(summary.profile)
+
+        profile = self._profiler.should_profile(query)
+        started = time.perf_counter()
+        try:
+            async with self._pool.session() as session:
+                records, db_hits = await session.execute_read(
+                    _run, f"PROFILE {query}" if profile else query
+                )
+        except Neo4jError as exc:
+            self._profiler.record(
+                query, time.perf_counter() - started, parameters=parameters, error=True
+            )
+            self._logger.exception("Neo4j read failed: %s", exc)
+            raise
+        self._profiler.record(
+            query,
+            time.perf_counter() - started,
+            rows=len(records),
+            db_hits=db_hits if profile else None,
+            parameters=parameters,
+        )
+        return records
+
+
+class AsyncKnowledgeGraphService:
+    """Async facade mirroring :class:`~app.services.knowledge_graph.KnowledgeGraphService`."""
+
+    def __init__(
+        self,
+        graph_storage: Optional[AsyncNeo4jGraphStorage] = None,
+        *,
+        change_detection: Optional[bool] = None,
+    ) -> None:
+        if change_detection is None:
+            change_detection = settings.GRAPH_CHANGE_DETECTION_ENABLED
+        self._change_detection = change_detection
+        if graph_storage is None:
+            graph_storage = create_async_graph_storage_from_settings()
+        self.graph_storage = graph_storage
+
+    async def save_entities_and_relationships(
+        self, entities: Iterable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        nodes, edges = collect_graph_rows(entities)
+        if self._change_detection:
+            previous = await self.graph_storage.fetch_fingerprints(nodes)
+            nodes, edges, stale, skipped = plan_incremental_write(nodes, edges, previous)
+            stats = await self.graph_storage.bulk_write(nodes, edges, stale_children=stale)
+            stats["skipped"] = skipped
+        else:
+            stats = await self.graph_storage.bulk_write(nodes, edges)
+        return graph_save_result(stats)
+
+    async def search(
+        self,
+        query: str,
+        *,
+        label: Optional[str] = None,
+        limit: int = 25,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        records = await self.graph_storage.search(
+            query, label=label, limit=limit, offset=offset
+        )
+        return {"count": len(records), "results": records}
+
+    async def get_subgraph(
+        self,
+        ids: Sequence[str],
+        *,
+        depth: int = 1,
+        rel_types: Optional[Sequence[str]] = None,
+        limit: int = 500,
+        root_label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return await self.graph_storage.get_subgraph(
+            ids, depth=depth, rel_types=rel_types, limit=limit, root_label=root_label
+        )
+
+    async def ensure_search_indexes(self) -> str:
+        return await self.graph_storage.ensure_fulltext_index()
+
+    async def health_check(self) -> bool:
+        return await self.graph_storage.health_check()
+
+    async def close(self) -> None:
+        await self.graph_storage.close()
+
+
+class AwaitableGraphStorage:
+    """Exposes a synchronous in-process storage through the async storage surface.
+
+    Only suitable for storages whose calls never block on I/O, such as
+    :class:`~app.services.embedded_graph.EmbeddedGraphStorage`.
+    """
+
+    def __init__(self, storage: Any) -> None:
+        self._storage = storage
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._storage, name)
+        if not callable(attribute):
+            return attribute
+
+        async def _call(*args: Any, **kwargs: Any) -> Any:
+            return attribute(*args, **kwargs)
+
+        return _call
+
+
+def create_async_graph_storage_from_settings() -> Any:
+    if settings.GRAPH_BACKEND == "embedded":
+        return AwaitableGraphStorage(get_embedded_graph_storage())
+    return AsyncNeo4jGraphStorage(
+        settings.NEO4J_URI,
+        database=settings.NEO4J_DATABASE,
+        write_chunk_size=settings.NEO4J_WRITE_CHUNK_SIZE,
+        fulltext_analyzer=settings.NEO4J_FULLTEXT_ANALYZER,
+        driver_pool=get_shared_async_driver_pool(),
+    )
+
+
+_shared_async_pool: Optional[AsyncNeo4jDriverPool] = None
+
+
+def create_async_driver_pool_from_settings() -> AsyncNeo4jDriverPool:
+    # Unlike the sync pool, connectivity is not verified here: that needs an
+    # awaitable, so the lifespan hook verifies the shared pool at startup.
+    return AsyncNeo4jDriverPool(
+        settings.NEO4J_URI,
+        user=settings.NEO4J_USER,
+        password=settings.NEO4J_PASSWORD,
+        database=settings.NEO4J_DATABASE,
+        max_connection_pool_size=pool_budget_from_settings()[1],
+        connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+    )
+
+
+def set_shared_async_driver_pool(pool: Optional[AsyncNeo4jDriverPool]) -> None:
+    global _shared_async_pool
+    _shared_async_pool = pool
+
+
+def get_shared_async_driver_pool() -> AsyncNeo4jDriverPool:
+    """Return the worker's async driver pool; only ever touched from the event loop."""
+
+    global _shared_async_pool
+    if _shared_async_pool is None:
+        _shared_async_pool = create_async_driver_pool_from_settings()
+    return _shared_async_pool
+
+
+def peek_shared_async_driver_pool() -> Optional[AsyncNeo4jDriverPool]:
+    return _shared_async_pool
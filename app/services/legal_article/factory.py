@@ -7,13 +7,19 @@ from app.services.legal_article.analyzer import (
     AnalysisRule,
     HeuristicLegalArticleAnalyzer,
 )
-from app.services.legal_article.service import LegalArticleAnalysisService
+from app.services.legal_article.service import (
+    GraphWriterProtocol,
+    LegalArticleAnalysisService,
+)
 from app.services.knowledge_graph import KnowledgeGraphService
+from app.services.knowledge_graph_async import AsyncKnowledgeGraphService
 
 
 def build_legal_article_analysis_service(
     *,
     knowledge_graph_service: KnowledgeGraphService | None = None,
+    async_knowledge_graph_service: AsyncKnowledgeGraphService | None = None,
+    graph_writer: GraphWriterProtocol | None = None,
 ) -> LegalArticleAnalysisService:
     repository = get_default_legal_article_repository()
     analyzer = HeuristicLegalArticleAnalyzer(
@@ -36,4 +42,6 @@ def build_legal_article_analysis_service(
         repository=repository,
         analyzer=analyzer,
         knowledge_graph=knowledge_graph_service,
+        async_knowledge_graph=async_knowledge_graph_service,
+        graph_writer=graph_writer,
     )
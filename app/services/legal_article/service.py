@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Protocol, Sequence
 
 from app.core.contracts.legal_article import (
     ComplianceStepDetail,
@@ -11,12 +12,19 @@ from app.core.contracts.legal_article import (
     LegalArticleRepositoryProtocol,
     ObligationDetail,
 )
+from app.services.inference_executor import InferenceExecutor
 from app.services.knowledge_graph import KnowledgeGraphService
+from app.services.knowledge_graph_async import AsyncKnowledgeGraphService
 
 
 LOGGER = logging.getLogger(__name__)
 
 
+class GraphWriterProtocol(Protocol):
+    def enqueue(self, entities: Sequence[dict]) -> int:
+        ...
+
+
 class LegalArticleAnalysisService:
     """Coordinates retrieval and analysis of legal articles."""
 
@@ -26,10 +34,16 @@ class LegalArticleAnalysisService:
         analyzer: LegalArticleAnalyzerProtocol,
         *,
         knowledge_graph: KnowledgeGraphService | None = None,
+        async_knowledge_graph: AsyncKnowledgeGraphService | None = None,
+        graph_writer: GraphWriterProtocol | None = None,
     ) -> None:
         self._repository = repository
         self._analyzer = analyzer
         self._knowledge_graph = knowledge_graph
+        self._async_knowledge_graph = async_knowledge_graph
+        # When set, graph entities are queued for write-behind instead of
+        # being written before the analysis is returned.
+        self._graph_writer = graph_writer
 
     def analyze_article(
         self,
@@ -42,6 +56,30 @@ class LegalArticleAnalysisService:
         self._persist_to_knowledge_graph(article, analysis)
         return analysis
 
+    async def analyze_article_async(
+        self,
+        article_number: str,
+        language: str,
+        text_override: Optional[str] = None,
+        *,
+        executor: InferenceExecutor,
+    ) -> LegalArticleAnalysis:
+        """Analyse on ``executor`` and persist through the async knowledge graph.
+
+        The graph write is awaited on the event loop, so the inference thread
+        is released as soon as the analysis itself finishes. Blocking writes
+        (the write-behind queue's SQLite insert or the sync graph) run in a
+        worker thread instead.
+        """
+
+        article = self._resolve_article(article_number, language, text_override)
+        analysis = await executor.run(self._analyzer.analyze, article)
+        if self._async_knowledge_graph is not None and self._graph_writer is None:
+            await self._persist_to_knowledge_graph_async(article, analysis)
+        else:
+            await asyncio.to_thread(self._persist_to_knowledge_graph, article, analysis)
+        return analysis
+
     def _resolve_article(
         self, article_number: str, language: str, text_override: Optional[str]
     ) -> LegalArticle:
@@ -61,12 +99,16 @@ class LegalArticleAnalysisService:
     def _persist_to_knowledge_graph(
         self, article: LegalArticle, analysis: LegalArticleAnalysis
     ) -> None:
-        if not self._knowledge_graph:
+        if not self._knowledge_graph and not self._graph_writer:
             return
 
         try:
             entities = _build_graph_entities(article, analysis)
-            if entities:
+            if not entities:
+                return
+            if self._graph_writer is not None:
+                self._graph_writer.enqueue(entities)
+            else:
                 self._knowledge_graph.save_entities_and_relationships(entities)
         except Exception as exc:  # pragma: no cover - defensive logging
             LOGGER.warning(
@@ -75,6 +117,22 @@ class LegalArticleAnalysisService:
                 exc,
             )
 
+    async def _persist_to_knowledge_graph_async(
+        self, article: LegalArticle, analysis: LegalArticleAnalysis
+    ) -> None:
+        try:
+            entities = _build_graph_entities(article, analysis)
+            if entities:
+                await self._async_knowledge_graph.save_entities_and_relationships(
+                    entities
+                )
+        except Exception as exc:  # pragma: no cover - defensive logging
+            LOGGER.warning(
+                "Failed to persist article %s to knowledge graph: %s",
+                article.number,
+                exc,
+            )
+
 
 def _build_graph_entities(
     article: LegalArticle, analysis: LegalArticleAnalysis
@@ -0,0 +1,381 @@
+"""Process-wide registry of loaded inference models."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+LOGGER = logging.getLogger(__name__)
+
+ModelLoader = Callable[[], Any]
+ModelWarmup = Callable[[Any], None]
+
+
+class ModelNotAvailableError(LookupError):
+    """Raised when a model is requested that the registry cannot provide."""
+
+
+@dataclass
+class ModelStats:
+    name: str
+    loaded: bool = False
+    load_time_seconds: Optional[float] = None
+    warmup_time_seconds: Optional[float] = None
+    resident_memory_bytes: Optional[int] = None
+    parameter_bytes: Optional[int] = None
+    error: Optional[str] = None
+    failures: int = 0
+    retry_after_seconds: Optional[float] = None
+
+
+@dataclass
+class _ModelEntry:
+    loader: ModelLoader
+    warmup: Optional[ModelWarmup]
+    eager: bool
+    stats: ModelStats
+    instance: Any = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    retry_at: float = 0.0
+
+
+class ModelRegistry:
+    """Loads each named model once and hands out the shared instance.
+
+    Instances are shared by every request in the worker, so callers must treat
+    them as read-only: no fine-tuning, no mutation of pipeline settings.
+
+    A failed load is remembered: until its backoff (doubling from
+    ``retry_backoff_seconds`` up to ``max_retry_backoff_seconds``) expires,
+    ``get`` fails fast instead of re-running the loader on every request.
+    Each model loads under its own lock, so one slow or failing model does
+    not hold up requests for the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        retry_backoff_seconds: float = 30.0,
+        max_retry_backoff_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.RLock()
+        self._retry_backoff = retry_backoff_seconds
+        self._max_retry_backoff = max_retry_backoff_seconds
+        self._clock = clock
+        self._logger = logger or LOGGER
+
+    def register(
+        self,
+        name: str,
+        loader: ModelLoader,
+        *,
+        warmup: Optional[ModelWarmup] = None,
+        eager: bool = True,
+    ) -> None:
+        with self._lock:
+            if name in self._entries:
+                return
+            self._entries[name] = _ModelEntry(
+                loader=loader,
+                warmup=warmup,
+                eager=eager,
+                stats=ModelStats(name=name),
+            )
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._entries
+
+    def get(self, name: str) -> Any:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise ModelNotAvailableError(f"Model '{name}' is not registered")
+        if entry.instance is not None:
+            return entry.instance
+        return self.load(name)
+
+    def load(self, name: str, *, warmup: bool = True) -> Any:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise ModelNotAvailableError(f"Model '{name}' is not registered")
+        self._raise_if_backing_off(name, entry)
+        with entry.lock:
+            if entry.instance is not None:
+                return entry.instance
+            # Another thread may have failed while this one waited for the lock.
+            self._raise_if_backing_off(name, entry)
+
+            rss_before = _current_rss_bytes()
+            started = time.perf_counter()
+            try:
+                instance = entry.loader()
+            except Exception as exc:
+                entry.stats.error = str(exc)
+                entry.stats.failures += 1
+                backoff = min(
+                    self._retry_backoff * (2 ** (entry.stats.failures - 1)),
+                    self._max_retry_backoff,
+                )
+                entry.retry_at = self._clock() + backoff
+                entry.stats.retry_after_seconds = backoff
+                self._logger.exception(
+                    "Failed to load model %s (retry in %.0fs): %s", name, backoff, exc
+                )
+                raise ModelNotAvailableError(
+                    f"Model '{name}' failed to load: {exc}"
+                ) from exc
+            entry.stats.load_time_seconds = time.perf_counter() - started
+
+            if warmup and entry.warmup is not None:
+                started = time.perf_counter()
+                try:
+                    entry.warmup(instance)
+                    entry.stats.warmup_time_seconds = time.perf_counter() - started
+                except Exception as exc:  # pragma: no cover - defensive logging
+                    self._logger.warning("Warm-up for model %s failed: %s", name, exc)
+
+            rss_after = _current_rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                entry.stats.resident_memory_bytes = max(rss_after - rss_before, 0)
+            entry.stats.parameter_bytes = _parameter_bytes(instance)
+            entry.stats.loaded = True
+            entry.stats.error = None
+            entry.stats.retry_after_seconds = None
+            entry.instance = instance
+
+            self._logger.info(
+                "Loaded model %s in %.2fs", name, entry.stats.load_time_seconds
+            )
+            return instance
+
+    def _raise_if_backing_off(self, name: str, entry: _ModelEntry) -> None:
+        if entry.stats.failures and self._clock() < entry.retry_at:
+            raise ModelNotAvailableError(
+                f"Model '{name}' failed to load: {entry.stats.error} "
+                f"(next attempt in {entry.retry_at - self._clock():.0f}s)"
+            )
+
+    def load_all(self, *, warmup: bool = True) -> None:
+        for name, entry in list(self._entries.items()):
+            if not entry.eager:
+                continue
+            try:
+                self.load(name, warmup=warmup)
+            except ModelNotAvailableError:
+                # Keep serving the models that did load; the failure is
+                # visible through ``stats()``.
+                continue
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [asdict(entry.stats) for entry in self._entries.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def register_default_models(
+    registry: ModelRegistry, *, config: Any = settings
+) -> ModelRegistry:
+    """Register the QA, embedding, NER and classifier models (and the vector store) configured for this worker."""
+
+    def load_qa():
+        from app.services.qa_cache import QAAnswerCache, SQLiteAnswerCacheTier
+        from app.services.qa_service import QAService
+
+        answer_cache = None
+        if config.QA_CACHE_ENABLED:
+            answer_cache = QAAnswerCache(
+                max_entries=config.QA_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.QA_CACHE_TTL_SECONDS,
+                disk_tier=(
+                    SQLiteAnswerCacheTier(
+                        config.QA_CACHE_DISK_PATH, max_rows=config.QA_CACHE_DISK_MAX_ROWS
+                    )
+                    if config.QA_CACHE_DISK_PATH
+                    else None
+                ),
+            )
+        return QAService(
+            model_name=config.QA_MODEL_NAME,
+            backend=config.QA_BACKEND,
+            onnx_dir=config.QA_ONNX_DIR,
+            onnx_quantize=config.QA_ONNX_QUANTIZE,
+            onnx_threads=config.QA_ONNX_THREADS,
+            answer_cache=answer_cache,
+        )
+
+    registry.register("qa", load_qa, warmup=lambda service: service.warmup())
+
+    if config.CORPUS_QA_ENABLED or config.VECTOR_STORE_ENABLED:
+
+        def load_embedder():
+            from sentence_transformers import SentenceTransformer
+
+            from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
+
+            return EmbeddingService(
+                SentenceTransformer(config.EMBEDDING_MODEL_NAME),
+                model_name=config.EMBEDDING_MODEL_NAME,
+                cache=(
+                    SQLiteEmbeddingCache(config.EMBEDDING_CACHE_PATH)
+                    if config.EMBEDDING_CACHE_PATH
+                    else None
+                ),
+                batch_size=config.EMBEDDING_BATCH_SIZE,
+            )
+
+        registry.register(
+            "embedder",
+            load_embedder,
+            warmup=lambda model: model.encode([_WARMUP_CONTEXT]),
+        )
+
+    if config.VECTOR_STORE_ENABLED or config.CORPUS_QA_ENABLED:
+
+        def load_vector_storage():
+            from app.nlp.dataset import load_legal_articles
+            from app.services.vector_store import (
+                create_vector_storage_from_settings,
+                index_articles,
+            )
+
+            storage = create_vector_storage_from_settings(config)
+            if config.VECTOR_STORE_INDEX_ON_STARTUP and not storage.count():
+                # First start on an empty store; scripts/index_vector_store.py re-indexes.
+                index_articles(storage, registry.get("embedder"), load_legal_articles())
+            return storage
+
+        registry.register("vector_storage", load_vector_storage)
+
+    if config.BM25_ENABLED:
+
+        def load_bm25_index():
+            from app.nlp.dataset import load_legal_articles
+            from app.services.bm25_index import load_or_build_bm25_index, thai_word_tokenizer
+
+            return load_or_build_bm25_index(
+                config.BM25_INDEX_PATH,
+                load_legal_articles,
+                tokenizer=thai_word_tokenizer(config.BM25_TOKENIZER_ENGINE),
+                tokenizer_engine=config.BM25_TOKENIZER_ENGINE,
+                k1=config.BM25_K1,
+                b=config.BM25_B,
+            )
+
+        registry.register(
+            "bm25_index",
+            load_bm25_index,
+            warmup=lambda index: index.search(_WARMUP_CONTEXT),
+        )
+
+    if config.RERANKER_ENABLED:
+
+        def load_reranker():
+            from sentence_transformers import CrossEncoder
+
+            from app.services.reranker import CrossEncoderReranker, PairScoreCache
+
+            return CrossEncoderReranker(
+                CrossEncoder(config.RERANKER_MODEL_NAME),
+                model_name=config.RERANKER_MODEL_NAME,
+                batch_size=config.RERANKER_BATCH_SIZE,
+                budget_ms=config.RERANKER_BUDGET_MS,
+                max_candidates=config.RERANKER_MAX_CANDIDATES,
+                cache=PairScoreCache(
+                    max_entries=config.RERANKER_CACHE_MAX_ENTRIES,
+                    ttl_seconds=config.RERANKER_CACHE_TTL_SECONDS,
+                ),
+            )
+
+        registry.register("reranker", load_reranker, warmup=lambda reranker: reranker.warmup())
+
+    if config.NER_MODEL_NAME:
+
+        def load_ner():
+            from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+            from app.services.nlp.entity_extraction_service import (
+                EntityExtractionService,
+            )
+
+            model = AutoModelForTokenClassification.from_pretrained(
+                config.NER_MODEL_NAME
+            )
+            model.eval()
+            tokenizer = AutoTokenizer.from_pretrained(config.NER_MODEL_NAME)
+            return EntityExtractionService(model, tokenizer)
+
+        registry.register(
+            "ner",
+            load_ner,
+            warmup=lambda service: service.extract_entities(_WARMUP_CONTEXT),
+        )
+
+    if config.CLASSIFIER_MODEL_NAME:
+
+        def load_classifier():
+            from app.services.nlp.text_classification_service import (
+                TextClassificationService,
+            )
+
+            service = TextClassificationService(
+                dataset_loader=None, model_name=config.CLASSIFIER_MODEL_NAME
+            )
+            service.model.eval()
+            return service
+
+        registry.register(
+            "classifier",
+            load_classifier,
+            warmup=lambda service: service.predict(_WARMUP_CONTEXT),
+        )
+
+    return registry
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as handle:
+            resident_pages = int(handle.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - non-POSIX platforms
+        return None
+    # ru_maxrss is a high-water mark; good enough where /proc is unavailable.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _parameter_bytes(instance: Any) -> Optional[int]:
+    model = getattr(instance, "model", None) or getattr(instance, "ner_model", None)
+    if model is None and callable(getattr(instance, "parameters", None)):
+        model = instance  # e.g. a SentenceTransformer, which is itself a torch module
+    parameters = getattr(model, "parameters", None)
+    if not callable(parameters):
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters())
+    except Exception:  # pragma: no cover - non-torch models
+        return None
+
+
+_WARMUP_CONTEXT = "มาตรา 10 ห้ามมิให้นายจ้างเรียกหรือรับหลักประกันจากลูกจ้าง"
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
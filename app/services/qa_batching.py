@@ -0,0 +1,193 @@
+"""Dynamic micro-batching in front of ``QAService`` for concurrent /qa/ask calls."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.inference_executor import InferenceExecutor, InferenceOverloadedError
+
+LOGGER = logging.getLogger(__name__)
+
+QAItem = Tuple[str, str]
+BatchAnswerer = Callable[[Sequence[QAItem]], List[Dict[str, Any]]]
+
+
+@dataclass
+class _PendingQuestion:
+    question: str
+    context: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class QABatchScheduler:
+    """Collects concurrent questions for a short window and answers them in one pass.
+
+    A batch is closed when ``max_batch_size`` items are waiting or the oldest
+    item has waited ``max_latency_ms``, whichever comes first. The forward pass
+    runs off the event loop (on ``executor`` when given) so new requests keep
+    queueing while it computes. Submissions beyond ``max_pending`` queued
+    questions are rejected with ``InferenceOverloadedError``.
+    """
+
+    def __init__(
+        self,
+        answer_batch: BatchAnswerer,
+        *,
+        max_batch_size: int = 16,
+        max_latency_ms: float = 10.0,
+        executor: Optional[InferenceExecutor] = None,
+        max_pending: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_latency_ms < 0:
+            raise ValueError("max_latency_ms must not be negative")
+        self._answer_batch = answer_batch
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency_ms / 1000.0
+        self._executor = executor
+        self._max_pending = max_pending
+        self._logger = logger or LOGGER
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Items taken off the queue but not yet answered; failed on stop().
+        self._in_flight: List[_PendingQuestion] = []
+
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes: Counter = Counter()
+        self._queue_wait_seconds = 0.0
+        self._compute_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # lifecycle helpers
+    # ------------------------------------------------------------------
+    async def start(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._fail_pending(RuntimeError("QA batch scheduler stopped"))
+
+    # ------------------------------------------------------------------
+    # public operations
+    # ------------------------------------------------------------------
+    async def submit(self, question: str, context: str) -> Dict[str, Any]:
+        await self.start()
+        if self._max_pending is not None and self._queue.qsize() >= self._max_pending:
+            raise InferenceOverloadedError("QA batch queue is full, please retry shortly.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingQuestion(question, context, future))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self._max_batch_size,
+            "max_latency_ms": self._max_latency * 1000.0,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "mean_queue_wait_ms": (
+                self._queue_wait_seconds / self._items * 1000.0 if self._items else 0.0
+            ),
+            "mean_compute_ms": (
+                self._compute_seconds / self._batches * 1000.0 if self._batches else 0.0
+            ),
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+    # ------------------------------------------------------------------
+    # execution helpers
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            self._in_flight = batch = []
+            await self._collect_batch(batch)
+            started = time.perf_counter()
+            items = [(pending.question, pending.context) for pending in batch]
+            try:
+                results = await self._compute(items)
+            except Exception as exc:
+                self._logger.exception("QA batch of %d failed: %s", len(batch), exc)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                continue
+
+            self._record(batch, started)
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+
+    async def _compute(self, items: List[QAItem]) -> List[Dict[str, Any]]:
+        if self._executor is not None:
+            return await self._executor.run(self._answer_batch, items)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._answer_batch, items)
+
+    async def _collect_batch(self, batch: List[_PendingQuestion]) -> None:
+        # Fills ``batch`` in place so items already dequeued are visible to
+        # stop() if the worker is cancelled mid-collection.
+        first = await self._queue.get()
+        batch.append(first)
+        deadline = first.enqueued_at + self._max_latency
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Drain whatever already arrived without waiting any longer.
+                while len(batch) < self._max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    def _record(self, batch: List[_PendingQuestion], started: float) -> None:
+        self._batches += 1
+        self._items += len(batch)
+        self._batch_sizes[len(batch)] += 1
+        self._compute_seconds += time.perf_counter() - started
+        self._queue_wait_seconds += sum(started - item.enqueued_at for item in batch)
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for pending in self._in_flight:
+            if not pending.future.done():
+                pending.future.set_exception(exc)
+        self._in_flight = []
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(exc)
+
+
+_scheduler: Optional[QABatchScheduler] = None
+
+
+def set_qa_batch_scheduler(scheduler: Optional[QABatchScheduler]) -> None:
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_qa_batch_scheduler() -> Optional[QABatchScheduler]:
+    return _scheduler
@@ -0,0 +1,223 @@
+"""LRU + TTL answer cache for question answering with an optional SQLite tier."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form used for cache keys: NFC, lower-cased, single spaces."""
+
+    normalized = unicodedata.normalize("NFC", question or "")
+    return _WHITESPACE_PATTERN.sub(" ", normalized).strip().lower()
+
+
+def answer_cache_key(question: str, context: str, model_id: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model_id, normalize_question(question), context or ""):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so different splits never collide.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class SQLiteAnswerCacheTier:
+    """On-disk cache tier shared by every worker on the host.
+
+    Every ``purge_every`` writes, expired rows are deleted and, when
+    ``max_rows`` is set, the rows closest to expiry beyond that limit too.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_rows: Optional[int] = None,
+        purge_every: int = 1000,
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._max_rows = max_rows
+        self._purge_every = max(purge_every, 1)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS qa_answers ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS qa_answers_expires_at ON qa_answers (expires_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=5.0)
+            # WAL lets several worker processes read while one writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, *, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        row = (
+            self._connection()
+            .execute("SELECT payload, expires_at FROM qa_answers WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at <= now:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM qa_answers WHERE key = ?", (key,))
+            return None
+        return json.loads(payload), expires_at
+
+    def set(
+        self, key: str, value: Dict[str, Any], *, expires_at: float, now: Optional[float] = None
+    ) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO qa_answers (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False, default=float), expires_at),
+            )
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self._purge_every == 0
+        if due:
+            self.purge_expired(now=time.time() if now is None else now)
+
+    def purge_expired(self, *, now: float) -> int:
+        """Delete expired rows, then the rows closest to expiry beyond ``max_rows``."""
+
+        with self._connection() as connection:
+            removed = connection.execute(
+                "DELETE FROM qa_answers WHERE expires_at <= ?", (now,)
+            ).rowcount
+            if self._max_rows is not None:
+                removed += connection.execute(
+                    "DELETE FROM qa_answers WHERE key IN ("
+                    "SELECT key FROM qa_answers ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self._max_rows,),
+                ).rowcount
+        if removed:
+            LOGGER.debug("Purged %d rows from the QA answer cache disk tier", removed)
+        return removed
+
+    def count(self) -> int:
+        return int(self._connection().execute("SELECT COUNT(*) FROM qa_answers").fetchone()[0])
+
+
+class QAAnswerCache:
+    """Bounded in-memory LRU with per-entry TTL, backed by an optional disk tier."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 4096,
+        ttl_seconds: float = 3600.0,
+        disk_tier: Optional[SQLiteAnswerCacheTier] = None,
+        clock: Callable[[], float] = time.time,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._disk_tier = disk_tier
+        self._clock = clock
+        self._logger = logger or LOGGER
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return dict(value)
+                del self._entries[key]
+
+        if self._disk_tier is not None:
+            try:
+                stored = self._disk_tier.get(key, now=now)
+            except sqlite3.Error as exc:  # pragma: no cover - disk failures are non-fatal
+                self._logger.warning("QA answer cache disk read failed: %s", exc)
+                stored = None
+            if stored is not None:
+                value, expires_at = stored
+                with self._lock:
+                    self._disk_hits += 1
+                    self._store(key, value, expires_at)
+                return dict(value)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = self._clock()
+        expires_at = now + self._ttl
+        value = dict(value)
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._disk_tier is not None:
+            try:
+                self._disk_tier.set(key, value, expires_at=expires_at, now=now)
+            except sqlite3.Error as exc:  # pragma: no cover - disk failures are non-fatal
+                self._logger.warning("QA answer cache disk write failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+                "disk_tier": self._disk_tier is not None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
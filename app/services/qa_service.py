@@ -1,26 +1,254 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import re
+import statistics
+import time
 
+import numpy as np
+import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from app.core.model_id import resolve_model_id
+from app.nlp.dataset import iter_article_sections
+from app.nlp.qa_spans import (
+    AnswerSpan,
+    ContextWindow,
+    best_spans,
+    build_context_windows,
+    split_long_span,
+)
+from app.services.qa_cache import QAAnswerCache, answer_cache_key
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_QA_MODEL = "distilbert-base-multilingual-cased"
+
+_EMPTY_INPUT_MESSAGE = "Please provide both a question and a context."
+
+_WARMUP_QUESTION = "ห้ามนายจ้างเรียกหลักประกันจากใคร"
+_WARMUP_CONTEXT = "มาตรา 10 ห้ามมิให้นายจ้างเรียกหรือรับหลักประกันจากลูกจ้าง"
+
+
+class QAInferenceBackend(Protocol):
+    """
+    Runs the QA model on padded NumPy inputs and returns (start_logits, end_logits).
+    """
+
+    name: str
+
+    def run(self, inputs: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+
+class TorchQABackend:
+    """
+    Eager PyTorch inference, the reference implementation.
+    """
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+
+    def run(self, inputs: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        tensors = {key: torch.from_numpy(value) for key, value in inputs.items()}
+        with torch.no_grad():
+            outputs = self.model(**tensors)
+        return outputs.start_logits.numpy(), outputs.end_logits.numpy()
+
+
+class OnnxQABackend:
+    """
+    ONNX Runtime inference on CPU, optionally over a dynamically int8-quantized graph.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, *, intra_op_threads: Optional[int] = None):
+        try:
+            import onnxruntime
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "The ONNX QA backend requires onnxruntime; install the 'onnx' extra."
+            ) from exc
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.model_path = model_path
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [item.name for item in self.session.get_inputs()]
+
+    def run(self, inputs: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        start_logits, end_logits = self.session.run(
+            ["start_logits", "end_logits"],
+            {name: inputs[name] for name in self._input_names},
+        )
+        return start_logits, end_logits
+
+
+class _QALogitsModule(torch.nn.Module):
+    """
+    Exposes a Hugging Face QA model as positional inputs -> (start_logits, end_logits) for export.
+    """
+
+    def __init__(self, model, input_names: Sequence[str]):
+        super().__init__()
+        self.model = model
+        self.input_names = list(input_names)
+
+    def forward(self, *inputs):
+        outputs = self.model(**dict(zip(self.input_names, inputs)))
+        return outputs.start_logits, outputs.end_logits
+
+
+def export_qa_model_to_onnx(
+    model,
+    tokenizer,
+    output_dir: str,
+    *,
+    quantize: bool = False,
+    opset_version: int = 14,
+) -> str:
+    """
+    Exports a (fine-tuned) QA model to ONNX, optionally with dynamic int8 quantization.
+
+    :param model: The ``AutoModelForQuestionAnswering`` instance to export.
+    :param tokenizer: The tokenizer matching the model.
+    :param output_dir: Directory receiving ``model.onnx`` (and ``model.int8.onnx``).
+    :param quantize: Also write a dynamically quantized int8 copy.
+    :param opset_version: ONNX opset used for the export.
+    :return: Path of the model file to serve.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+
+    sample = tokenizer(_WARMUP_QUESTION, _WARMUP_CONTEXT, return_tensors="pt")
+    input_names = [name for name in tokenizer.model_input_names if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes.update(
+        {name: {0: "batch", 1: "sequence"} for name in ("start_logits", "end_logits")}
+    )
+
+    model.eval()
+    torch.onnx.export(
+        _QALogitsModule(model, input_names),
+        tuple(sample[name] for name in input_names),
+        fp32_path,
+        input_names=input_names,
+        output_names=["start_logits", "end_logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset_version,
+    )
+    if not quantize:
+        return fp32_path
+
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError(
+            "int8 quantization requires onnxruntime; install the 'onnx' extra."
+        ) from exc
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def onnx_export_dir(onnx_dir: str, model_version: str) -> str:
+    """
+    Directory holding the ONNX export of one model version under ``onnx_dir``.
+    """
+    name = re.sub(r"[^\w.-]+", "_", os.path.basename(model_version.rsplit("@", 1)[0].rstrip("/\\")))
+    digest = hashlib.sha256(model_version.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(onnx_dir, f"{name}-{digest}")
+
 
 class QAService:
     """
     Service responsible for handling Question Answering logic.
     This encapsulates the ML model and pipeline, adhering to the Single Responsibility Principle.
+
+    A single instance is shared by every request in a worker (see
+    ``app.services.model_registry``), so it must be treated as read-only.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_QA_MODEL,
+        *,
+        backend: str = "torch",
+        onnx_dir: Optional[str] = None,
+        onnx_quantize: bool = False,
+        onnx_threads: Optional[int] = None,
+        answer_cache: Optional[QAAnswerCache] = None,
+    ):
         """
         Initializes the QA pipeline with a pre-trained model.
         Using a multilingual model suitable for Thai.
+
+        :param model_name: Hugging Face model id or local path of a (fine-tuned) QA model.
+        :param backend: ``"torch"`` for eager PyTorch or ``"onnx"`` for ONNX Runtime.
+        :param onnx_dir: Where the exported ONNX model lives; exported on first use if missing.
+        :param onnx_quantize: Serve the dynamically int8-quantized ONNX model.
+        :param onnx_threads: Intra-op thread count for ONNX Runtime.
+        :param answer_cache: Optional cache of answers keyed on question, context and model id.
         """
-        model_name = "distilbert-base-multilingual-cased"
+        self.model_name = model_name
+        # A local checkpoint directory can be re-fine-tuned in place; its
+        # modification time keeps cached answers and ONNX exports apart.
+        self.model_version = resolve_model_id(model_name)
+        self.model_id = f"{self.model_version}|{backend}{'|int8' if backend == 'onnx' and onnx_quantize else ''}"
+        self.answer_cache = answer_cache
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-        self.qa_pipeline = pipeline(
-            "question-answering", 
-            model=self.model, 
-            tokenizer=self.tokenizer
-        )
+        self.model = None
+        self.qa_pipeline = None
+
+        if backend == "torch":
+            self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+            self.model.eval()
+            self.qa_pipeline = pipeline(
+                "question-answering", 
+                model=self.model, 
+                tokenizer=self.tokenizer
+            )
+            self.backend: QAInferenceBackend = TorchQABackend(self.model)
+        elif backend == "onnx":
+            self.backend = OnnxQABackend(
+                self._ensure_onnx_model(onnx_dir, quantize=onnx_quantize),
+                intra_op_threads=onnx_threads,
+            )
+        else:
+            raise ValueError(f"Unknown QA backend: {backend}")
+
+    def _ensure_onnx_model(self, onnx_dir: Optional[str], *, quantize: bool) -> str:
+        """
+        Returns the ONNX export of this model version, exporting it first if needed.
+
+        Exports live in a subdirectory of ``onnx_dir`` named after the model and a
+        digest of its version, so a different or re-fine-tuned model never reuses a
+        stale export.
+        """
+        export_dir = onnx_export_dir(onnx_dir or os.path.join("models", "qa_onnx"), self.model_version)
+        model_path = os.path.join(export_dir, "model.int8.onnx" if quantize else "model.onnx")
+        if os.path.exists(model_path):
+            return model_path
+
+        LOGGER.info("Exporting %s to ONNX at %s", self.model_name, export_dir)
+        model = AutoModelForQuestionAnswering.from_pretrained(self.model_name)
+        return export_qa_model_to_onnx(model, self.tokenizer, export_dir, quantize=quantize)
+
+    def warmup(self) -> None:
+        """
+        Runs one inference so lazy initialisation happens before the first request.
+        """
+        self.answer_question(question=_WARMUP_QUESTION, context=_WARMUP_CONTEXT)
 
     def answer_question(self, question: str, context: str) -> Dict[str, str | float]:
         """
@@ -35,9 +263,466 @@ class QAService:
                 "score": 0.0,
                 "start": 0,
                 "end": 0,
-                "answer": "Please provide both a question and a context."
+                "answer": _EMPTY_INPUT_MESSAGE
             }
 
-        # The pipeline returns a dictionary with score, start, end, and answer
-        result = self.qa_pipeline(question=question, context=context)
+        key = self._cache_key(question, context, "single")
+        if key is not None:
+            cached = self.answer_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if self.qa_pipeline is None:
+            result = self._answer_pairs([(question, context)])[0]
+            result.pop("question")
+        else:
+            # The pipeline returns a dictionary with score, start, end, and answer
+            result = self.qa_pipeline(question=question, context=context)
+
+        if key is not None:
+            self.answer_cache.set(key, result)
         return result
+
+    def answer_batch(
+        self, items: Sequence[Tuple[str, str]]
+    ) -> List[Dict[str, str | float]]:
+        """
+        Answers several independent (question, context) pairs in padded forward passes.
+
+        :param items: Pairs of question and context, answered in order.
+        :return: One answer dictionary per pair, shaped like ``answer_question``.
+        """
+        results: List[Dict[str, str | float] | None] = [None] * len(items)
+        keys: Dict[int, str] = {}
+        valid_indices: List[int] = []
+        for index, (question, context) in enumerate(items):
+            if not question or not context:
+                results[index] = self.answer_question(question=question, context=context)
+                continue
+            key = self._cache_key(question, context, "single")
+            cached = self.answer_cache.get(key) if key is not None else None
+            if cached is not None:
+                results[index] = cached
+                continue
+            if key is not None:
+                keys[index] = key
+            valid_indices.append(index)
+
+        if valid_indices and self.qa_pipeline is None:
+            answers = self._answer_pairs([items[index] for index in valid_indices])
+            for index, answer in zip(valid_indices, answers):
+                answer.pop("question")
+                results[index] = answer
+        elif valid_indices:
+            outputs = self.qa_pipeline(
+                question=[items[index][0] for index in valid_indices],
+                context=[items[index][1] for index in valid_indices],
+                batch_size=len(valid_indices),
+            )
+            # The pipeline unwraps single-item batches into a bare dictionary.
+            if isinstance(outputs, dict):
+                outputs = [outputs]
+            for index, output in zip(valid_indices, outputs):
+                results[index] = output
+
+        for index, key in keys.items():
+            self.answer_cache.set(key, results[index])
+        return results
+
+    def answer_questions(
+        self,
+        questions: Sequence[str],
+        context: str,
+        *,
+        max_length: int = 384,
+        stride: int = 128,
+        max_question_tokens: int = 64,
+        batch_size: int = 16,
+    ) -> List[Dict[str, str | float]]:
+        """
+        Answers many questions against one context, tokenizing the context only once.
+
+        The context is split into sliding windows that leave room for a question of up
+        to ``max_question_tokens`` tokens, so the same windows are reused for every
+        question. Each (question, window) feature is run in padded batches and the best
+        span across windows is kept per question.
+
+        :param questions: The questions to be answered.
+        :param context: The text shared by all questions.
+        :param max_length: Maximum encoded length of one (question, window) feature.
+        :param stride: Number of tokens shared by consecutive context windows.
+        :param max_question_tokens: Questions longer than this are truncated.
+        :param batch_size: Number of features per forward pass.
+        :return: One dictionary per question with the question, answer, score, start and end.
+        """
+        results: List[Dict[str, str | float] | None] = [None] * len(questions)
+        keys: Dict[int, str] = {}
+        pending: List[int] = []
+        for index, question in enumerate(questions):
+            key = self._cache_key(question, context, "shared")
+            cached = self.answer_cache.get(key) if key is not None else None
+            if cached is not None:
+                results[index] = {"question": question, **cached}
+                continue
+            if key is not None:
+                keys[index] = key
+            pending.append(index)
+
+        answers = self._answer_pairs(
+            [(questions[index], context) for index in pending],
+            max_length=max_length,
+            stride=stride,
+            max_question_tokens=max_question_tokens,
+            batch_size=batch_size,
+        )
+        for index, answer in zip(pending, answers):
+            results[index] = answer
+            if index in keys:
+                self.answer_cache.set(
+                    keys[index], {key: value for key, value in answer.items() if key != "question"}
+                )
+        return results
+
+    def _cache_key(self, question: str, context: str, mode: str) -> Optional[str]:
+        """
+        Returns the answer cache key, or None when caching does not apply.
+        """
+        if self.answer_cache is None or not question or not context:
+            return None
+        return answer_cache_key(question, context, f"{self.model_id}|{mode}")
+
+    def _answer_pairs(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        *,
+        max_length: int = 384,
+        stride: int = 128,
+        max_question_tokens: int = 64,
+        batch_size: int = 16,
+    ) -> List[Dict[str, str | float]]:
+        """
+        Answers (question, context) pairs, tokenizing each distinct context once and
+        batching features from all pairs together.
+        """
+        max_tokens = max_length - max_question_tokens - 3
+        windows_by_context: Dict[str, List[ContextWindow]] = {}
+        answerable = [index for index, (question, context) in enumerate(pairs) if question and context]
+        for index in answerable:
+            context = pairs[index][1]
+            if context not in windows_by_context:
+                windows_by_context[context] = self._tokenize_context(
+                    context, max_tokens=max_tokens, stride=stride
+                )
+
+        question_ids: Dict[int, List[int]] = {}
+        if answerable:
+            encoded_questions = self.tokenizer(
+                [pairs[index][0] for index in answerable],
+                add_special_tokens=False,
+                truncation=True,
+                max_length=max_question_tokens,
+            )["input_ids"]
+            question_ids = dict(zip(answerable, encoded_questions))
+
+        features = [
+            (index, window)
+            for index in answerable
+            for window in windows_by_context[pairs[index][1]]
+        ]
+        best: Dict[int, AnswerSpan] = {}
+        for offset in range(0, len(features), batch_size):
+            chunk = features[offset : offset + batch_size]
+            spans = self._best_spans_for_features(
+                [(question_ids[index], window) for index, window in chunk]
+            )
+            for (index, _), candidates in zip(chunk, spans):
+                current = best.get(index)
+                if candidates and (current is None or candidates[0].score > current.score):
+                    best[index] = candidates[0]
+
+        results: List[Dict[str, str | float]] = []
+        for index, (question, context) in enumerate(pairs):
+            span = best.get(index)
+            if span is None:
+                results.append(self._empty_answer(question))
+                continue
+            results.append(
+                {
+                    "question": question,
+                    "score": span.score,
+                    "start": span.start,
+                    "end": span.end,
+                    "answer": context[span.start : span.end],
+                }
+            )
+        return results
+
+    def answer_long_document(
+        self,
+        question: str,
+        context: str,
+        *,
+        top_k: int = 3,
+        max_length: int = 384,
+        stride: int = 128,
+        max_question_tokens: int = 64,
+        batch_size: int = 16,
+        max_section_chars: int = 4000,
+        section_overlap_chars: int = 200,
+    ) -> Dict[str, object]:
+        """
+        Answers a question over a document of any length, such as a full chapter.
+
+        The document is split at "มาตรา" boundaries, and sections longer than
+        ``max_section_chars`` (or text without any heading) are further cut into
+        overlapping pieces. Each piece is cut into sliding windows and the windows
+        are run in batches. Only the current piece, the current batch and a heap of
+        the ``top_k`` best spans are kept, so memory stays flat as the document grows.
+
+        :param question: The question to be answered.
+        :param context: The full document text.
+        :param top_k: Number of ranked answers to return.
+        :param max_section_chars: Longest piece of text tokenized at once.
+        :param section_overlap_chars: Characters shared by consecutive pieces of one section.
+        :return: The best answer with offsets into ``context`` plus the ranked ``answers``.
+        """
+        if not question or not context:
+            empty = self._empty_answer(question)
+            empty.pop("question")
+            return {**empty, "answers": []}
+
+        question_ids = self.tokenizer(
+            question,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=max_question_tokens,
+        )["input_ids"]
+        max_tokens = max_length - max_question_tokens - 3
+
+        heap: List[Tuple[float, int, AnswerSpan]] = []
+        sequence = itertools.count()
+        pending: List[ContextWindow] = []
+
+        def flush() -> None:
+            results = self._best_spans_for_features(
+                [(question_ids, window) for window in pending], top_k=top_k
+            )
+            pending.clear()
+            for candidates in results:
+                for span in candidates:
+                    if any((held.start, held.end) == (span.start, span.end) for _, _, held in heap):
+                        continue  # the same span seen again in an overlapping window
+                    entry = (span.score, next(sequence), span)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif span.score > heap[0][0]:
+                        heapq.heapreplace(heap, entry)
+
+        pieces = (
+            piece
+            for section in iter_article_sections(context)
+            for piece in split_long_span(
+                context,
+                *section,
+                max_chars=max_section_chars,
+                overlap=section_overlap_chars,
+            )
+        )
+        for piece_start, piece_end in pieces:
+            for window in self._tokenize_context(
+                context[piece_start:piece_end], max_tokens=max_tokens, stride=stride
+            ):
+                # Shift piece-relative offsets so answers index into the document.
+                pending.append(
+                    ContextWindow(
+                        token_ids=window.token_ids,
+                        offsets=[
+                            (start + piece_start, end + piece_start)
+                            for start, end in window.offsets
+                        ],
+                    )
+                )
+                if len(pending) >= batch_size:
+                    flush()
+        if pending:
+            flush()
+
+        answers = [
+            {
+                "score": span.score,
+                "start": span.start,
+                "end": span.end,
+                "answer": context[span.start : span.end],
+            }
+            for _, _, span in sorted(heap, key=lambda entry: entry[0], reverse=True)
+        ]
+        if not answers:
+            return {"score": 0.0, "start": 0, "end": 0, "answer": "", "answers": []}
+        return {**answers[0], "answers": answers}
+
+    @staticmethod
+    def _empty_answer(question: str) -> Dict[str, str | float]:
+        return {
+            "question": question,
+            "score": 0.0,
+            "start": 0,
+            "end": 0,
+            "answer": _EMPTY_INPUT_MESSAGE,
+        }
+
+    def _tokenize_context(
+        self, context: str, *, max_tokens: int, stride: int
+    ) -> List[ContextWindow]:
+        encoding = self.tokenizer(
+            context, add_special_tokens=False, return_offsets_mapping=True
+        )
+        return build_context_windows(
+            encoding["input_ids"],
+            encoding["offset_mapping"],
+            max_tokens=max_tokens,
+            stride=min(stride, max_tokens - 1),
+        )
+
+    def _best_spans_for_features(
+        self,
+        features: Sequence[Tuple[List[int], ContextWindow]],
+        *,
+        top_k: int = 1,
+    ) -> List[List[AnswerSpan]]:
+        """
+        Runs one padded forward pass over (question ids, context window) features
+        and returns the ``top_k`` best spans of each feature.
+        """
+        encoded = []
+        context_starts = []
+        for question_ids, window in features:
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(
+                question_ids, window.token_ids
+            )
+            # BERT- and RoBERTa-style pair encodings end with exactly one special token.
+            context_starts.append(len(input_ids) - len(window.token_ids) - 1)
+            token_type_ids = None
+            if "token_type_ids" in self.tokenizer.model_input_names:
+                token_type_ids = self.tokenizer.create_token_type_ids_from_sequences(
+                    question_ids, window.token_ids
+                )
+            encoded.append((input_ids, token_type_ids))
+
+        start_logits, end_logits = self._forward(encoded)
+
+        return [
+            best_spans(
+                start_logits[index],
+                end_logits[index],
+                context_start=context_starts[index],
+                offsets=window.offsets,
+                top_k=top_k,
+            )
+            for index, (_, window) in enumerate(features)
+        ]
+
+    def _forward(self, encoded) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pads encoded features into one batch and returns start/end logits as NumPy arrays.
+        """
+        longest = max(len(input_ids) for input_ids, _ in encoded)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = np.full((len(encoded), longest), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encoded), longest), dtype=np.int64)
+        token_type_ids = np.zeros((len(encoded), longest), dtype=np.int64)
+        for row, (ids, types) in enumerate(encoded):
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+            if types is not None:
+                token_type_ids[row, : len(types)] = types
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.tokenizer.model_input_names:
+            inputs["token_type_ids"] = token_type_ids
+        return self.backend.run(inputs)
+
+
+def compare_qa_backends(
+    reference: QAService,
+    candidate: QAService,
+    samples: Iterable[Tuple[str, str]],
+    *,
+    repeats: int = 5,
+    max_question_tokens: int = 64,
+    stride: int = 128,
+) -> Dict[str, float]:
+    """
+    Checks a candidate backend against the reference for parity and latency.
+
+    Logits are compared on identical encoded windows sized to the model's
+    maximum input length. Answers and latencies come from the path each service
+    actually serves (the Hugging Face pipeline for torch, the windowed decoder
+    otherwise) with the answer cache bypassed, so every run is a real forward pass.
+
+    :return: Max absolute logit difference, answer agreement rate and median latencies.
+    """
+    samples = list(samples)
+    tokenizer = reference.tokenizer
+    max_length = _max_sequence_length(reference)
+    special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+    max_logit_diff = 0.0
+    agreements = 0
+    for question, context in samples:
+        question_ids = tokenizer(
+            question, add_special_tokens=False, truncation=True, max_length=max_question_tokens
+        )["input_ids"]
+        max_tokens = max_length - len(question_ids) - special_tokens
+        encoded = [
+            (tokenizer.build_inputs_with_special_tokens(question_ids, window.token_ids), None)
+            for window in reference._tokenize_context(context, max_tokens=max_tokens, stride=stride)
+        ]
+        ref_start, ref_end = reference._forward(encoded)
+        cand_start, cand_end = candidate._forward(encoded)
+        max_logit_diff = max(
+            max_logit_diff,
+            float(np.abs(ref_start - cand_start).max()),
+            float(np.abs(ref_end - cand_end).max()),
+        )
+        ref_answer = _serve_uncached(reference, question, context)["answer"]
+        cand_answer = _serve_uncached(candidate, question, context)["answer"]
+        agreements += int(ref_answer == cand_answer)
+
+    def median_latency_ms(service: QAService) -> float:
+        timings = []
+        for _ in range(repeats):
+            for question, context in samples:
+                started = time.perf_counter()
+                _serve_uncached(service, question, context)
+                timings.append((time.perf_counter() - started) * 1000.0)
+        return statistics.median(timings) if timings else 0.0
+
+    reference_ms = median_latency_ms(reference)
+    candidate_ms = median_latency_ms(candidate)
+    return {
+        "max_abs_logit_diff": max_logit_diff,
+        "answer_agreement": agreements / len(samples) if samples else 1.0,
+        "reference_median_ms": reference_ms,
+        "candidate_median_ms": candidate_ms,
+        "speedup": reference_ms / candidate_ms if candidate_ms else 0.0,
+    }
+
+
+def _serve_uncached(service: QAService, question: str, context: str) -> Dict[str, str | float]:
+    """
+    Answers one question the way ``answer_question`` would, without the answer cache.
+    """
+    if service.qa_pipeline is not None:
+        return service.qa_pipeline(question=question, context=context)
+    return service._answer_pairs([(question, context)])[0]
+
+
+def _max_sequence_length(service: QAService) -> int:
+    """
+    Longest encoded input the model accepts, from the tokenizer or the model config.
+    """
+    limit = getattr(service.tokenizer, "model_max_length", None)
+    # Tokenizers without a configured limit report a huge sentinel value.
+    if not limit or limit > 100_000:
+        config = getattr(service.model, "config", None)
+        limit = getattr(config, "max_position_embeddings", None) or 512
+    return int(limit)
@@ -0,0 +1,214 @@
+"""Cross-encoder reranking of retrieved articles within a latency budget."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+def pair_score_key(query: str, passage: str, model_id: str) -> str:
+    """Exact cache key for one ``(query, passage)`` pair under ``model_id``.
+
+    Unlike the QA answer key the query is hashed verbatim: a cross-encoder
+    can score ``"ID card"`` and ``"id card"`` differently.
+    """
+
+    digest = hashlib.sha256()
+    passage_hash = hashlib.sha256(passage.encode("utf-8")).hexdigest()
+    for part in (model_id, query, passage_hash):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so different splits never collide.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class PairScoreCache:
+    """Bounded in-memory LRU of cross-encoder pair scores with a per-entry TTL.
+
+    Kept apart from the QA answer cache so rerank traffic neither evicts
+    answers nor inherits their capacity and TTL.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 20000,
+        ttl_seconds: float = 86400.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[float]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                score, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return score
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def set(self, key: str, score: float) -> None:
+        expires_at = self._clock() + self._ttl
+        with self._lock:
+            self._entries[key] = (float(score), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+class CrossEncoderReranker:
+    """Scores ``(query, article)`` pairs with a cross-encoder, best first.
+
+    Pairs are scored in retrieval order, one batch at a time. Before each
+    batch the reranker checks whether the slowest batch so far would still
+    fit in ``budget_ms``; if not it stops, and the unscored candidates follow
+    the scored ones in their original retrieval order. Pair scores are cached
+    under the exact query, passage hash and model, so a repeated query costs
+    only the lookups.
+    """
+
+    def __init__(
+        self,
+        model: Any = None,
+        *,
+        model_name: str = DEFAULT_RERANKER_MODEL,
+        batch_size: int = 16,
+        budget_ms: float = 200.0,
+        max_candidates: int = 50,
+        cache: Optional[PairScoreCache] = None,
+        clock: Callable[[], float] = time.perf_counter,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._model = model
+        self._model_name = model_name
+        self._batch_size = max(batch_size, 1)
+        self._budget_ms = budget_ms
+        self._max_candidates = max_candidates
+        self._cache = cache
+        self._clock = clock
+        self._logger = logger or LOGGER
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    self._logger.info("Loading reranker model %s", self._model_name)
+                    self._model = CrossEncoder(self._model_name)
+        return self._model
+
+    def warmup(self) -> None:
+        self._predict([("warmup", "warmup")])
+
+    def rerank(
+        self,
+        query: str,
+        candidates: Sequence[Dict[str, Any]],
+        texts: Sequence[Optional[str]],
+        *,
+        budget_ms: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return ``candidates`` reordered (each with a ``rerank_score``) and stage statistics.
+
+        ``texts[i]`` is the passage for ``candidates[i]``; candidates without
+        text, past ``max_candidates`` or left over when the budget runs out
+        keep their retrieval order after the scored ones.
+        """
+
+        started = self._clock()
+        budget = self._budget_ms if budget_ms is None else budget_ms
+        head = min(len(candidates), self._max_candidates)
+        scores: Dict[int, float] = {}
+        keys: Dict[int, str] = {}
+
+        pending: List[int] = []
+        for position in range(head):
+            text = texts[position]
+            if not text:
+                continue
+            keys[position] = pair_score_key(query, text, self._model_name)
+            cached = self._cache.get(keys[position]) if self._cache is not None else None
+            if cached is not None:
+                scores[position] = cached
+            else:
+                pending.append(position)
+        cached_count = len(scores)
+
+        batches = 0
+        slowest_ms = 0.0
+        budget_exhausted = False
+        for offset in range(0, len(pending), self._batch_size):
+            elapsed_ms = (self._clock() - started) * 1000.0
+            if elapsed_ms + slowest_ms > budget:
+                budget_exhausted = True
+                break
+            batch = pending[offset : offset + self._batch_size]
+            batch_started = self._clock()
+            predicted = self._predict([(query, texts[position]) for position in batch])
+            slowest_ms = max(slowest_ms, (self._clock() - batch_started) * 1000.0)
+            batches += 1
+            for position, score in zip(batch, predicted):
+                scores[position] = float(score)
+                if self._cache is not None:
+                    self._cache.set(keys[position], float(score))
+
+        scored = sorted(scores, key=lambda position: (-scores[position], position))
+        unscored = [position for position in range(len(candidates)) if position not in scores]
+        reranked = [
+            dict(candidates[position], rerank_score=scores.get(position))
+            for position in scored + unscored
+        ]
+        stats = {
+            "candidates": head,
+            "scored": len(scores),
+            "cached": cached_count,
+            "batches": batches,
+            "budget_ms": budget,
+            "budget_exhausted": budget_exhausted,
+            "ms": (self._clock() - started) * 1000.0,
+        }
+        if budget_exhausted:
+            self._logger.info(
+                "Rerank budget of %.0f ms reached after %d/%d candidates", budget, len(scores), head
+            )
+        return reranked, stats
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        return [float(score) for score in self.model.predict(pairs, batch_size=len(pairs))]
@@ -0,0 +1,610 @@
+"""Approximate nearest-neighbour vector storage for corpora too large to scan.
+
+``IVFVectorStorage`` is a pure-NumPy inverted-file index: vectors are bucketed
+under spherical k-means centroids and a query only scores the ``nprobe``
+closest buckets. ``HnswVectorStorage`` wraps ``hnswlib`` when it is installed.
+Both follow :class:`VectorStorageProtocol`, so ``VectorStoreService`` can use
+either in place of the exact backends; :func:`recall_at_k` measures what the
+approximation costs against exact search on the same data.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.contracts.vector_store import VectorHit, VectorRecord, VectorStorageProtocol
+from app.services.vector_store import _normalize_rows
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IVFVectorStorage:
+    """Inverted-file cosine index with incremental inserts.
+
+    Until ``min_train_size`` vectors have been added the index is searched
+    exhaustively. It then trains ``nlist`` centroids once; later inserts are
+    assigned to their nearest centroid without touching the rest of the index.
+    The centroids are retrained only when the index has grown by
+    ``retrain_growth`` since the last training, so buckets stay balanced.
+    Replaced and deleted rows are tombstoned and dropped at the next training.
+    Changes stay in memory until :meth:`flush` (or :meth:`save`) writes the
+    ``.npz`` file, so inserting in batches does not rewrite the index per batch.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_train_size: int = 1024,
+        retrain_growth: float = 4.0,
+        kmeans_iterations: int = 15,
+        seed: int = 0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._path = path
+        self._nlist = nlist
+        self.nprobe = max(nprobe, 1)
+        self._min_train_size = max(min_train_size, 1)
+        self._retrain_growth = retrain_growth
+        self._kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self._logger = logger or LOGGER
+        self._lock = threading.RLock()
+
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_of: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._trained_size = 0
+        self._dirty = False
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def add_vector(
+        self, vector_id: str, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.add_vectors([{"id": vector_id, "vector": vector, "metadata": metadata or {}}])
+
+    def add_vectors(self, records: Sequence[VectorRecord]) -> int:
+        if not records:
+            return 0
+        incoming = _normalize_rows(np.asarray([record["vector"] for record in records], dtype=np.float32))
+        with self._lock:
+            first_row = self._append(records, incoming)
+            if self._centroids is None:
+                if self.count() >= self._min_train_size:
+                    self.train()
+            elif self.count() >= self._retrain_growth * self._trained_size:
+                self.train()
+            else:
+                self._assign(np.arange(first_row, self._size))
+            self._dirty = True
+        return len(records)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            removed = False
+            for vector_id in ids:
+                row = self._row_of.pop(str(vector_id), None)
+                if row is not None:
+                    self._alive[row] = False
+                    removed = True
+            self._dirty = self._dirty or removed
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        nprobe: Optional[int] = None,
+    ) -> List[VectorHit]:
+        return self.search_batch([query_vector], k=k, filter=filter, nprobe=nprobe)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        nprobe: Optional[int] = None,
+    ) -> List[List[VectorHit]]:
+        queries = _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        with self._lock:
+            if not self._row_of or k <= 0:
+                return [[] for _ in range(len(queries))]
+            if self._centroids is None:
+                everything = np.flatnonzero(self._alive[: self._size])
+                candidate_rows = [everything] * len(queries)
+            else:
+                probes = min(nprobe or self.nprobe, len(self._lists))
+                centroid_scores = queries @ self._centroids.T
+                nearest = np.argpartition(-centroid_scores, probes - 1, axis=1)[:, :probes]
+                candidate_rows = [
+                    np.concatenate([self._lists[cluster] for cluster in clusters]) for clusters in nearest
+                ]
+            return [
+                self._rank(query, rows, k, filter) for query, rows in zip(queries, candidate_rows)
+            ]
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = [len(rows) for rows in self._lists]
+            return {
+                "vectors": self.count(),
+                "tombstones": self._size - self.count(),
+                "trained": self.is_trained,
+                "nlist": len(self._lists),
+                "nprobe": self.nprobe,
+                "largest_list": max(sizes) if sizes else 0,
+            }
+
+    def train(self) -> None:
+        """(Re)train the centroids on the live vectors and rebuild the inverted lists."""
+
+        with self._lock:
+            self._compact()
+            if not self._size:
+                return
+            nlist = self._nlist or _default_nlist(self._size)
+            nlist = min(nlist, self._size)
+            sample_size = min(self._size, nlist * 64)
+            sample = self._vectors[self._rng.choice(self._size, sample_size, replace=False)]
+            self._centroids = _spherical_kmeans(sample, nlist, self._kmeans_iterations, self._rng)
+            self._lists = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+            self._trained_size = self._size
+            self._assign(np.arange(self._size))
+            self._logger.info("Trained IVF index: %d vectors in %d lists", self._size, nlist)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the index to one ``.npz`` file, atomically replacing the previous one."""
+
+        path = path or self._path
+        if not path:
+            raise ValueError("No path given for saving the IVF index")
+        with self._lock:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            live = np.flatnonzero(self._alive[: self._size])
+            assignments = self._assignments()[live]
+            arrays = {
+                "vectors": self._vectors[live],
+                "assignments": assignments,
+                "records": np.array(
+                    json.dumps(
+                        {
+                            "ids": [self._ids[row] for row in live],
+                            "metadata": [self._metadata[row] for row in live],
+                            "trained_size": self._trained_size,
+                        },
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                ),
+            }
+            if self._centroids is not None:
+                arrays["centroids"] = self._centroids
+            temporary = f"{path}.tmp"
+            with open(temporary, "wb") as handle:
+                np.savez(handle, **arrays)
+            os.replace(temporary, path)
+            if path == self._path:
+                self._dirty = False
+
+    def flush(self) -> None:
+        """Save to the index path if anything changed since the last save."""
+
+        with self._lock:
+            if self._dirty and self._path:
+                self.save(self._path)
+
+    def load(self, path: str) -> None:
+        with self._lock, np.load(path, allow_pickle=False) as archive:
+            records = json.loads(str(archive["records"]))
+            vectors = np.asarray(archive["vectors"], dtype=np.float32)
+            assignments = archive["assignments"]
+            self._centroids = archive["centroids"] if "centroids" in archive.files else None
+
+            self._vectors = vectors
+            self._size = len(vectors)
+            self._ids = list(records["ids"])
+            self._metadata = list(records["metadata"])
+            self._alive = np.ones(self._size, dtype=bool)
+            self._row_of = {vector_id: row for row, vector_id in enumerate(self._ids)}
+            self._trained_size = int(records.get("trained_size") or 0)
+            self._lists = []
+            if self._centroids is not None:
+                order = np.argsort(assignments, kind="stable")
+                bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+                self._lists = [order[bounds[i] : bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def _append(self, records: Sequence[VectorRecord], incoming: np.ndarray) -> int:
+        if self._size and incoming.shape[1] != self._vectors.shape[1]:
+            raise ValueError(
+                f"Vector dimension {incoming.shape[1]} does not match the index ({self._vectors.shape[1]})"
+            )
+        first_row = self._size
+        needed = self._size + len(incoming)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 64)
+            grown = np.zeros((capacity, incoming.shape[1]), dtype=np.float32)
+            if self._size:
+                grown[: self._size] = self._vectors[: self._size]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[: self._size] = self._alive[: self._size]
+            self._vectors, self._alive = grown, alive
+
+        for offset, (record, vector) in enumerate(zip(records, incoming)):
+            vector_id = str(record["id"])
+            previous = self._row_of.get(vector_id)
+            if previous is not None:
+                self._alive[previous] = False
+            row = first_row + offset
+            self._vectors[row] = vector
+            self._alive[row] = True
+            self._ids.append(vector_id)
+            self._metadata.append(dict(record.get("metadata") or {}))
+            self._row_of[vector_id] = row
+        self._size = needed
+        return first_row
+
+    def _assign(self, rows: np.ndarray) -> None:
+        if self._centroids is None or not len(rows):
+            return
+        clusters = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+        for cluster in np.unique(clusters):
+            self._lists[cluster] = np.concatenate([self._lists[cluster], rows[clusters == cluster]])
+
+    def _assignments(self) -> np.ndarray:
+        assignments = np.full(self._size, -1, dtype=np.int64)
+        for cluster, rows in enumerate(self._lists):
+            assignments[rows] = cluster
+        return assignments
+
+    def _compact(self) -> None:
+        live = np.flatnonzero(self._alive[: self._size])
+        if len(live) == self._size:
+            self._vectors = self._vectors[: self._size]
+            self._alive = self._alive[: self._size]
+            return
+        self._vectors = self._vectors[live]
+        self._ids = [self._ids[row] for row in live]
+        self._metadata = [self._metadata[row] for row in live]
+        self._size = len(live)
+        self._alive = np.ones(self._size, dtype=bool)
+        self._row_of = {vector_id: row for row, vector_id in enumerate(self._ids)}
+
+    def _rank(
+        self, query: np.ndarray, rows: np.ndarray, k: int, filter: Optional[Dict[str, Any]]
+    ) -> List[VectorHit]:
+        rows = rows[self._alive[rows]]
+        if filter:
+            rows = rows[[metadata_matches(self._metadata[row], filter) for row in rows]]
+        if not len(rows):
+            return []
+        scores = self._vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {"id": self._ids[rows[i]], "score": float(scores[i]), "metadata": dict(self._metadata[rows[i]])}
+            for i in top
+        ]
+
+
+class HnswVectorStorage:
+    """Cosine HNSW graph backed by ``hnswlib``, saved next to a JSON id/metadata sidecar.
+
+    Like :class:`IVFVectorStorage`, changes are written by :meth:`flush` or
+    :meth:`save` rather than on every insert.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        dimension: Optional[int] = None,
+        ef: int = 64,
+        ef_construction: int = 200,
+        m: int = 16,
+        initial_capacity: int = 10_000,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        try:
+            import hnswlib
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "hnswlib is required for the HNSW vector index; install it with `pip install hnswlib`."
+            ) from exc
+
+        self._hnswlib = hnswlib
+        self._path = path
+        self._ef = ef
+        self._ef_construction = ef_construction
+        self._m = m
+        self._initial_capacity = initial_capacity
+        self._logger = logger or LOGGER
+        self._lock = threading.RLock()
+        self._index = None
+        self._ids: Dict[int, str] = {}
+        self._label_of: Dict[str, int] = {}
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+        self._next_label = 0
+        self._dirty = False
+
+        if path and os.path.exists(f"{path}.json"):
+            self.load(path)
+        elif dimension:
+            self._create_index(dimension)
+
+    @property
+    def ef(self) -> int:
+        return self._ef
+
+    @ef.setter
+    def ef(self, value: int) -> None:
+        self._ef = value
+        if self._index is not None:
+            self._index.set_ef(value)
+
+    def add_vector(
+        self, vector_id: str, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.add_vectors([{"id": vector_id, "vector": vector, "metadata": metadata or {}}])
+
+    def add_vectors(self, records: Sequence[VectorRecord]) -> int:
+        if not records:
+            return 0
+        vectors = np.asarray([record["vector"] for record in records], dtype=np.float32)
+        with self._lock:
+            if self._index is None:
+                self._create_index(vectors.shape[1])
+            labels = []
+            for record in records:
+                vector_id = str(record["id"])
+                label = self._label_of.get(vector_id)
+                if label is None:
+                    label = self._label_of[vector_id] = self._next_label
+                    self._next_label += 1
+                    self._ids[label] = vector_id
+                labels.append(label)
+                self._metadata[label] = dict(record.get("metadata") or {})
+            required = self._index.get_current_count() + len(records)
+            if required > self._index.get_max_elements():
+                self._index.resize_index(max(required, 2 * self._index.get_max_elements()))
+            self._index.add_items(vectors, np.asarray(labels, dtype=np.int64), replace_deleted=True)
+            self._dirty = True
+        return len(records)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            removed = False
+            for vector_id in ids:
+                label = self._label_of.pop(str(vector_id), None)
+                if label is not None and self._index is not None:
+                    self._index.mark_deleted(label)
+                    self._ids.pop(label, None)
+                    self._metadata.pop(label, None)
+                    removed = True
+            self._dirty = self._dirty or removed
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        ef: Optional[int] = None,
+    ) -> List[VectorHit]:
+        return self.search_batch([query_vector], k=k, filter=filter, ef=ef)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        *,
+        ef: Optional[int] = None,
+    ) -> List[List[VectorHit]]:
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        with self._lock:
+            accept = None
+            candidates = len(self._label_of)
+            if filter:
+                matching = {
+                    label for label, metadata in self._metadata.items() if metadata_matches(metadata, filter)
+                }
+                accept = matching.__contains__
+                candidates = len(matching)
+            # hnswlib raises if it cannot return k results, so never ask for more than match.
+            k = min(k, candidates)
+            if self._index is None or k <= 0:
+                return [[] for _ in range(len(queries))]
+            self._index.set_ef(max(ef or self._ef, k))
+            try:
+                labels, distances = self._index.knn_query(queries, k=k, filter=accept)
+            finally:
+                self._index.set_ef(self._ef)
+            return [
+                [
+                    {
+                        "id": self._ids[int(label)],
+                        "score": 1.0 - float(distance),
+                        "metadata": dict(self._metadata[int(label)]),
+                    }
+                    for label, distance in zip(row_labels, row_distances)
+                ]
+                for row_labels, row_distances in zip(labels, distances)
+            ]
+
+    def count(self) -> int:
+        return len(self._label_of)
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self._path
+        if not path:
+            raise ValueError("No path given for saving the HNSW index")
+        with self._lock:
+            if self._index is None:
+                return
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Index first, sidecar last, each swapped in whole: a crash mid-save
+            # leaves the previous files intact instead of a truncated graph.
+            temporary_index = f"{path}.tmp"
+            self._index.save_index(temporary_index)
+            os.replace(temporary_index, path)
+            temporary = f"{path}.json.tmp"
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump(
+                    {
+                        "dimension": self._index.dim,
+                        "next_label": self._next_label,
+                        "ids": {str(label): vector_id for label, vector_id in self._ids.items()},
+                        "metadata": {str(label): metadata for label, metadata in self._metadata.items()},
+                    },
+                    handle,
+                    ensure_ascii=False,
+                    default=str,
+                )
+            os.replace(temporary, f"{path}.json")
+            if path == self._path:
+                self._dirty = False
+
+    def flush(self) -> None:
+        """Save to the index path if anything changed since the last save."""
+
+        with self._lock:
+            if self._dirty and self._path:
+                self.save(self._path)
+
+    def load(self, path: str) -> None:
+        with self._lock:
+            with open(f"{path}.json", encoding="utf-8") as handle:
+                sidecar = json.load(handle)
+            index = self._hnswlib.Index(space="cosine", dim=int(sidecar["dimension"]))
+            index.load_index(path, allow_replace_deleted=True)
+            index.set_ef(self._ef)
+            self._index = index
+            self._ids = {int(label): vector_id for label, vector_id in sidecar["ids"].items()}
+            self._metadata = {int(label): metadata for label, metadata in sidecar["metadata"].items()}
+            self._label_of = {vector_id: label for label, vector_id in self._ids.items()}
+            self._next_label = int(sidecar["next_label"])
+
+    def _create_index(self, dimension: int) -> None:
+        index = self._hnswlib.Index(space="cosine", dim=dimension)
+        index.init_index(
+            max_elements=self._initial_capacity,
+            ef_construction=self._ef_construction,
+            M=self._m,
+            allow_replace_deleted=True,
+        )
+        index.set_ef(self._ef)
+        self._index = index
+
+
+def recall_at_k(
+    candidate: VectorStorageProtocol,
+    reference: VectorStorageProtocol,
+    query_vectors: Sequence[Sequence[float]],
+    k: int = 10,
+    **search_options: Any,
+) -> Dict[str, Any]:
+    """Compare an approximate index with exact search over the same vectors.
+
+    ``search_options`` (e.g. ``nprobe`` or ``ef``) are passed to the candidate.
+    """
+
+    if not query_vectors:
+        raise ValueError("recall_at_k needs at least one query vector")
+
+    started = time.perf_counter()
+    expected = _search_all(reference, query_vectors, k)
+    reference_ms = (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    found = _search_all(candidate, query_vectors, k, **search_options)
+    candidate_ms = (time.perf_counter() - started) * 1000.0
+
+    recalls = []
+    for exact_hits, approximate_hits in zip(expected, found):
+        exact_ids = {hit["id"] for hit in exact_hits}
+        if exact_ids:
+            recalls.append(len(exact_ids & {hit["id"] for hit in approximate_hits}) / len(exact_ids))
+    return {
+        "k": k,
+        "queries": len(query_vectors),
+        "recall": float(np.mean(recalls)) if recalls else 0.0,
+        "min_recall": float(np.min(recalls)) if recalls else 0.0,
+        "reference_ms_per_query": reference_ms / len(query_vectors),
+        "candidate_ms_per_query": candidate_ms / len(query_vectors),
+        "search_options": search_options,
+    }
+
+
+def metadata_matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Equality filter; a list/tuple/set value matches any of its members."""
+
+    for key, wanted in filter.items():
+        value = metadata.get(key)
+        if isinstance(wanted, (list, tuple, set)):
+            if value not in wanted:
+                return False
+        elif value != wanted:
+            return False
+    return True
+
+
+def _search_all(
+    storage: VectorStorageProtocol, query_vectors: Sequence[Sequence[float]], k: int, **options: Any
+) -> List[List[VectorHit]]:
+    search_batch = getattr(storage, "search_batch", None)
+    if search_batch is not None:
+        return search_batch(query_vectors, k=k, **options)
+    return [storage.search(query, k=k, **options) for query in query_vectors]
+
+
+def _spherical_kmeans(
+    sample: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=clusters)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters on random points so every list gets used.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def _default_nlist(size: int) -> int:
+    return max(1, int(4 * np.sqrt(size)))
+
+
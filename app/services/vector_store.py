@@ -1,15 +1,431 @@
-# Placeholder for vector DB logic if needed in the future.
+"""Vector storage backends and the service used by hybrid search."""
 
+from __future__ import annotations
 
+import json
 import logging
-import uuid
-from typing import List, Optional, Dict, Any, Tuple
-import chromadb
-from chromadb.config import Settings
+import os
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import json
-from datetime import datetime
+
+from app.core.contracts.vector_store import (
+    VectorHit,
+    VectorRecord,
+    VectorStorageProtocol,
+)
+from app.services.hybrid_search import article_key
+
+LOGGER = logging.getLogger(__name__)
+
+_METADATA_TYPES = (str, int, float, bool)
+
+
+class ChromaVectorStorage:
+    """Persistent vector storage on a Chroma ``PersistentClient`` collection (cosine space)."""
+
+    def __init__(
+        self,
+        persist_directory: str,
+        *,
+        collection_name: str = "legal_articles",
+        batch_size: int = 512,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        try:
+            import chromadb
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "chromadb is required for the Chroma vector store; install it with `pip install chromadb`."
+            ) from exc
+
+        self._batch_size = max(batch_size, 1)
+        self._logger = logger or LOGGER
+        self._client = chromadb.PersistentClient(path=persist_directory)
+        self._collection = self._client.get_or_create_collection(
+            name=collection_name, metadata={"hnsw:space": "cosine"}
+        )
+
+    def add_vector(
+        self, vector_id: str, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.add_vectors([{"id": vector_id, "vector": vector, "metadata": metadata or {}}])
+
+    def add_vectors(self, records: Sequence[VectorRecord]) -> int:
+        for offset in range(0, len(records), self._batch_size):
+            batch = records[offset : offset + self._batch_size]
+            self._collection.upsert(
+                ids=[str(record["id"]) for record in batch],
+                embeddings=[[float(value) for value in record["vector"]] for record in batch],
+                metadatas=[_chroma_metadata(record.get("metadata")) for record in batch],
+            )
+        return len(records)
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[VectorHit]:
+        result = self._collection.query(
+            query_embeddings=[[float(value) for value in query_vector]],
+            n_results=k,
+            where=chroma_where(filter),
+            include=["metadatas", "distances"],
+        )
+        ids = (result.get("ids") or [[]])[0]
+        distances = (result.get("distances") or [[]])[0]
+        metadatas = (result.get("metadatas") or [[]])[0]
+        # Chroma's cosine "distance" is 1 - cosine similarity.
+        return [
+            {"id": vector_id, "score": 1.0 - float(distance), "metadata": dict(metadata or {})}
+            for vector_id, distance, metadata in zip(ids, distances, metadatas)
+        ]
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if ids:
+            self._collection.delete(ids=[str(vector_id) for vector_id in ids])
+
+    def count(self) -> int:
+        return int(self._collection.count())
+
+
+class MemmapVectorStorage:
+    """Exact cosine search over an L2-normalised float16 matrix memory-mapped from disk.
+
+    ``embeddings.f16.npy`` holds one row per vector and ``vectors.json`` maps
+    rows to ids and metadata. Every worker maps the same file read-only, so the
+    pages are shared through the OS page cache and opening is instant.
+
+    The matrix is preallocated in chunks: inserts fill its spare rows in place
+    and it is only copied when it runs out of room, doubling its capacity.
+    The sidecar is rewritten once per batch by :meth:`flush`; only then do
+    other processes see the new rows (a replaced row's vector is overwritten
+    in place, so they see that straight away). Deletes compact both files at once.
+    """
+
+    MATRIX_FILE = "embeddings.f16.npy"
+    SIDECAR_FILE = "vectors.json"
+    MIN_CAPACITY = 1024
+
+    def __init__(self, directory: str, *, logger: Optional[logging.Logger] = None) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self._matrix_path = os.path.join(directory, self.MATRIX_FILE)
+        self._sidecar_path = os.path.join(directory, self.SIDECAR_FILE)
+        self._logger = logger or LOGGER
+        self._write_lock = threading.Lock()
+        self._snapshot = _MemmapSnapshot.empty()
+        self._loaded_generation: Optional[tuple] = None
+        # Writable mapping of the matrix file, including its spare rows.
+        self._writable: Optional[np.ndarray] = None
+        self._dirty = False
+        self._refresh()
+
+    def add_vector(
+        self, vector_id: str, vector: Sequence[float], metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.add_vectors([{"id": vector_id, "vector": vector, "metadata": metadata or {}}])
+
+    def add_vectors(self, records: Sequence[VectorRecord]) -> int:
+        """Upsert ``records`` into the matrix; call :meth:`flush` to publish them."""
+
+        if not records:
+            return 0
+        incoming = _normalize_rows(
+            np.asarray([record["vector"] for record in records], dtype=np.float32)
+        )
+        with self._write_lock:
+            self._refresh()
+            current = self._snapshot
+            if current.dimension and incoming.shape[1] != current.dimension:
+                raise ValueError(
+                    f"Vector dimension {incoming.shape[1]} does not match the store ({current.dimension})"
+                )
+            ids = list(current.ids)
+            metadata = list(current.metadata)
+            row_of = {vector_id: row for row, vector_id in enumerate(ids)}
+            rows: List[int] = []
+            for record in records:
+                vector_id = str(record["id"])
+                row = row_of.get(vector_id)
+                if row is None:
+                    row = row_of[vector_id] = len(ids)
+                    ids.append(vector_id)
+                    metadata.append({})
+                metadata[row] = dict(record.get("metadata") or {})
+                rows.append(row)
+
+            matrix = self._reserve(len(ids), incoming.shape[1])
+            matrix[np.asarray(rows)] = incoming.astype(np.float16)
+            matrix.flush()
+            self._snapshot = _MemmapSnapshot(matrix[: len(ids)], ids, metadata)
+            self._dirty = True
+        return len(records)
+
+    def flush(self) -> None:
+        """Write the sidecar so other processes see the rows added since the last flush."""
+
+        with self._write_lock:
+            if not self._dirty:
+                return
+            self._write_sidecar(self._snapshot.ids, self._snapshot.metadata)
+            self._dirty = False
+            self._refresh(force=True)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        doomed = {str(vector_id) for vector_id in ids}
+        with self._write_lock:
+            self._refresh()
+            current = self._snapshot
+            keep = [row for row, vector_id in enumerate(current.ids) if vector_id not in doomed]
+            if len(keep) == len(current.ids):
+                return
+            self._write(
+                np.asarray(current.matrix[keep], dtype=np.float16),
+                [current.ids[row] for row in keep],
+                [current.metadata[row] for row in keep],
+            )
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[VectorHit]:
+        return self.search_batch([query_vector], k=k, filter=filter)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[VectorHit]]:
+        """Score every query against the whole matrix with one matrix multiply."""
+
+        self._refresh()
+        snapshot = self._snapshot
+        if not len(snapshot.ids) or k <= 0:
+            return [[] for _ in query_vectors]
+
+        queries = _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        scores = queries @ np.asarray(snapshot.matrix, dtype=np.float32).T
+        mask = snapshot.filter_mask(filter)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        available = int(mask.sum()) if mask is not None else len(snapshot.ids)
+        k = min(k, available)
+        if k == 0:
+            return [[] for _ in query_vectors]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results: List[List[VectorHit]] = []
+        for query_scores, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-query_scores[candidates], kind="stable")]
+            results.append(
+                [
+                    {
+                        "id": snapshot.ids[row],
+                        "score": float(query_scores[row]),
+                        "metadata": dict(snapshot.metadata[row]),
+                    }
+                    for row in ordered
+                ]
+            )
+        return results
+
+    def count(self) -> int:
+        self._refresh()
+        return len(self._snapshot.ids)
+
+    def _reserve(self, rows: int, dimension: int) -> np.ndarray:
+        """Return a writable mapping of the matrix file with room for ``rows`` rows."""
+
+        matrix = self._writable
+        if matrix is None and self._snapshot.ids:
+            matrix = self._writable = np.load(self._matrix_path, mmap_mode="r+")
+        if matrix is not None and matrix.shape[0] >= rows and matrix.shape[1] == dimension:
+            return matrix
+
+        existing = len(self._snapshot.ids)
+        capacity = max(rows, 2 * existing, self.MIN_CAPACITY)
+        temporary = f"{self._matrix_path}.tmp"
+        grown = np.lib.format.open_memmap(
+            temporary, mode="w+", dtype=np.float16, shape=(capacity, dimension)
+        )
+        if existing:
+            grown[:existing] = self._snapshot.matrix[:existing]
+        grown.flush()
+        # The old file stays mapped by readers until they pick up the next sidecar;
+        # its first ``existing`` rows are the ones the current sidecar refers to.
+        os.replace(temporary, self._matrix_path)
+        self._writable = grown
+        return grown
+
+    def _write(self, matrix: np.ndarray, ids: List[str], metadata: List[Dict[str, Any]]) -> None:
+        # Matrix first, sidecar last: readers reload when the sidecar changes,
+        # so they never pair a new sidecar with an old matrix.
+        temporary_matrix = f"{self._matrix_path}.tmp"
+        with open(temporary_matrix, "wb") as handle:
+            np.save(handle, np.ascontiguousarray(matrix, dtype=np.float16))
+        os.replace(temporary_matrix, self._matrix_path)
+        self._writable = None
+        self._write_sidecar(ids, metadata)
+        self._dirty = False
+        self._refresh(force=True)
+
+    def _write_sidecar(self, ids: List[str], metadata: List[Dict[str, Any]]) -> None:
+        temporary_sidecar = f"{self._sidecar_path}.tmp"
+        with open(temporary_sidecar, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"ids": ids, "metadata": metadata}, handle, ensure_ascii=False, default=str
+            )
+        os.replace(temporary_sidecar, self._sidecar_path)
+
+    def _refresh(self, *, force: bool = False) -> None:
+        if self._dirty and not force:
+            # Unflushed rows live only in this process; keep them over the file.
+            return
+        try:
+            status = os.stat(self._sidecar_path)
+        except FileNotFoundError:
+            return
+        # os.replace gives every generation a new inode, even within one mtime tick.
+        generation = (status.st_ino, status.st_mtime_ns)
+        if not force and generation == self._loaded_generation:
+            return
+        with open(self._sidecar_path, encoding="utf-8") as handle:
+            sidecar = json.load(handle)
+        matrix = np.load(self._matrix_path, mmap_mode="r")
+        if matrix.shape[0] < len(sidecar["ids"]):
+            # A writer is between the two renames; keep the previous generation.
+            return
+        self._snapshot = _MemmapSnapshot(
+            matrix[: len(sidecar["ids"])], sidecar["ids"], sidecar["metadata"]
+        )
+        self._loaded_generation = generation
+
+
+class _MemmapSnapshot:
+    """One immutable generation of the store, swapped in as a whole."""
+
+    def __init__(self, matrix: np.ndarray, ids: List[str], metadata: List[Dict[str, Any]]) -> None:
+        self.matrix = matrix
+        self.ids = ids
+        self.metadata = metadata
+        self.dimension = int(matrix.shape[1]) if matrix.ndim == 2 and matrix.shape[0] else 0
+        self._columns: Dict[str, np.ndarray] = {}
+        self._columns_lock = threading.Lock()
+
+    @classmethod
+    def empty(cls) -> "_MemmapSnapshot":
+        return cls(np.zeros((0, 0), dtype=np.float16), [], [])
+
+    def filter_mask(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, value in filter.items():
+            wanted = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            mask &= np.isin(self._column(key), np.asarray(wanted, dtype=object))
+        return mask
+
+    def _column(self, key: str) -> np.ndarray:
+        with self._columns_lock:
+            column = self._columns.get(key)
+            if column is None:
+                column = np.empty(len(self.metadata), dtype=object)
+                column[:] = [entry.get(key) for entry in self.metadata]
+                self._columns[key] = column
+            return column
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def chroma_where(filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Translate ``{"article_number": "10", "language": ["th", "en"]}`` into a Chroma ``where``."""
+
+    if not filter:
+        return None
+    clauses = [
+        {key: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for key, value in filter.items()
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _chroma_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Chroma only stores scalar metadata values and rejects empty maps.
+    cleaned = {
+        key: value if isinstance(value, _METADATA_TYPES) else str(value)
+        for key, value in (metadata or {}).items()
+        if value is not None
+    }
+    return cleaned or None
+
+
+def create_vector_storage_from_settings(config: Any) -> VectorStorageProtocol:
+    if config.VECTOR_STORE_BACKEND == "chroma":
+        return ChromaVectorStorage(
+            config.VECTOR_STORE_PATH, collection_name=config.VECTOR_STORE_COLLECTION
+        )
+    if config.VECTOR_STORE_BACKEND == "memmap":
+        return MemmapVectorStorage(config.VECTOR_STORE_PATH)
+    if config.VECTOR_STORE_BACKEND == "ivf":
+        from app.services.vector_index import IVFVectorStorage
+
+        return IVFVectorStorage(
+            os.path.join(config.VECTOR_STORE_PATH, "ivf_index.npz"),
+            nlist=config.VECTOR_INDEX_NLIST,
+            nprobe=config.VECTOR_INDEX_NPROBE,
+        )
+    if config.VECTOR_STORE_BACKEND == "hnsw":
+        from app.services.vector_index import HnswVectorStorage
+
+        return HnswVectorStorage(
+            os.path.join(config.VECTOR_STORE_PATH, "hnsw_index.bin"), ef=config.VECTOR_INDEX_EF
+        )
+    raise ValueError(f"Unsupported VECTOR_STORE_BACKEND: {config.VECTOR_STORE_BACKEND!r}")
+
+
+def index_articles(
+    vector_storage: VectorStorageProtocol, embedder: Any, articles: Mapping[str, str]
+) -> int:
+    """Embed dataset articles (titled ``มาตรา ...``) and upsert one vector per title.
+
+    Vector ids are the titles; the metadata carries the normalised
+    ``article_number`` that hybrid search fuses on. Returns the vectors written.
+    """
+
+    titles = list(articles)
+    if not titles:
+        return 0
+    vectors = embedder.encode([articles[title] for title in titles])
+    written = vector_storage.add_vectors(
+        [
+            {
+                "id": title,
+                "vector": [float(value) for value in vector],
+                "metadata": {"article_number": article_key({"id": title}), "title": title},
+            }
+            for title, vector in zip(titles, vectors)
+        ]
+    )
+    flush_vector_storage(vector_storage)
+    return written
+
+
+def flush_vector_storage(vector_storage: VectorStorageProtocol) -> None:
+    """Persist buffered writes for backends that only save on ``flush()``."""
+
+    flush = getattr(vector_storage, "flush", None)
+    if callable(flush):
+        flush()
 
 
 class VectorStoreService:
@@ -18,13 +434,15 @@ class VectorStoreService:
     This adheres to the Single Responsibility Principle by focusing solely on vector storage operations.
     """
 
-    def __init__(self, vector_storage):
+    def __init__(self, vector_storage: VectorStorageProtocol, embedder: Any = None):
         """
         Initialize the service with a storage backend for the Vector Store.
 
         :param vector_storage: A storage backend for the Vector Store.
+        :param embedder: Model with an ``encode(texts)`` method, used to embed text queries.
         """
         self.vector_storage = vector_storage
+        self.embedder = embedder
 
     def save_vectors(self, vectors):
         """
@@ -33,8 +451,41 @@ class VectorStoreService:
         :param vectors: A list of vectors to save.
         :return: Confirmation of the save operation.
         """
-        for vector in vectors:
-            self.vector_storage.add_vector(
-                vector["id"], vector["vector"], metadata=vector.get("metadata", {})
-            )
+        add_vectors = getattr(self.vector_storage, "add_vectors", None)
+        if callable(add_vectors):
+            add_vectors(vectors)
+        else:
+            for vector in vectors:
+                self.vector_storage.add_vector(
+                    vector["id"], vector["vector"], metadata=vector.get("metadata", {})
+                )
+        flush_vector_storage(self.vector_storage)
         return {"status": "success", "message": "Vectors saved to Vector Store."}
+
+    def search(self, query, k=10, filter=None):
+        """
+        Search the Vector Store by text or by vector.
+
+        :param query: Query text (embedded with ``embedder``) or a query vector.
+        :param k: Number of hits to return.
+        :param filter: Exact-match metadata filter, e.g. ``{"language": "th"}``.
+        :return: Hits as ``{"id", "score", "metadata"}`` dicts, best first.
+        """
+        if isinstance(query, str):
+            if self.embedder is None:
+                raise ValueError("Text queries need an embedder; pass a query vector instead.")
+            # Query vectors are not worth persisting in the embedding cache.
+            encode_query = getattr(self.embedder, "encode_query", None)
+            if callable(encode_query):
+                query = encode_query(query)
+            else:
+                query = self.embedder.encode([query])[0]
+        return self.vector_storage.search(query, k=k, filter=filter)
+
+    def delete(self, ids):
+        """
+        Remove vectors from the Vector Store.
+
+        :param ids: Ids of the vectors to remove.
+        """
+        self.vector_storage.delete(ids)
@@ -1,14 +1,35 @@
 # Placeholder for additional app logic if needed in the future.
-def main():
-    import uvicorn
-    from fastapi import FastAPI
-    from app.api.v1.endpoints import legal_ontology, nlp_training, question_answering
+def create_app():
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+    from app.api.v1.endpoints import (
+        hybrid_search,
+        legal_ontology,
+        models,
+        nlp_training,
+        question_answering,
+    )
+    from app.core.lifespan import lifespan
+    from app.services.inference_executor import InferenceOverloadedError
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.exception_handler(InferenceOverloadedError)
+    async def inference_overloaded(request: Request, exc: InferenceOverloadedError):
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
-    app = FastAPI()
     app.include_router(legal_ontology.router, prefix="/api/v1")
     app.include_router(nlp_training.router, prefix="/api/v1", tags=["NLP Training"])
     app.include_router(question_answering.router, prefix="/api/v1/qa", tags=["Question Answering"])
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    app.include_router(models.router, prefix="/api/v1", tags=["Models"])
+    app.include_router(hybrid_search.router, prefix="/api/v1", tags=["Hybrid Search"])
+    return app
+
+
+def main():
+    import uvicorn
+
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
 
 
 if __name__ == "__main__":
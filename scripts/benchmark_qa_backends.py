@@ -0,0 +1,59 @@
+import sys
+import os
+import argparse
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.qa_service import DEFAULT_QA_MODEL, QAService, compare_qa_backends
+
+SAMPLES = [
+    (
+        "ห้ามนายจ้างเรียกหลักประกันจากใคร",
+        "มาตรา 12 ห้ามมิให้นายจ้างเรียกหรือรับหลักประกันเพื่อการใดๆ จากลูกจ้าง เว้นแต่ลักษณะหรือสภาพของงานที่ทำนั้น ลูกจ้างต้องรับผิดชอบเกี่ยวกับการเงินหรือทรัพย์สินของนายจ้าง",
+    ),
+    (
+        "จ้างเด็กอายุต่ำกว่ากี่ปีไม่ได้",
+        "มาตรา 44 ห้ามมิให้นายจ้างจ้างเด็กอายุต่ำกว่าสิบห้าปีเป็นลูกจ้าง",
+    ),
+    (
+        "ลูกจ้างมีสิทธิลากิจได้กี่วัน",
+        "มาตรา 34 ให้ลูกจ้างมีสิทธิลาเพื่อกิจธุระอันจำเป็นได้ปีละไม่น้อยกว่า สามวันทำงาน",
+    ),
+]
+
+
+def main():
+    """
+    Exports the QA model to ONNX (if needed) and compares it with eager PyTorch
+    for logit parity, answer agreement and latency.
+    """
+    parser = argparse.ArgumentParser(description="Compare QA inference backends")
+    parser.add_argument("--model-name", default=DEFAULT_QA_MODEL, help="QA model id or fine-tuned model directory")
+    parser.add_argument("--onnx-dir", default=os.path.join("models", "qa_onnx"), help="Where the ONNX export is stored")
+    parser.add_argument("--quantize", action="store_true", help="Compare against the int8-quantized model")
+    parser.add_argument("--repeats", type=int, default=5, help="Latency repetitions per sample")
+    args = parser.parse_args()
+
+    print("Loading PyTorch reference backend...")
+    reference = QAService(model_name=args.model_name, backend="torch")
+    print("Loading ONNX Runtime backend...")
+    candidate = QAService(
+        model_name=args.model_name,
+        backend="onnx",
+        onnx_dir=args.onnx_dir,
+        onnx_quantize=args.quantize,
+    )
+
+    report = compare_qa_backends(reference, candidate, SAMPLES, repeats=args.repeats)
+
+    print("\n--- Backend Comparison ---")
+    print(f"Max |logit difference|: {report['max_abs_logit_diff']:.5f}")
+    print(f"Answer agreement:       {report['answer_agreement']:.0%}")
+    print(f"PyTorch median latency: {report['reference_median_ms']:.1f} ms")
+    print(f"ONNX median latency:    {report['candidate_median_ms']:.1f} ms")
+    print(f"Speed-up:               {report['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,9 @@ from sentence_transformers import SentenceTransformer, InputExample, losses
 from torch.utils.data import DataLoader
 import chromadb
 
+from app.core.config import settings
 from app.nlp.dataset import DEFAULT_ARTICLE_FILE, load_legal_articles
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
 
 
 DEFAULT_TRIPLET_FILES = [
@@ -245,9 +247,14 @@ def main():
         client = chromadb.Client()
         ids = list(articles.keys())
         contents = list(articles.values())
+        cache = (
+            SQLiteEmbeddingCache(settings.EMBEDDING_CACHE_PATH)
+            if settings.EMBEDDING_CACHE_PATH
+            else None
+        )
 
-        # A) Search with the BASE model
-        base_model = SentenceTransformer(args.model_name)
+        # A) Search with the BASE model (its article vectors are usually cached already)
+        base_model = EmbeddingService(model_name=args.model_name, cache=cache)
         base_collection = client.get_or_create_collection(
             name="base_model_search", metadata={"hnsw:space": "cosine"}
         )
@@ -264,8 +271,8 @@ def main():
         ):
             print(f"{i+1}. {doc_id} (Score: {1 - dist:.4f})")
 
-        # B) Search with the FINE-TUNED model
-        finetuned_model = SentenceTransformer(finetuned_model_dir)
+        # B) Search with the FINE-TUNED model, reusing the trained model in memory
+        finetuned_model = EmbeddingService(model, model_name=finetuned_model_dir, cache=cache)
         ft_collection = client.get_or_create_collection(
             name="ft_model_search", metadata={"hnsw:space": "cosine"}
         )
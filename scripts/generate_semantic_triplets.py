@@ -16,8 +16,8 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from app.core.config import settings
 from app.nlp.dataset import (
     DEFAULT_ARTICLE_FILE,
     cleanup_whitespace,
@@ -25,6 +25,7 @@ from app.nlp.dataset import (
     load_legal_articles,
     take_leading_phrase,
 )
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
 
 
 def parse_args() -> argparse.Namespace:
@@ -196,8 +197,12 @@ def main() -> None:
 
     print(f"Loaded {len(article_titles)} articles from {args.data_file}")
 
-    model = SentenceTransformer(args.model_name)
-    embeddings = model.encode(article_texts, show_progress_bar=True)
+    embedder = EmbeddingService(
+        model_name=args.model_name,
+        cache=SQLiteEmbeddingCache(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else None,
+    )
+    embeddings = embedder.encode(article_texts)
+    print(f"Encoded {embedder.stats()['misses']} articles ({embedder.stats()['hits']} from cache)")
     similarity = compute_similarity_matrix(np.asarray(embeddings))
 
     triplets = []
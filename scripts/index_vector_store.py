@@ -0,0 +1,39 @@
+import sys
+import os
+import argparse
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.nlp.dataset import load_legal_articles
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
+from app.services.vector_store import create_vector_storage_from_settings, index_articles
+
+
+def main():
+    """
+    Embeds every legal article into the configured vector store
+    (VECTOR_STORE_BACKEND / VECTOR_STORE_PATH), replacing existing vectors by title.
+    The API only indexes an empty store on startup; run this after the dataset
+    or the embedding model changes.
+    """
+    parser = argparse.ArgumentParser(description="Index the legal articles into the vector store")
+    parser.add_argument("--data-file", default=None, help="Article dataset (defaults to the canonical one)")
+    args = parser.parse_args()
+
+    articles = load_legal_articles(args.data_file)
+    storage = create_vector_storage_from_settings(settings)
+    embedder = EmbeddingService(
+        model_name=settings.EMBEDDING_MODEL_NAME,
+        cache=SQLiteEmbeddingCache(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else None,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+    )
+
+    print(f"Embedding {len(articles)} articles with {settings.EMBEDDING_MODEL_NAME}...")
+    written = index_articles(storage, embedder, articles)
+    print(f"Indexed {written} vectors into the {settings.VECTOR_STORE_BACKEND} store at {settings.VECTOR_STORE_PATH} ({storage.count()} total)")
+
+
+if __name__ == "__main__":
+    main()
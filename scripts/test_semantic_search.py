@@ -6,9 +6,11 @@ import re
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sentence_transformers import SentenceTransformer
 import chromadb
 
+from app.core.config import settings
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
+
 # Define the path to the data file
 DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "dataset", "data1.txt")
 
@@ -17,11 +19,12 @@ def main():
     Demonstrates semantic search by creating vector embeddings for legal articles
     and searching for them based on a query's meaning.
     """
-    # 1. Load a pre-trained model for creating sentence embeddings
-    print("Loading sentence-transformer model... (This may take a moment)")
+    # 1. Set up the embedding service (the model is loaded on the first cache miss)
     # Using a multilingual model is a good choice for Thai
-    model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-    print("Model loaded.")
+    embedder = EmbeddingService(
+        model_name=settings.EMBEDDING_MODEL_NAME,
+        cache=SQLiteEmbeddingCache(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else None,
+    )
 
     # 2. Read and parse the legal text into articles (มาตรา)
     print(f"Reading and parsing legal articles from {DATA_FILE_PATH}...")
@@ -62,8 +65,9 @@ def main():
     ids = list(documents.keys())
     contents = list(documents.values())
     
-    # Generate embeddings in batches (more efficient for large numbers of docs)
-    embeddings = model.encode(contents, show_progress_bar=True)
+    # Articles embedded on a previous run come straight from the cache
+    embeddings = embedder.encode(contents)
+    print(f"Embedding cache: {embedder.stats()['hits']} hits, {embedder.stats()['misses']} encoded")
     
     # Add to ChromaDB
     collection.add(
@@ -82,7 +86,7 @@ def main():
     print(f"Searching for: '{query_text}'")
     
     # Generate the embedding for the query
-    query_embedding = model.encode([query_text])
+    query_embedding = embedder.encode([query_text])
     
     # Query the collection to find the most similar articles
     results = collection.query(
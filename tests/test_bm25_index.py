@@ -0,0 +1,90 @@
+import math
+
+from app.services import bm25_index
+from app.services.bm25_index import BM25Index, load_or_build_bm25_index
+
+ARTICLES = {
+    "มาตรา 10": "ห้าม นายจ้าง เรียก หลักประกัน จาก ลูกจ้าง",
+    "มาตรา 11": "หลักประกัน ที่ นายจ้าง เรียก ต้อง คืน หลักประกัน",
+    "มาตรา 44": "ห้าม จ้าง เด็ก อายุ ต่ำกว่า สิบห้า ปี",
+}
+
+
+def _tokenize(text):
+    return text.lower().split()
+
+
+def test_bm25_ranks_by_term_frequency_and_idf():
+    index = BM25Index.build(ARTICLES, tokenizer=_tokenize)
+
+    hits = index.search("หลักประกัน")
+    assert [hit["id"] for hit in hits] == ["มาตรา 11", "มาตรา 10"]
+
+    # Hand-computed Okapi BM25 for the single-term query on มาตรา 10.
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    average_length = (6 + 7 + 7) / 3
+    expected = idf * 1 * 2.5 / (1 + 1.5 * (0.25 + 0.75 * 6 / average_length))
+    assert abs(hits[1]["score"] - expected) < 1e-5
+
+    assert index.search("ไม่มีคำนี้") == []
+    assert [hit["id"] for hit in index.search("ห้าม เด็ก", k=1)] == ["มาตรา 44"]
+
+
+def test_batched_queries_match_single_queries():
+    index = BM25Index.build(ARTICLES, tokenizer=_tokenize)
+    queries = ["หลักประกัน", "ไม่มีคำนี้", "ห้าม นายจ้าง", "เด็ก"]
+
+    assert index.search_batch(queries, k=2) == [index.search(query, k=2) for query in queries]
+
+
+def test_index_round_trips_and_rebuilds_when_corpus_changes(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    built = load_or_build_bm25_index(path, lambda: ARTICLES, tokenizer=_tokenize)
+
+    calls = []
+    loaded = load_or_build_bm25_index(
+        path, lambda: ARTICLES, tokenizer=lambda text: calls.append(text) or _tokenize(text)
+    )
+    assert calls == []  # reused from disk, not re-segmented
+    assert loaded.corpus_digest == built.corpus_digest
+    assert loaded.search_batch(["หลักประกัน", "เด็ก"]) == built.search_batch(["หลักประกัน", "เด็ก"])
+
+    changed = dict(ARTICLES, **{"มาตรา 12": "หลักประกัน หลักประกัน หลักประกัน"})
+    rebuilt = load_or_build_bm25_index(path, lambda: changed, tokenizer=_tokenize)
+    assert len(rebuilt) == 4
+    assert rebuilt.search("หลักประกัน")[0]["id"] == "มาตรา 12"
+    assert len(BM25Index.load(path, tokenizer=_tokenize)) == 4
+
+
+def test_index_is_rebuilt_when_the_tokenizer_engine_changes(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    load_or_build_bm25_index(path, lambda: ARTICLES, tokenizer=_tokenize, tokenizer_engine="newmm")
+
+    calls = []
+    rebuilt = load_or_build_bm25_index(
+        path,
+        lambda: ARTICLES,
+        tokenizer=lambda text: calls.append(text) or _tokenize(text),
+        tokenizer_engine="longest",
+    )
+
+    assert len(calls) == len(ARTICLES)
+    assert rebuilt.tokenizer_engine == "longest"
+    assert BM25Index.load(path).tokenizer_engine == "longest"
+
+
+def test_loaded_index_segments_queries_with_the_saved_engine(tmp_path, monkeypatch):
+    path = str(tmp_path / "bm25.npz")
+    BM25Index.build(ARTICLES, tokenizer=_tokenize, tokenizer_engine="longest").save(path)
+    engines = []
+
+    def fake_thai_word_tokenizer(engine="newmm"):
+        engines.append(engine)
+        return _tokenize
+
+    monkeypatch.setattr(bm25_index, "thai_word_tokenizer", fake_thai_word_tokenizer)
+
+    hits = BM25Index.load(path).search("หลักประกัน")
+
+    assert engines == ["longest"]
+    assert hits[0]["id"] == "มาตรา 11"
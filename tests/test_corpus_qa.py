@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+
+import pytest
+
+from app.services.corpus_qa import CorpusQAService
+from app.services.inference_executor import InferenceExecutor
+from app.services.vector_store import MemmapVectorStorage, VectorStoreService, index_articles
+
+ARTICLES = {
+    "มาตรา 10": "ห้ามมิให้นายจ้างเรียกหลักประกัน",
+    "มาตรา 43": "ห้ามมิให้นายจ้างเลิกจ้างลูกจ้างซึ่งเป็นหญิงเพราะเหตุมีครรภ์",
+    "มาตรา 44": "ห้ามมิให้นายจ้างจ้างเด็กอายุต่ำกว่าสิบห้าปี",
+}
+VECTORS = {
+    "ห้ามมิให้นายจ้างเรียกหลักประกัน": [1.0, 0.0, 0.0],
+    "ห้ามมิให้นายจ้างเลิกจ้างลูกจ้างซึ่งเป็นหญิงเพราะเหตุมีครรภ์": [0.0, 1.0, 0.0],
+    "ห้ามมิให้นายจ้างจ้างเด็กอายุต่ำกว่าสิบห้าปี": [0.0, 0.6, 0.8],
+    "เลิกจ้างเพราะตั้งครรภ์": [0.0, 1.0, 0.1],
+}
+
+
+class FakeEmbedder:
+    def encode(self, texts, **kwargs):
+        return np.array([VECTORS[text] for text in texts], dtype=np.float32)
+
+
+class FakeQAService:
+    def answer_batch(self, items):
+        return [
+            {"answer": context[:8], "score": 0.5 + len(context) / 1000, "start": 0, "end": 8}
+            for _, context in items
+        ]
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    storage = MemmapVectorStorage(str(tmp_path))
+    index_articles(storage, FakeEmbedder(), ARTICLES)
+    return VectorStoreService(storage, embedder=FakeEmbedder())
+
+
+def test_indexed_store_returns_nearest_articles_first(vector_store):
+    hits = vector_store.search("เลิกจ้างเพราะตั้งครรภ์", k=2)
+
+    assert [hit["id"] for hit in hits] == ["มาตรา 43", "มาตรา 44"]
+    assert hits[0]["metadata"]["article_number"] == "43"
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_stream_answers_yields_each_batch_then_final_ranking(vector_store):
+    executor = InferenceExecutor(max_workers=1)
+    service = CorpusQAService(FakeQAService(), vector_store, ARTICLES, executor=executor)
+
+    async def collect():
+        return [
+            event
+            async for event in service.stream_answers(
+                "เลิกจ้างเพราะตั้งครรภ์", top_n=3, batch_size=2
+            )
+        ]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        executor.shutdown()
+
+    assert [event["type"] for event in events] == ["answers", "answers", "done"]
+    assert len(events[0]["answers"]) == 2
+    assert events[0]["answers"][0]["article"] == "มาตรา 43"
+    scores = [item["score"] for item in events[-1]["ranking"]]
+    assert scores == sorted(scores, reverse=True)
+    assert len(scores) == 3
+
+
+def test_reranker_chooses_which_retrieved_articles_are_read(vector_store):
+    class ShortestFirstReranker:
+        def rerank(self, query, candidates, texts):
+            order = sorted(range(len(texts)), key=lambda position: len(texts[position]))
+            return [dict(candidates[position]) for position in order], {}
+
+    executor = InferenceExecutor(max_workers=1)
+    service = CorpusQAService(
+        FakeQAService(),
+        vector_store,
+        ARTICLES,
+        executor=executor,
+        reranker=ShortestFirstReranker(),
+        rerank_depth=3,
+    )
+
+    async def collect():
+        return [event async for event in service.stream_answers("เลิกจ้างเพราะตั้งครรภ์", top_n=1)]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        executor.shutdown()
+
+    assert [item["article"] for item in events[-1]["ranking"]] == ["มาตรา 10"]
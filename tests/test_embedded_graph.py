@@ -0,0 +1,149 @@
+import os
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services.embedded_graph import EmbeddedGraphLockedError, EmbeddedGraphStorage
+from app.services.graph_planning import ARTICLE_CONTEXT_RELATIONSHIPS
+from app.services.knowledge_graph import KnowledgeGraphService
+
+
+def _article_entities(obligations: List[str]) -> List[Dict[str, Any]]:
+    article = {
+        "id": "article::10_th",
+        "label": "LegalArticle",
+        "article_number": "10",
+        "summary": "ห้ามเรียกหลักประกัน",
+        "relationships": [],
+    }
+    children = []
+    for index, action in enumerate(obligations, start=1):
+        child_id = f"10_th::obligation::{index}"
+        article["relationships"].append(
+            {"target": child_id, "type": "HAS_OBLIGATION", "target_label": "LegalObligation"}
+        )
+        children.append({"id": child_id, "label": "LegalObligation", "action": action})
+    return [*children, article]
+
+
+def test_service_round_trip_on_embedded_storage():
+    storage = EmbeddedGraphStorage()
+    service = KnowledgeGraphService(graph_storage=storage, change_detection=True)
+
+    service.save_entities_and_relationships(_article_entities(["คืนหลักประกัน", "แจ้งลูกจ้าง"]))
+    repeat = service.save_entities_and_relationships(
+        _article_entities(["คืนหลักประกัน", "แจ้งลูกจ้าง"])
+    )
+    service.save_entities_and_relationships(_article_entities(["คืนหลักประกัน"]))
+
+    assert repeat["stats"]["skipped"] == 3
+    assert storage.find("action", "คืนหลักประกัน", label="LegalObligation") == [
+        "10_th::obligation::1"
+    ]
+    assert storage.stats()["nodes"] == 2  # obligation 2 was deleted as stale
+
+    results = service.search("หลักประกัน", label="LegalArticle")
+    assert [result["id"] for result in results["results"]] == ["article::10_th"]
+
+    subgraph = service.get_subgraph(
+        ["article::10_th"], rel_types=ARTICLE_CONTEXT_RELATIONSHIPS, root_label="LegalArticle"
+    )
+    assert subgraph["nodes"]["id"] == ["article::10_th", "10_th::obligation::1"]
+    assert subgraph["edges"]["type"] == ["HAS_OBLIGATION"]
+    assert "fingerprint" not in subgraph["nodes"]["properties"][0]
+
+
+def test_stale_children_shared_with_other_nodes_are_kept():
+    storage = EmbeddedGraphStorage()
+    for node_id in ("parent", "other", "child"):
+        storage.add_node(node_id)
+    storage.add_edge("parent", "child", relationship_type="HAS")
+    storage.add_edge("other", "child", relationship_type="HAS")
+
+    storage.bulk_write([], stale_children=[{"parent_id": "parent", "child_ids": ["child"]}])
+
+    assert storage.stats()["nodes"] == 3
+    # The parent no longer points at the shared child.
+    subgraph = storage.get_subgraph(["parent"])
+    assert subgraph["nodes"]["id"] == ["parent"]
+    assert storage.stats()["edges"] == 1
+
+
+def test_search_hides_change_detection_properties():
+    storage = EmbeddedGraphStorage()
+    service = KnowledgeGraphService(graph_storage=storage, change_detection=True)
+    service.save_entities_and_relationships(_article_entities(["คืนหลักประกัน"]))
+
+    results = storage.search("หลักประกัน")
+
+    assert results
+    for result in results:
+        assert "fingerprint" not in result["properties"]
+        assert "child_ids" not in result["properties"]
+
+
+def test_search_follows_property_updates_and_short_queries_still_match():
+    storage = EmbeddedGraphStorage()
+    storage.add_node("a", label="LegalArticle", properties={"summary": "Deposit refund"})
+    storage.add_node("b", label="LegalArticle", properties={"summary": "Wage payment"})
+
+    assert [hit["id"] for hit in storage.search("DEPOSIT")] == ["a"]
+
+    storage.add_node("a", label="LegalArticle", properties={"summary": "Overtime pay"})
+
+    assert storage.search("deposit") == []
+    assert [hit["id"] for hit in storage.search("pay")] == ["a", "b"]
+    assert [hit["id"] for hit in storage.search("ym", label="LegalArticle")] == ["b"]
+
+
+def test_relabelled_node_moves_between_label_indexes():
+    storage = EmbeddedGraphStorage()
+    storage.add_node("n", label="ACTOR", properties={"name": "นายจ้าง"})
+    storage.add_node("n", label="ITEM", properties={"name": "นายจ้าง"})
+
+    assert storage.search("นายจ้าง", label="ACTOR") == []
+    assert [hit["labels"] for hit in storage.search("นายจ้าง", label="ITEM")] == [["ITEM"]]
+    assert storage.stats()["labels"] == {"ITEM": 1}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "graph.snapshot")
+    storage = EmbeddedGraphStorage(path)
+    KnowledgeGraphService(graph_storage=storage).save_entities_and_relationships(
+        _article_entities(["คืนหลักประกัน"])
+    )
+    assert storage.flush() is True
+    assert storage.flush() is False
+    storage.release()
+
+    restored = EmbeddedGraphStorage(path)
+
+    assert restored.stats()["nodes"] == 2 and restored.stats()["edges"] == 1
+    assert restored.fetch_fingerprints([{"id": "article::10_th"}]) == storage.fetch_fingerprints(
+        [{"id": "article::10_th"}]
+    )
+
+
+def test_snapshot_has_a_single_owner(tmp_path):
+    path = str(tmp_path / "graph.snapshot")
+    owner = EmbeddedGraphStorage(path)
+    owner.add_node("article::10_th")
+
+    with pytest.raises(EmbeddedGraphLockedError, match=str(os.getpid())):
+        EmbeddedGraphStorage(path)
+
+    owner.release()
+    assert EmbeddedGraphStorage(path).stats()["nodes"] == 1
+
+
+def test_subgraph_stops_expanding_at_the_limit():
+    storage = EmbeddedGraphStorage()
+    storage.add_node("hub")
+    for index in range(10):
+        storage.add_node(f"leaf::{index}")
+        storage.add_edge("hub", f"leaf::{index}", relationship_type="HAS")
+
+    subgraph = storage.get_subgraph(["hub"], depth=2, limit=4)
+
+    assert len(subgraph["nodes"]["id"]) == 4
+    assert len(subgraph["edges"]["type"]) == 3
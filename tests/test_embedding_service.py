@@ -0,0 +1,78 @@
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache, text_digest
+
+
+class CountingModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False):
+        self.batches.append(list(texts))
+        vectors = np.asarray([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+def test_encode_sorts_batches_by_length_and_preserves_input_order():
+    model = CountingModel()
+    service = EmbeddingService(model, model_id="test-model", batch_size=2)
+
+    vectors = service.encode(["ab", "abcdef", "a", "abcd", "ab"])
+
+    assert model.batches == [["abcdef", "abcd"], ["ab", "a"]]
+    assert vectors[:, 0].tolist() == [2.0, 6.0, 1.0, 4.0, 2.0]
+
+
+def test_disk_cache_skips_unchanged_texts_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    first = EmbeddingService(CountingModel(), model_id="m1", cache=SQLiteEmbeddingCache(path))
+    first.encode(["มาตรา 10 ลูกจ้าง", "มาตรา 11"])
+
+    model = CountingModel()
+    second = EmbeddingService(model, model_id="m1", cache=SQLiteEmbeddingCache(path))
+    vectors = second.encode(["มาตรา  10 ลูกจ้าง ", "มาตรา 12"])
+
+    assert model.batches == [["มาตรา 12"]]
+    assert vectors[0].tolist() == [16.0, 1.0]
+    assert second.stats()["hits"] == 1 and second.stats()["cached"] == 3
+
+    other_model = CountingModel()
+    EmbeddingService(other_model, model_id="m2", cache=SQLiteEmbeddingCache(path)).encode(["มาตรา 11"])
+    assert other_model.batches == [["มาตรา 11"]]
+
+
+def test_cache_keeps_vectors_encoded_with_different_options_apart(tmp_path):
+    cache = SQLiteEmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    model = CountingModel()
+    service = EmbeddingService(model, model_id="m1", cache=cache)
+
+    raw = service.encode(["มาตรา 10"])
+    normalized = service.encode(["มาตรา 10"], normalize_embeddings=True)
+    again = service.encode(["มาตรา 10"], normalize_embeddings=True)
+
+    assert raw[0].tolist() == [8.0, 1.0]
+    assert np.isclose(np.linalg.norm(normalized[0]), 1.0)
+    assert again.tolist() == normalized.tolist()
+    assert len(model.batches) == 2
+    assert cache.count("m1") == 1
+    assert service.stats()["cached"] == 2
+
+
+def test_query_embeddings_bypass_the_persistent_cache(tmp_path):
+    cache = SQLiteEmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    model = CountingModel()
+    service = EmbeddingService(model, model_id="m1", cache=cache)
+
+    service.encode_query("ลูกจ้าง")
+    service.encode_query("ลูกจ้าง")
+
+    assert len(model.batches) == 2
+    assert cache.count() == 0
+    assert service.stats()["misses"] == 0
+
+
+def test_text_digest_ignores_whitespace_but_not_case():
+    assert text_digest(" Section  5 ") == text_digest("Section 5")
+    assert text_digest("Section 5") != text_digest("section 5")
@@ -0,0 +1,53 @@
+import logging
+
+from app.services.graph_query_profiler import (
+    GraphQueryProfiler,
+    redact_parameters,
+    total_db_hits,
+)
+
+
+def test_stats_group_by_template_and_rank_by_total_time():
+    profiler = GraphQueryProfiler(slow_query_ms=10_000)
+    profiler.record("MATCH (n) RETURN n", 0.002, rows=3)
+    profiler.record("MATCH (n)\n  RETURN n", 0.004, rows=5, db_hits=40)
+    profiler.record("RETURN 1 AS ok", 0.0005)
+
+    first, second = profiler.stats()
+
+    assert first["query"] == "MATCH (n) RETURN n"
+    assert first["count"] == 2 and first["mean_rows"] == 4.0
+    assert first["latency_histogram_ms"] == {"<=5": 2}
+    assert first["p95_ms"] == 4.0  # bucket bound capped at the observed max
+    assert (first["profiled"], first["mean_db_hits"]) == (1, 40.0)
+    assert second["mean_db_hits"] is None
+
+
+def test_slow_queries_are_logged_with_redacted_parameters(caplog):
+    profiler = GraphQueryProfiler(slow_query_ms=50)
+
+    with caplog.at_level(logging.WARNING):
+        profiler.record("MATCH (n) WHERE n.id IN $ids", 0.2, parameters={"ids": ["a", "b"], "query": "ลูกจ้าง"})
+
+    assert "<list len=2>" in caplog.text and "<str len=7>" in caplog.text
+    assert "ลูกจ้าง" not in caplog.text
+
+
+def test_profile_sampling_only_applies_to_profilable_statements():
+    profiler = GraphQueryProfiler(profile_sample_rate=0.5, random_source=lambda: 0.1)
+
+    assert profiler.should_profile("MATCH (n) RETURN n")
+    assert not profiler.should_profile("SHOW CONSTRAINTS YIELD type")
+    assert not GraphQueryProfiler().should_profile("MATCH (n) RETURN n")
+
+
+def test_total_db_hits_walks_the_plan_tree():
+    plan = {"dbHits": 2, "children": [{"dbHits": 5, "children": [{"dbHits": 1}]}]}
+
+    assert total_db_hits(plan) == 8
+    assert total_db_hits(None) is None
+    assert redact_parameters({"limit": 5, "props": {"a": 1}, "x": None}) == {
+        "limit": "<int>",
+        "props": "<map keys=1>",
+        "x": "<null>",
+    }
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List
+
+from app.services.graph_write_queue import GraphWriteQueue, GraphWriteWorker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingGraph:
+    def __init__(self, failures: int = 0, poison=(), healthy: bool = True) -> None:
+        self.failures = failures
+        self.poison = set(poison)
+        self.healthy = healthy
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    def save_entities_and_relationships(self, entities):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("neo4j unavailable")
+        if entities[0]["id"] in self.poison:
+            raise ValueError("invalid property value")
+        self.batches.append(list(entities))
+
+    def health_check(self) -> bool:
+        return self.healthy
+
+    def close(self) -> None:
+        pass
+
+
+def test_worker_drains_queue_in_batches(tmp_path):
+    clock = FakeClock()
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), clock=clock)
+    for index in range(3):
+        queue.enqueue([{"id": f"article::{index}", "label": "LegalArticle"}])
+    clock.now += 4.0
+    assert queue.stats() == {"depth": 3, "retrying": 0, "dead_letter": 0, "lag_seconds": 4.0}
+
+    graph = RecordingGraph()
+    worker = GraphWriteWorker(queue, lambda: graph, batch_size=2)
+
+    assert worker.drain_once() == 2
+    assert worker.drain_once() == 1
+    # Each entry is written in its own call.
+    assert [batch[0]["id"] for batch in graph.batches] == ["article::0", "article::1", "article::2"]
+    assert worker.stats()["batches"] == 2
+    assert queue.stats()["depth"] == 0
+
+
+def test_worker_backs_off_and_retries_failed_batches(tmp_path):
+    clock = FakeClock()
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), clock=clock)
+    queue.enqueue([{"id": "article::1", "label": "LegalArticle"}])
+    graph = RecordingGraph(failures=1)
+    worker = GraphWriteWorker(queue, lambda: graph, base_backoff_seconds=2.0)
+
+    assert worker.drain_once() == 0
+    assert queue.stats()["retrying"] == 1
+    assert worker.drain_once() == 0  # still backing off
+
+    clock.now += 2.0
+    assert worker.drain_once() == 1
+    assert graph.batches == [[{"id": "article::1", "label": "LegalArticle"}]]
+    assert worker.stats()["failures"] == 1
+
+
+def test_claimed_entries_are_not_leased_twice(tmp_path):
+    clock = FakeClock()
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), lease_seconds=30, clock=clock)
+    queue.enqueue([{"id": "article::1"}])
+
+    assert len(queue.claim(10)) == 1
+    assert queue.claim(10) == []
+    clock.now += 30.0
+    assert len(queue.claim(10)) == 1
+
+
+def test_newer_entry_for_an_article_supersedes_older_ones(tmp_path):
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), clock=FakeClock())
+    queue.enqueue([{"id": "article::1", "label": "LegalArticle", "summary": "old"}])
+    queue.enqueue([{"id": "article::2", "label": "LegalArticle"}])
+    queue.enqueue([{"id": "article::1", "label": "LegalArticle", "summary": "new"}])
+    graph = RecordingGraph()
+    worker = GraphWriteWorker(queue, lambda: graph)
+
+    assert worker.drain_once() == 3
+
+    assert [(batch[0]["id"], batch[0].get("summary")) for batch in graph.batches] == [
+        ("article::2", None),
+        ("article::1", "new"),
+    ]
+    assert worker.stats()["superseded"] == 1
+
+
+def test_poison_entry_is_isolated_and_dead_lettered(tmp_path):
+    clock = FakeClock()
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), clock=clock)
+    for index in range(3):
+        queue.enqueue([{"id": f"article::{index}", "label": "LegalArticle"}])
+    graph = RecordingGraph(poison={"article::1"})
+    worker = GraphWriteWorker(queue, lambda: graph, base_backoff_seconds=1.0, max_attempts=3)
+
+    assert worker.drain_once() == 2
+    assert [batch[0]["id"] for batch in graph.batches] == ["article::0", "article::2"]
+    for _ in range(2):
+        clock.now += 10.0
+        worker.drain_once()
+
+    stats = worker.stats()
+    assert (stats["depth"], stats["dead_letter"], stats["dead_lettered"]) == (0, 1, 1)
+
+
+def test_unreachable_graph_defers_entries_without_charging_attempts(tmp_path):
+    clock = FakeClock()
+    queue = GraphWriteQueue(str(tmp_path / "queue.sqlite3"), clock=clock)
+    for index in range(2):
+        queue.enqueue([{"id": f"article::{index}", "label": "LegalArticle"}])
+    graph = RecordingGraph(failures=10, healthy=False)
+    worker = GraphWriteWorker(queue, lambda: graph, max_attempts=1)
+
+    for _ in range(5):
+        worker.drain_once()
+        clock.now += 60.0
+
+    assert queue.stats()["dead_letter"] == 0
+    assert queue.stats()["retrying"] == 0
+    graph.failures, graph.healthy = 0, True
+    clock.now += 300.0
+    assert worker.drain_once() == 2
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+from app.services.hybrid_search import (
+    HybridSearchService,
+    article_key,
+    bm25_retriever,
+    parse_weights,
+)
+from app.services.inference_executor import InferenceExecutor
+
+
+def _static(hits):
+    async def retrieve(query, k):
+        return hits[:k]
+
+    return retrieve
+
+
+def _failing(query, k):
+    async def fail():
+        raise RuntimeError("vector store offline")
+
+    return fail()
+
+
+def test_article_key_unifies_graph_vector_and_dataset_ids():
+    assert article_key({"id": "article::43_1_th"}) == "43/1"
+    assert article_key({"id": "43_1_th::obligation::2"}) == "43/1"
+    assert article_key({"id": "มาตรา ๔๓/๑"}) == "43/1"
+    assert article_key({"id": "chunk-7", "metadata": {"article_number": "๑๐"}}) == "10"
+    assert article_key({"id": "chunk-7"}) == "chunk-7"
+
+
+def test_rrf_fuses_sources_dedupes_articles_and_paginates():
+    service = HybridSearchService(
+        {
+            "graph": _static(
+                [
+                    {"id": "article::10_th", "score": 3.0, "properties": {"summary": "หลักประกัน"}},
+                    {"id": "10_th::obligation::1", "score": 2.5},
+                    {"id": "article::44_th", "score": 1.0},
+                ]
+            ),
+            "vector": _static(
+                [
+                    {"id": "v-44", "score": 0.9, "metadata": {"article_number": "44"}},
+                    {"id": "v-10", "score": 0.8, "metadata": {"article_number": "10"}},
+                    {"id": "v-12", "score": 0.7, "metadata": {"article_number": "12"}},
+                ]
+            ),
+        },
+        rrf_k=60,
+    )
+
+    first = asyncio.run(service.search("หลักประกัน", page=1, page_size=2))
+    second = asyncio.run(service.search("หลักประกัน", page=2, page_size=2))
+
+    assert first["total"] == 3
+    assert [result["article"] for result in first["results"]] == ["10", "44"]
+    assert [result["article"] for result in second["results"]] == ["12"]
+    top = first["results"][0]
+    assert top["sources"]["graph"] == {"id": "article::10_th", "rank": 1, "score": 3.0}
+    assert top["sources"]["vector"]["rank"] == 2
+    assert abs(top["score"] - (1 / 61 + 1 / 62)) < 1e-12
+    assert top["metadata"]["summary"] == "หลักประกัน"
+    assert set(first["timings"]["stages"]) == {"graph", "vector"}
+
+
+def test_weighted_fusion_and_failed_retriever_is_reported():
+    service = HybridSearchService(
+        {
+            "graph": _static([{"id": "article::1_th", "score": 5.0}, {"id": "article::2_th", "score": 1.0}]),
+            "vector": _failing,
+        },
+        fusion="weighted",
+        weights=parse_weights("graph=2.0, vector=1"),
+    )
+
+    response = asyncio.run(service.search("q"))
+
+    assert [(r["article"], r["score"]) for r in response["results"]] == [("1", 2.0), ("2", 0.0)]
+    assert response["timings"]["stages"]["vector"]["error"] == "vector store offline"
+    assert response["timings"]["stages"]["graph"]["hits"] == 2
+
+
+def test_bm25_retriever_searches_off_the_event_loop():
+    class ThreadRecordingIndex:
+        def search(self, query, k=10):
+            self.thread = threading.current_thread()
+            return [{"id": "มาตรา 10", "score": 1.0}][:k]
+
+    index = ThreadRecordingIndex()
+    executor = InferenceExecutor(max_workers=1)
+    try:
+        hits = asyncio.run(bm25_retriever(index, executor)("หลักประกัน", 5))
+    finally:
+        executor.shutdown()
+
+    assert hits == [{"id": "มาตรา 10", "score": 1.0}]
+    assert index.thread is not threading.main_thread()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.inference_executor import InferenceExecutor, InferenceOverloadedError
+
+
+def test_executor_runs_calls_and_records_timings():
+    executor = InferenceExecutor(max_workers=1, max_queue_depth=4)
+
+    async def scenario():
+        return await asyncio.gather(*(executor.run(pow, base, 2) for base in range(3)))
+
+    try:
+        assert asyncio.run(scenario()) == [0, 1, 4]
+        stats = executor.stats()
+    finally:
+        executor.shutdown()
+
+    assert stats["completed"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["mean_compute_ms"] >= 0
+
+
+def test_executor_rejects_when_queue_is_full():
+    executor = InferenceExecutor(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [
+            asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenceOverloadedError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert stats["rejected"] == 1
+    assert stats["peak_in_flight"] == 2
+
+
+def test_cancelled_call_keeps_its_slot_until_the_thread_finishes():
+    executor = InferenceExecutor(max_workers=1, max_queue_depth=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0.05)
+        # The thread is still computing, so the executor is still full.
+        with pytest.raises(InferenceOverloadedError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.sleep(0.05)
+        return await executor.run(pow, 2, 3)
+
+    try:
+        assert asyncio.run(scenario()) == 8
+        stats = executor.stats()
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert stats["in_flight"] == 0
@@ -1,7 +1,14 @@
 from typing import Any, Dict, List
 from unittest.mock import MagicMock
 
-from app.services.knowledge_graph import KnowledgeGraphService, Neo4jGraphStorage
+from app.services.graph_planning import FULLTEXT_INDEXED_LABELS, FULLTEXT_INDEXED_PROPERTIES
+from app.services.graph_query_profiler import GraphQueryProfiler
+from app.services.knowledge_graph import (
+    FulltextIndexState,
+    KnowledgeGraphService,
+    Neo4jDriverPool,
+    Neo4jGraphStorage,
+)
 
 
 class StubGraphStorage:
@@ -37,8 +44,12 @@ class StubGraphStorage:
             }
         )
 
-    def search(self, query: str, *, label: str | None = None, limit: int = 25):
-        self.search_calls.append({"query": query, "label": label, "limit": limit})
+    def search(
+        self, query: str, *, label: str | None = None, limit: int = 25, offset: int = 0
+    ):
+        self.search_calls.append(
+            {"query": query, "label": label, "limit": limit, "offset": offset}
+        )
         return []
 
     def health_check(self) -> bool:
@@ -96,7 +107,7 @@ def test_search_wraps_storage_results():
 
     response = service.search("Jane", limit=10)
 
-    storage.search.assert_called_once_with("Jane", label=None, limit=10)
+    storage.search.assert_called_once_with("Jane", label=None, limit=10, offset=0)
     assert response == {"count": 2, "results": [{"id": "entity-1"}, {"id": "entity-2"}]}
 
 
@@ -106,8 +117,13 @@ def _make_storage_with_mocks() -> Neo4jGraphStorage:
     storage._user = None
     storage._password = None
     storage._database = None
+    storage._write_chunk_size = 500
     storage._logger = MagicMock()
     storage._driver = MagicMock()
+    storage._pool = MagicMock()
+    storage._owns_pool = False
+    storage._fulltext_state = FulltextIndexState()
+    storage._profiler = GraphQueryProfiler()
     return storage
 
 
@@ -131,7 +147,7 @@ def test_neo4j_storage_search_formats_results():
             {
                 "id": "entity-1",
                 "labels": ["Entity"],
-                "props": {"id": "entity-1", "name": "Jane"},
+                "props": {"id": "entity-1", "name": "Jane", "fingerprint": "f", "child_ids": []},
             }
         ]
     )
@@ -147,3 +163,417 @@ def test_neo4j_storage_search_formats_results():
             "properties": {"id": "entity-1", "name": "Jane"},
         }
     ]
+
+
+def test_neo4j_storage_bulk_write_groups_rows_into_unwind_chunks():
+    storage = _make_storage_with_mocks()
+    storage._execute_write_batches = MagicMock()
+
+    nodes = [
+        {"id": f"obligation-{index}", "label": "LegalObligation", "properties": {}}
+        for index in range(5)
+    ] + [{"id": "article-1", "label": "LegalArticle", "properties": {"summary": "s"}}]
+    edges = [
+        {
+            "source_id": "article-1",
+            "target_id": f"obligation-{index}",
+            "relationship_type": "HAS_OBLIGATION",
+            "source_label": "LegalArticle",
+            "target_label": "LegalObligation",
+            "properties": {},
+        }
+        for index in range(5)
+    ]
+
+    stats = storage.bulk_write(nodes, edges, chunk_size=2)
+
+    statements = storage._execute_write_batches.call_args[0][0]
+    queries = [query for query, _ in statements]
+    assert all(query.startswith("UNWIND $rows AS row") for query in queries)
+    # 5 obligations in chunks of 2, 1 article, 5 edges in chunks of 2.
+    assert len(statements) == 3 + 1 + 3
+    assert sum("MERGE (n:LegalObligation" in query for query in queries) == 3
+    assert sum("MERGE (a)-[r:HAS_OBLIGATION]->(b)" in query for query in queries) == 3
+    assert statements[0][1]["rows"][0]["props"]["id"] == "obligation-0"
+    assert stats["transactions"] == 7
+    assert stats["nodes"] == 6 and stats["edges"] == 5
+
+
+def test_save_entities_uses_bulk_write_when_available():
+    storage = StubGraphStorage()
+    storage.bulk_write = MagicMock(return_value={"nodes": 2, "edges": 1})
+    service = KnowledgeGraphService(graph_storage=storage)
+
+    response = service.save_entities_and_relationships(
+        [
+            {
+                "id": "article-1",
+                "label": "LegalArticle",
+                "relationships": [
+                    {"target": "exception-1", "type": "HAS_EXCEPTION", "target_label": "LegalException"}
+                ],
+            },
+            {"id": "exception-1", "label": "LegalException", "description": "d"},
+        ]
+    )
+
+    nodes, edges = storage.bulk_write.call_args[0]
+    assert [node["id"] for node in nodes] == ["article-1", "exception-1"]
+    assert edges[0]["relationship_type"] == "HAS_EXCEPTION"
+    assert storage.nodes == [] and storage.edges == []
+    assert response["stats"] == {"nodes": 2, "edges": 1}
+
+
+def test_neo4j_storage_search_uses_fulltext_index_for_legal_labels():
+    storage = _make_storage_with_mocks()
+    storage._fulltext_analyzer = "thai"
+    storage._fulltext_state.record(True)
+    storage._execute_read = MagicMock(
+        return_value=[
+            {
+                "id": "article::10",
+                "labels": ["LegalArticle"],
+                "props": {"id": "article::10"},
+                "score": 2.5,
+            }
+        ]
+    )
+
+    results = storage.search("หลักประกัน (มาตรา 10)", label="LegalArticle", limit=5, offset=10)
+
+    query = storage._execute_read.call_args[0][0]
+    params = storage._execute_read.call_args.kwargs
+    assert "db.index.fulltext.queryNodes" in query
+    assert "WHERE node:LegalArticle" in query
+    assert params["query"] == "หลักประกัน \\(มาตรา 10\\)"
+    assert (params["offset"], params["limit"]) == (10, 5)
+    assert results[0]["score"] == 2.5
+
+
+def test_neo4j_storage_search_falls_back_to_scan_when_index_fails():
+    from neo4j.exceptions import ClientError
+
+    storage = _make_storage_with_mocks()
+    storage._fulltext_state.record(True)
+    storage._execute_read = MagicMock(
+        side_effect=[ClientError("no such index"), []]
+    )
+
+    assert storage.search("Jane") == []
+
+    fallback_query = storage._execute_read.call_args[0][0]
+    assert "CONTAINS toLower($query)" in fallback_query
+    assert not storage._fulltext_state.online
+
+
+def test_search_scans_while_index_populates_and_rechecks_after_backoff():
+    now = [0.0]
+    storage = _make_storage_with_mocks()
+    storage._fulltext_analyzer = "thai"
+    storage._fulltext_state = FulltextIndexState(retry_seconds=30.0, clock=lambda: now[0])
+    index = {
+        "labelsOrTypes": list(FULLTEXT_INDEXED_LABELS),
+        "properties": list(FULLTEXT_INDEXED_PROPERTIES),
+        "options": {"indexConfig": {"fulltext.analyzer": "thai"}},
+    }
+    lookups = []
+
+    def read(cypher, **params):
+        if cypher.startswith("SHOW FULLTEXT INDEXES"):
+            lookups.append(cypher)
+            return [{**index, "state": "POPULATING" if len(lookups) == 1 else "ONLINE"}]
+        return []
+
+    storage._execute_read = MagicMock(side_effect=read)
+    storage._execute_write = MagicMock()
+
+    storage.search("Jane")
+    storage.search("Jane")
+    assert len(lookups) == 1  # no recheck within the backoff interval
+    assert "CONTAINS toLower($query)" in storage._execute_read.call_args[0][0]
+
+    now[0] = 31.0
+    storage.search("Jane")
+
+    assert len(lookups) == 2
+    assert "db.index.fulltext.queryNodes" in storage._execute_read.call_args[0][0]
+    storage._execute_write.assert_not_called()
+
+
+def _make_pool_with_mock_driver() -> Neo4jDriverPool:
+    original = Neo4jDriverPool._create_driver
+    Neo4jDriverPool._create_driver = lambda self: MagicMock()
+    try:
+        return Neo4jDriverPool("bolt://example", max_connection_pool_size=8)
+    finally:
+        Neo4jDriverPool._create_driver = original
+
+
+def test_driver_pool_tracks_borrowed_sessions():
+    pool = _make_pool_with_mock_driver()
+
+    with pool.session():
+        with pool.session():
+            assert pool.stats()["sessions_in_use"] == 2
+    stats = pool.stats()
+
+    assert stats["sessions_in_use"] == 0
+    assert stats["peak_sessions_in_use"] == 2
+    assert stats["session_acquisitions"] == 2
+    assert stats["max_connection_pool_size"] == 8
+
+
+def test_storage_does_not_close_borrowed_driver_pool():
+    pool = _make_pool_with_mock_driver()
+    storage = Neo4jGraphStorage("bolt://example", driver_pool=pool)
+
+    storage.add_node("article::1", label="LegalArticle")
+    storage.close()
+
+    pool.driver.session.assert_called_once()
+    pool.driver.close.assert_not_called()
+
+
+def _article_entities(obligations: List[str]) -> List[Dict[str, Any]]:
+    article = {"id": "article::10_th", "label": "LegalArticle", "summary": "s", "relationships": []}
+    children = []
+    for index, action in enumerate(obligations, start=1):
+        child_id = f"10_th::obligation::{index}"
+        article["relationships"].append(
+            {"target": child_id, "type": "HAS_OBLIGATION", "target_label": "LegalObligation"}
+        )
+        children.append({"id": child_id, "label": "LegalObligation", "action": action})
+    return [article, *children]
+
+
+class StoredFingerprints:
+    """Fingerprints as Neo4j holds them, shared by every worker's storage."""
+
+    def __init__(self) -> None:
+        self.states: Dict[str, Any] = {}
+        self.reads = 0
+
+    def attach(self, storage: Neo4jGraphStorage) -> Neo4jGraphStorage:
+        storage._execute_write_batches = MagicMock(side_effect=self.write)
+        storage._execute_read = MagicMock(side_effect=self.read)
+        return storage
+
+    def write(self, statements) -> None:
+        for query, params in statements:
+            for row in params["rows"]:
+                if "MERGE (n:" in query and "fingerprint" in row["props"]:
+                    self.states[row["id"]] = row["props"]
+
+    def read(self, query, **params):
+        self.reads += 1
+        return [
+            {"id": node_id, **self.states[node_id]}
+            for node_id in params["ids"]
+            if node_id in self.states
+        ]
+
+
+def test_save_entities_skips_unchanged_entities_and_deletes_stale_children():
+    stored = StoredFingerprints()
+    storage = stored.attach(_make_storage_with_mocks())
+    service = KnowledgeGraphService(graph_storage=storage, change_detection=True)
+
+    first = service.save_entities_and_relationships(_article_entities(["a", "b", "c"]))
+    assert stored.reads == 2  # one lookup per label
+    again = service.save_entities_and_relationships(_article_entities(["a", "b", "c"]))
+    assert first["stats"]["nodes"] == 4
+    assert again["stats"]["nodes"] == 0 and again["stats"]["skipped"] == 4
+    # Every save diffs against the fingerprints stored in Neo4j.
+    assert stored.reads == 4
+
+    shrunk = service.save_entities_and_relationships(_article_entities(["a", "b"]))
+
+    statements = storage._execute_write_batches.call_args[0][0]
+    delete_rows = [params["rows"] for query, params in statements if "DELETE r" in query]
+    assert shrunk["stats"]["nodes"] == 1  # only the article's child list changed
+    assert delete_rows == [
+        [
+            {
+                "parent_id": "article::10_th",
+                "child_ids": ["10_th::obligation::3"],
+                "keep_ids": [],
+            }
+        ]
+    ]
+
+
+def test_save_entities_rewrites_nodes_another_worker_changed():
+    stored = StoredFingerprints()
+    this_worker = stored.attach(_make_storage_with_mocks())
+    other_worker = stored.attach(_make_storage_with_mocks())
+    service = KnowledgeGraphService(graph_storage=this_worker, change_detection=True)
+    other = KnowledgeGraphService(graph_storage=other_worker, change_detection=True)
+
+    service.save_entities_and_relationships(_article_entities(["a"]))
+    other.save_entities_and_relationships(_article_entities(["changed"]))
+    result = service.save_entities_and_relationships(_article_entities(["a"]))
+
+    # This worker last wrote the same payload, but Neo4j holds "changed".
+    assert result["stats"]["nodes"] == 1 and result["stats"]["skipped"] == 1
+    assert stored.states["10_th::obligation::1"]["action"] == "a"
+
+
+def test_stale_child_still_in_the_payload_loses_only_its_relationship():
+    stored = StoredFingerprints()
+    storage = stored.attach(_make_storage_with_mocks())
+    service = KnowledgeGraphService(graph_storage=storage, change_detection=True)
+    service.save_entities_and_relationships(_article_entities(["a", "b"]))
+
+    entities = _article_entities(["a", "b"])
+    entities[0]["relationships"].pop()
+    service.save_entities_and_relationships(entities)
+
+    statements = storage._execute_write_batches.call_args[0][0]
+    delete_rows = [params["rows"] for query, params in statements if "DELETE r" in query]
+    assert delete_rows == [
+        [
+            {
+                "parent_id": "article::10_th",
+                "child_ids": ["10_th::obligation::2"],
+                "keep_ids": ["10_th::obligation::2"],
+            }
+        ]
+    ]
+
+
+def test_fetch_fingerprints_reads_state_stored_on_nodes():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock(
+        return_value=[{"id": "article::1", "fingerprint": "abc", "child_ids": ["c1"]}]
+    )
+
+    states = storage.fetch_fingerprints([{"id": "article::1", "label": "LegalArticle"}])
+
+    assert states == {"article::1": ("abc", ["c1"])}
+    assert "MATCH (n:LegalArticle {id: node_id})" in storage._execute_read.call_args[0][0]
+
+
+def test_get_subgraph_issues_one_cached_query_and_decodes_columns():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock(
+        return_value=[
+            {
+                "node_ids": ["article::10", "10::obligation::1"],
+                "node_labels": [["LegalArticle"], ["LegalObligation"]],
+                "node_properties": [{"id": "article::10", "fingerprint": "f"}, {"actor": "นายจ้าง"}],
+                "edge_sources": ["article::10"],
+                "edge_targets": ["10::obligation::1"],
+                "edge_types": ["HAS_OBLIGATION"],
+                "edge_properties": [{}],
+            }
+        ]
+    )
+
+    subgraph = storage.get_subgraph(
+        ["article::10"], depth=9, rel_types=["HAS_OBLIGATION", "HAS_EXCEPTION"], root_label="LegalArticle"
+    )
+    storage.get_subgraph(
+        ["article::11"], depth=3, rel_types=["HAS_EXCEPTION", "HAS_OBLIGATION"], root_label="LegalArticle"
+    )
+
+    first_query, second_query = (call[0][0] for call in storage._execute_read.call_args_list)
+    assert first_query is second_query
+    assert "MATCH (root:LegalArticle {id: root_id})" in first_query
+    # Three unrolled hops, each bounded before the next one starts.
+    assert first_query.count("MATCH (n)-[:HAS_EXCEPTION|HAS_OBLIGATION]-(m)") == 3
+    assert first_query.count("WITH DISTINCT m LIMIT $limit") == 3
+    assert "*" not in first_query and "reduce(" not in first_query
+    assert subgraph["nodes"]["id"] == ["article::10", "10::obligation::1"]
+    assert subgraph["nodes"]["properties"][0] == {"id": "article::10"}
+    assert subgraph["edges"]["type"] == ["HAS_OBLIGATION"]
+
+
+def test_get_subgraph_without_root_label_looks_roots_up_per_schema_label():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock(return_value=[])
+
+    storage.get_subgraph(["article::10"], limit=0)
+
+    query, parameters = storage._execute_read.call_args[0][0], storage._execute_read.call_args[1]
+    assert "MATCH (root:LegalArticle {id: root_id})" in query
+    assert "MATCH (root:LegalObligation {id: root_id})" in query
+    assert "MATCH (root) " not in query
+    assert parameters["limit"] == 1
+
+
+def test_get_subgraph_without_ids_skips_the_query():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock()
+
+    subgraph = storage.get_subgraph([])
+
+    storage._execute_read.assert_not_called()
+    assert subgraph["nodes"]["id"] == [] and subgraph["edges"]["source"] == []
+
+
+def test_ensure_schema_creates_only_missing_id_constraints():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock(
+        return_value=[
+            {"type": "UNIQUENESS", "entityType": "NODE", "labelsOrTypes": ["LegalArticle"], "properties": ["id"]},
+            {"type": "UNIQUENESS", "entityType": "NODE", "labelsOrTypes": ["ACTOR"], "properties": ["name"]},
+        ]
+    )
+    storage._execute_write = MagicMock()
+
+    statuses = storage.ensure_schema(["LegalArticle", "ACTOR"])
+
+    assert statuses == {"LegalArticle": "exists", "ACTOR": "created"}
+    storage._execute_write.assert_called_once_with(
+        "CREATE CONSTRAINT actor_id_unique IF NOT EXISTS FOR (n:ACTOR) REQUIRE n.id IS UNIQUE"
+    )
+
+
+def test_verify_schema_reports_missing_labels():
+    storage = _make_storage_with_mocks()
+    storage._execute_read = MagicMock(
+        return_value=[
+            {"type": "NODE_PROPERTY_UNIQUENESS", "entityType": "NODE", "labelsOrTypes": ["LegalArticle"], "properties": ["id"]},
+        ]
+    )
+
+    assert storage.verify_schema(["LegalArticle", "LegalObligation"]) == {
+        "ok": False,
+        "missing": ["LegalObligation"],
+    }
+
+
+def test_execute_read_records_profiled_query_stats():
+    storage = _make_storage_with_mocks()
+    storage._profiler = GraphQueryProfiler(profile_sample_rate=1.0)
+    session = MagicMock()
+    session.execute_read.return_value = ([{"ok": 1}], 12)
+    storage._pool.session.return_value.__enter__.return_value = session
+
+    assert storage._execute_read("MATCH (n) RETURN n", limit=1) == [{"ok": 1}]
+
+    assert session.execute_read.call_args[0][1] == "PROFILE MATCH (n) RETURN n"
+    (stats,) = storage._profiler.stats()
+    assert (stats["query"], stats["mean_rows"], stats["mean_db_hits"]) == (
+        "MATCH (n) RETURN n",
+        1.0,
+        12.0,
+    )
+
+
+def test_shared_driver_pool_connects_outside_the_global_lock(monkeypatch):
+    from app.services import knowledge_graph
+
+    held = []
+    pool = MagicMock()
+
+    def create():
+        held.append(knowledge_graph._shared_pool_lock.locked())
+        return pool
+
+    monkeypatch.setattr(knowledge_graph, "create_driver_pool_from_settings", create)
+    monkeypatch.setattr(knowledge_graph, "_shared_pool", None)
+
+    assert knowledge_graph.get_shared_driver_pool() is pool
+    assert knowledge_graph.get_shared_driver_pool() is pool
+    assert held == [False]
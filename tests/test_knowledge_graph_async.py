@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.knowledge_graph import FulltextIndexState
+from app.services.knowledge_graph_async import (
+    AsyncKnowledgeGraphService,
+    AsyncNeo4jDriverPool,
+    AsyncNeo4jGraphStorage,
+)
+
+
+def _make_storage() -> AsyncNeo4jGraphStorage:
+    storage = AsyncNeo4jGraphStorage(
+        "bolt://example", driver_pool=AsyncNeo4jDriverPool("bolt://example", driver=MagicMock())
+    )
+    storage._logger = MagicMock()
+    return storage
+
+
+def test_async_service_bulk_writes_entities_with_shared_cypher():
+    storage = _make_storage()
+    storage._execute_write_batches = AsyncMock()
+    service = AsyncKnowledgeGraphService(graph_storage=storage, change_detection=False)
+
+    result = asyncio.run(
+        service.save_entities_and_relationships(
+            [
+                {
+                    "id": "article::10",
+                    "label": "LegalArticle",
+                    "relationships": [
+                        {
+                            "target": "article::10::obligation::1",
+                            "type": "HAS_OBLIGATION",
+                            "target_label": "LegalObligation",
+                        }
+                    ],
+                },
+                {"id": "article::10::obligation::1", "label": "LegalObligation"},
+            ]
+        )
+    )
+
+    statements = storage._execute_write_batches.call_args[0][0]
+    assert result["stats"]["transactions"] == len(statements) == 3
+    assert any("MERGE (a)-[r:HAS_OBLIGATION]->(b)" in query for query, _ in statements)
+
+
+def test_async_storage_search_falls_back_to_scan_when_index_fails():
+    from neo4j.exceptions import ClientError
+
+    storage = _make_storage()
+    storage._fulltext_state = FulltextIndexState()
+    storage._fulltext_state.record(True)
+    storage._execute_read = AsyncMock(
+        side_effect=[
+            ClientError("no such index"),
+            [{"id": "n1", "labels": ["Entity"], "props": {"id": "n1"}}],
+        ]
+    )
+
+    results = asyncio.run(storage.search("Jane"))
+
+    assert results == [{"id": "n1", "labels": ["Entity"], "properties": {"id": "n1"}}]
+    assert "CONTAINS toLower($query)" in storage._execute_read.call_args[0][0]
+
+
+def test_async_storage_does_not_close_borrowed_driver():
+    driver = MagicMock()
+    driver.close = AsyncMock()
+    pool = AsyncNeo4jDriverPool("bolt://example", driver=driver)
+    storage = AsyncNeo4jGraphStorage("bolt://example", driver_pool=pool)
+
+    asyncio.run(storage.close())
+
+    driver.close.assert_not_called()
+
+
+def test_async_driver_pool_tracks_borrowed_sessions():
+    driver = MagicMock()
+    driver.session.return_value.__aenter__ = AsyncMock()
+    driver.session.return_value.__aexit__ = AsyncMock(return_value=False)
+    pool = AsyncNeo4jDriverPool("bolt://example", max_connection_pool_size=4, driver=driver)
+
+    async def borrow():
+        async with pool.session():
+            async with pool.session():
+                assert pool.stats()["sessions_in_use"] == 2
+
+    asyncio.run(borrow())
+    stats = pool.stats()
+
+    assert stats["sessions_in_use"] == 0
+    assert stats["peak_sessions_in_use"] == 2
+    assert stats["session_acquisitions"] == 2
+    assert stats["max_connection_pool_size"] == 4
+
+
+def test_pool_budget_splits_max_pool_size_between_drivers(monkeypatch):
+    from app.services.knowledge_graph import pool_budget_from_settings, settings
+
+    monkeypatch.setattr(settings, "NEO4J_MAX_POOL_SIZE", 50)
+    monkeypatch.setattr(settings, "NEO4J_ASYNC_POOL_SHARE", 0.3)
+    assert pool_budget_from_settings() == (35, 15)
+
+    monkeypatch.setattr(settings, "NEO4J_ASYNC_POOL_SHARE", 1.0)
+    assert pool_budget_from_settings() == (1, 49)
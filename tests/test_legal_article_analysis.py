@@ -1,3 +1,7 @@
+import asyncio
+import threading
+
+from app.services.inference_executor import InferenceExecutor
 from app.services.legal_article.factory import build_legal_article_analysis_service
 
 
@@ -52,3 +56,32 @@ def test_analyze_article_persists_to_knowledge_graph():
     article_node = graph_stub.payloads[0][0]
     assert article_node["label"] == "LegalArticle"
     assert any(rel["type"] == "HAS_OBLIGATION" for rel in article_node["relationships"])
+
+
+def test_async_analysis_enqueues_graph_writes_off_the_event_loop():
+    class RecordingWriter:
+        def __init__(self) -> None:
+            self.threads = []
+
+        def enqueue(self, entities):
+            self.threads.append(threading.get_ident())
+            return 1
+
+    writer = RecordingWriter()
+    service = build_legal_article_analysis_service(graph_writer=writer)
+    executor = InferenceExecutor(max_workers=1)
+
+    async def analyze():
+        loop_thread = threading.get_ident()
+        await service.analyze_article_async(
+            article_number="มาตรา 10", language="th", executor=executor
+        )
+        return loop_thread
+
+    try:
+        loop_thread = asyncio.run(analyze())
+    finally:
+        executor.shutdown()
+
+    assert len(writer.threads) == 1
+    assert writer.threads[0] != loop_thread
@@ -0,0 +1,136 @@
+import pytest
+
+from app.core.config import settings
+from app.nlp import dataset
+from app.services.model_registry import (
+    ModelNotAvailableError,
+    ModelRegistry,
+    register_default_models,
+)
+
+
+class FakeModel:
+    def __init__(self) -> None:
+        self.warmed_up = False
+
+
+def test_registry_loads_each_model_once_and_warms_it_up():
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return FakeModel()
+
+    registry.register("qa", loader, warmup=lambda model: setattr(model, "warmed_up", True))
+    registry.load_all()
+
+    first = registry.get("qa")
+    second = registry.get("qa")
+
+    assert first is second
+    assert first.warmed_up is True
+    assert len(loads) == 1
+
+    stats = registry.stats()[0]
+    assert stats["name"] == "qa"
+    assert stats["loaded"] is True
+    assert stats["load_time_seconds"] >= 0
+    assert stats["warmup_time_seconds"] is not None
+
+
+def test_registry_lazy_models_load_on_first_get():
+    registry = ModelRegistry()
+    registry.register("classifier", FakeModel, eager=False)
+
+    registry.load_all()
+    assert registry.stats()[0]["loaded"] is False
+
+    assert isinstance(registry.get("classifier"), FakeModel)
+    assert registry.stats()[0]["loaded"] is True
+
+
+def test_registry_reports_failed_and_unknown_models():
+    registry = ModelRegistry()
+
+    def broken_loader():
+        raise OSError("weights missing")
+
+    registry.register("ner", broken_loader)
+    registry.load_all()
+
+    assert registry.stats()[0]["error"] == "weights missing"
+    with pytest.raises(ModelNotAvailableError):
+        registry.get("ner")
+    with pytest.raises(ModelNotAvailableError):
+        registry.get("unknown")
+
+
+def test_registry_backs_off_after_a_failed_load():
+    now = [0.0]
+    registry = ModelRegistry(retry_backoff_seconds=10.0, clock=lambda: now[0])
+    attempts = []
+
+    def flaky_loader():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError("weights missing")
+        return FakeModel()
+
+    registry.register("ner", flaky_loader)
+    for _ in range(3):
+        with pytest.raises(ModelNotAvailableError):
+            registry.get("ner")
+    assert len(attempts) == 1
+
+    now[0] = 11.0
+    with pytest.raises(ModelNotAvailableError):
+        registry.get("ner")
+    assert len(attempts) == 2
+    # The backoff doubles after each consecutive failure.
+    assert registry.stats()[0]["retry_after_seconds"] == 20.0
+
+    now[0] = 25.0
+    with pytest.raises(ModelNotAvailableError):
+        registry.get("ner")
+    assert len(attempts) == 2
+
+    now[0] = 32.0
+    assert isinstance(registry.get("ner"), FakeModel)
+    assert registry.stats()[0]["error"] is None
+
+
+def test_vector_storage_indexes_the_articles_into_an_empty_store(tmp_path, monkeypatch):
+    articles = {"มาตรา ๑๐": "ห้ามมิให้นายจ้างเรียกหลักประกัน", "มาตรา 43": "ห้ามเลิกจ้าง"}
+    monkeypatch.setattr(dataset, "load_legal_articles", lambda: articles)
+    config = settings.model_copy(
+        update={
+            "VECTOR_STORE_ENABLED": True,
+            "VECTOR_STORE_BACKEND": "memmap",
+            "VECTOR_STORE_PATH": str(tmp_path),
+            "CORPUS_QA_ENABLED": False,
+            "BM25_ENABLED": False,
+            "RERANKER_ENABLED": False,
+        }
+    )
+    encoded = []
+
+    class FakeEmbedder:
+        def encode(self, texts):
+            encoded.extend(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+
+    def load_storage():
+        registry = ModelRegistry()
+        registry.register("embedder", FakeEmbedder)
+        register_default_models(registry, config=config)
+        return registry.get("vector_storage")
+
+    storage = load_storage()
+    hits = storage.search([float(len(articles["มาตรา ๑๐"])), 1.0], k=2)
+
+    assert storage.count() == 2
+    assert {hit["metadata"]["article_number"] for hit in hits} == {"10", "43"}
+    # A store that already holds vectors is not re-embedded on the next start.
+    load_storage()
+    assert len(encoded) == 2
@@ -0,0 +1,21 @@
+from app.nlp.dataset import iter_article_sections
+
+
+def test_iter_article_sections_splits_on_line_leading_headings():
+    text = (
+        "หมวด 1 บททั่วไป\n"
+        "มาตรา 10 ภายใต้บังคับมาตรา 51 ห้ามมิให้นายจ้างเรียกหลักประกัน\n"
+        "มาตรา 11 นายจ้างต้องคืนหลักประกัน"
+    )
+
+    sections = [text[start:end] for start, end in iter_article_sections(text)]
+
+    assert sections[0] == "หมวด 1 บททั่วไป\n"
+    # Inline references such as "ภายใต้บังคับมาตรา 51" do not start a section.
+    assert sections[1].startswith("มาตรา 10") and "มาตรา 51" in sections[1]
+    assert sections[2] == "มาตรา 11 นายจ้างต้องคืนหลักประกัน"
+
+
+def test_iter_article_sections_returns_whole_text_without_headings():
+    assert list(iter_article_sections("ข้อความเดียว")) == [(0, 12)]
+    assert list(iter_article_sections("   ")) == []
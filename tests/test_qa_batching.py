@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.qa_batching import QABatchScheduler
+
+
+class RecordingAnswerer:
+    def __init__(self) -> None:
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [{"answer": question.upper(), "score": 1.0} for question, _ in items]
+
+
+def test_scheduler_groups_concurrent_questions_into_one_batch():
+    answerer = RecordingAnswerer()
+
+    async def scenario():
+        scheduler = QABatchScheduler(answerer, max_batch_size=8, max_latency_ms=50)
+        results = await asyncio.gather(
+            *(scheduler.submit(f"q{index}", "context") for index in range(5))
+        )
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+
+    assert [result["answer"] for result in results] == ["Q0", "Q1", "Q2", "Q3", "Q4"]
+    assert len(answerer.batches) == 1
+    assert stats["batches"] == 1
+    assert stats["mean_batch_size"] == 5
+    assert stats["batch_size_histogram"] == {5: 1}
+
+
+def test_scheduler_respects_max_batch_size():
+    answerer = RecordingAnswerer()
+
+    async def scenario():
+        scheduler = QABatchScheduler(answerer, max_batch_size=2, max_latency_ms=50)
+        await asyncio.gather(*(scheduler.submit(f"q{i}", "c") for i in range(5)))
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+    assert [len(batch) for batch in answerer.batches] == [2, 2, 1]
+
+
+def test_scheduler_propagates_batch_failures():
+    def failing(items):
+        raise RuntimeError("model crashed")
+
+    async def scenario():
+        scheduler = QABatchScheduler(failing, max_latency_ms=1)
+        try:
+            await scheduler.submit("q", "c")
+        finally:
+            await scheduler.stop()
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        asyncio.run(scenario())
+
+
+def test_stop_fails_questions_of_the_batch_being_computed():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(items):
+        started.set()
+        release.wait(5)
+        return [{"answer": "late"} for _ in items]
+
+    async def scenario():
+        scheduler = QABatchScheduler(slow, max_latency_ms=1)
+        task = asyncio.create_task(scheduler.submit("q", "c"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        await scheduler.stop()
+        try:
+            return await asyncio.wait_for(task, 1)
+        finally:
+            release.set()
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        asyncio.run(scenario())
@@ -0,0 +1,80 @@
+from app.services.qa_cache import (
+    QAAnswerCache,
+    SQLiteAnswerCacheTier,
+    answer_cache_key,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_key_normalizes_question_but_not_context():
+    key = answer_cache_key("  ห้ามนายจ้าง   เรียก ", "ctx", "model-a")
+
+    assert key == answer_cache_key("ห้ามนายจ้าง เรียก", "ctx", "model-a")
+    assert key != answer_cache_key("ห้ามนายจ้าง เรียก", "ctx ", "model-a")
+    assert key != answer_cache_key("ห้ามนายจ้าง เรียก", "ctx", "model-b")
+
+
+def test_cache_evicts_least_recently_used_and_counts_hits():
+    cache = QAAnswerCache(max_entries=2)
+    cache.set("a", {"answer": "A"})
+    cache.set("b", {"answer": "B"})
+    assert cache.get("a") == {"answer": "A"}
+
+    cache.set("c", {"answer": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"answer": "C"}
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_cache_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = QAAnswerCache(ttl_seconds=10, clock=clock)
+    cache.set("a", {"answer": "A"})
+
+    clock.now += 11
+
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_a_new_cache_instance(tmp_path):
+    path = str(tmp_path / "qa_cache.sqlite3")
+    QAAnswerCache(disk_tier=SQLiteAnswerCacheTier(path)).set(
+        "a", {"answer": "หลักประกัน", "score": 0.9}
+    )
+
+    restarted = QAAnswerCache(disk_tier=SQLiteAnswerCacheTier(path))
+
+    assert restarted.get("a") == {"answer": "หลักประกัน", "score": 0.9}
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_purges_expired_and_excess_rows_periodically(tmp_path):
+    clock = FakeClock()
+    tier = SQLiteAnswerCacheTier(str(tmp_path / "qa_cache.sqlite3"), max_rows=3, purge_every=4)
+    cache = QAAnswerCache(ttl_seconds=10, disk_tier=tier, clock=clock)
+    cache.set("old", {"answer": "expired"})
+    clock.now += 11
+    for key in ("a", "b", "c"):
+        cache.set(key, {"answer": key})
+        clock.now += 1
+
+    # The fourth write triggered the purge: only "old" had expired.
+    assert tier.count() == 3
+    for key in ("d", "e", "f", "g"):
+        cache.set(key, {"answer": key})
+        clock.now += 1
+
+    assert tier.count() == 3
+    cache.clear()
+    assert [cache.get(key) is not None for key in "abcdefg"] == [False] * 4 + [True] * 3
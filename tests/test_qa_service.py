@@ -0,0 +1,263 @@
+import os
+import re
+import sys
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from app.services import qa_service  # noqa: E402
+from app.services.qa_service import OnnxQABackend, QAService, compare_qa_backends  # noqa: E402
+
+CLS, SEP = 1, 2
+
+
+class WordTokenizer:
+    """Whitespace tokenizer with character offsets, recording what it was asked to encode."""
+
+    model_input_names = ["input_ids", "attention_mask"]
+    pad_token_id = 0
+    model_max_length = 16
+
+    def __init__(self) -> None:
+        self.vocab = {}
+        self.calls = []
+
+    def __call__(self, text, *, add_special_tokens=True, truncation=False, max_length=None,
+                 return_offsets_mapping=False, **_):
+        self.calls.append(text)
+        texts = text if isinstance(text, list) else [text]
+        ids, offsets = [], []
+        for item in texts:
+            matches = list(re.finditer(r"\S+", item))
+            if truncation and max_length:
+                matches = matches[:max_length]
+            ids.append([self.token_id(match.group()) for match in matches])
+            offsets.append([match.span() for match in matches])
+        encoding = {"input_ids": ids if isinstance(text, list) else ids[0]}
+        if return_offsets_mapping:
+            encoding["offset_mapping"] = offsets if isinstance(text, list) else offsets[0]
+        return encoding
+
+    def token_id(self, word):
+        return self.vocab.setdefault(word, len(self.vocab) + 3)
+
+    def build_inputs_with_special_tokens(self, first, second):
+        return [CLS, *first, SEP, *second, SEP]
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 3 if pair else 2
+
+    def context_calls(self):
+        return [call for call in self.calls if not isinstance(call, list)]
+
+
+class LastWordBackend:
+    """Points start and end at the context token equal to the question's last word."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.batch_sizes = []
+        self.widths = []
+
+    def run(self, inputs):
+        input_ids = inputs["input_ids"]
+        self.batch_sizes.append(len(input_ids))
+        self.widths.append(input_ids.shape[1])
+        logits = np.zeros(input_ids.shape, dtype=np.float32)
+        for row, ids in enumerate(input_ids):
+            question_end = list(ids).index(SEP)
+            target = ids[question_end - 1]
+            for position in range(question_end + 1, len(ids)):
+                if ids[position] == target:
+                    logits[row, position] = 10.0
+        return logits, logits.copy()
+
+
+def make_service(tokenizer=None, backend=None):
+    service = QAService.__new__(QAService)
+    service.model_name = "fake"
+    service.model_id = "fake|fake"
+    service.answer_cache = None
+    service.tokenizer = tokenizer or WordTokenizer()
+    service.model = None
+    service.qa_pipeline = None
+    service.backend = backend or LastWordBackend()
+    return service
+
+
+def test_answer_questions_tokenizes_the_context_once_and_keeps_question_order():
+    service = make_service()
+    context = "the lessee must pay rent monthly to a lessor in cash"
+    questions = ["who receives it lessor", "what is paid rent", "how often monthly"]
+
+    # 12 - 4 - 3 leaves 5 context tokens per window, so answers fall in different windows.
+    results = service.answer_questions(
+        questions, context, max_length=12, max_question_tokens=4, stride=2, batch_size=2
+    )
+
+    assert service.tokenizer.context_calls() == [context]
+    assert [result["question"] for result in results] == questions
+    assert [result["answer"] for result in results] == ["lessor", "rent", "monthly"]
+    for result in results:
+        assert context[result["start"] : result["end"]] == result["answer"]
+        assert result["start"] == context.index(result["answer"])
+    assert max(service.backend.batch_sizes) <= 2
+
+
+def test_answer_long_document_offsets_index_into_the_whole_document():
+    service = make_service()
+    document = (
+        "preamble words here\n"
+        "มาตรา 1 the employer keeps records\n"
+        "มาตรา 2 the employee receives wages weekly\n"
+    )
+
+    result = service.answer_long_document(
+        "when paid weekly", document, max_length=12, max_question_tokens=4, stride=2
+    )
+
+    assert result["answer"] == "weekly"
+    assert result["start"] == document.index("weekly")
+    assert document[result["start"] : result["end"]] == "weekly"
+
+
+def test_answer_long_document_splits_text_without_headings_by_length():
+    service = make_service()
+    words = [f"w{index:03d}" for index in range(400)]
+    document = " ".join(words)
+
+    result = service.answer_long_document(
+        "find w321", document, max_section_chars=200, section_overlap_chars=20
+    )
+
+    assert max(len(call) for call in service.tokenizer.context_calls()) <= 200
+    assert result["answer"] == "w321"
+    assert document[result["start"] : result["end"]] == "w321"
+
+
+class FakeSession:
+    def __init__(self, path, sess_options=None, providers=None):
+        self.path = path
+        self.options = sess_options
+        self.backend = LastWordBackend()
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name=name) for name in ("input_ids", "attention_mask")]
+
+    def run(self, output_names, feed):
+        assert output_names == ["start_logits", "end_logits"]
+        return self.backend.run(feed)
+
+
+@pytest.fixture
+def fake_onnxruntime(monkeypatch):
+    module = types.ModuleType("onnxruntime")
+    module.SessionOptions = types.SimpleNamespace
+    module.GraphOptimizationLevel = types.SimpleNamespace(ORT_ENABLE_ALL="all")
+    module.InferenceSession = FakeSession
+    monkeypatch.setitem(sys.modules, "onnxruntime", module)
+    return module
+
+
+@pytest.fixture
+def fake_exports(monkeypatch, fake_onnxruntime):
+    """Stands in for the Hugging Face loaders and the ONNX export, recording each export."""
+
+    exports = []
+
+    def export(model, tokenizer, output_dir, *, quantize=False):
+        os.makedirs(output_dir, exist_ok=True)
+        names = ["model.onnx", "model.int8.onnx"] if quantize else ["model.onnx"]
+        for name in names:
+            open(os.path.join(output_dir, name), "wb").close()
+        exports.append((output_dir, quantize))
+        return os.path.join(output_dir, names[-1])
+
+    monkeypatch.setattr(qa_service.AutoTokenizer, "from_pretrained", lambda name: WordTokenizer())
+    monkeypatch.setattr(
+        qa_service.AutoModelForQuestionAnswering, "from_pretrained", lambda name: object()
+    )
+    monkeypatch.setattr(qa_service, "export_qa_model_to_onnx", export)
+    return exports
+
+
+def test_onnx_backend_serves_the_quantized_export_and_reuses_it(tmp_path, fake_exports):
+    onnx_dir = str(tmp_path / "onnx")
+
+    service = QAService("org/qa-model", backend="onnx", onnx_dir=onnx_dir, onnx_quantize=True)
+
+    assert isinstance(service.backend, OnnxQABackend)
+    assert service.backend.model_path.endswith("model.int8.onnx")
+    assert service.backend.session.options.graph_optimization_level == "all"
+    assert service.model_id.endswith("|onnx|int8")
+    assert fake_exports == [(os.path.dirname(service.backend.model_path), True)]
+
+    fp32 = QAService("org/qa-model", backend="onnx", onnx_dir=onnx_dir)
+    assert fp32.backend.model_path == os.path.join(
+        os.path.dirname(service.backend.model_path), "model.onnx"
+    )
+    assert len(fake_exports) == 1
+
+
+def test_onnx_export_is_keyed_by_model_version(tmp_path, fake_exports):
+    onnx_dir = str(tmp_path / "onnx")
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.mkdir()
+    (checkpoint / "weights.bin").write_bytes(b"v1")
+
+    first = QAService(str(checkpoint), backend="onnx", onnx_dir=onnx_dir)
+    other = QAService("org/other-model", backend="onnx", onnx_dir=onnx_dir)
+    # Re-fine-tuning in place changes the checkpoint's modification time.
+    stat = os.stat(checkpoint / "weights.bin")
+    os.utime(checkpoint / "weights.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    retrained = QAService(str(checkpoint), backend="onnx", onnx_dir=onnx_dir)
+
+    paths = {first.backend.model_path, other.backend.model_path, retrained.backend.model_path}
+    assert len(paths) == 3
+    assert len(fake_exports) == 3
+    assert first.model_id != retrained.model_id
+
+
+def test_unknown_backend_is_rejected(fake_exports):
+    with pytest.raises(ValueError, match="Unknown QA backend"):
+        QAService("org/qa-model", backend="tensorrt")
+
+
+class PoisonedCache:
+    def get(self, key):
+        return {"answer": "stale", "score": 1.0, "start": 0, "end": 0}
+
+    def set(self, key, value):
+        raise AssertionError("the comparison must not write to the answer cache")
+
+
+def test_compare_qa_backends_reports_parity_against_the_served_pipeline(fake_onnxruntime):
+    reference = make_service()
+    pipeline_calls = []
+
+    def pipeline(question, context):
+        pipeline_calls.append(question)
+        answer = reference._answer_pairs([(question, context)])[0]
+        answer.pop("question")
+        return answer
+
+    reference.qa_pipeline = pipeline
+    reference.answer_cache = PoisonedCache()
+    candidate = make_service(tokenizer=reference.tokenizer, backend=OnnxQABackend("model.onnx"))
+    candidate.answer_cache = PoisonedCache()
+    context = " ".join(f"w{index:02d}" for index in range(30))
+    samples = [("find w07", context), ("find w25", context)]
+
+    report = compare_qa_backends(reference, candidate, samples, repeats=2)
+
+    assert report["max_abs_logit_diff"] == 0.0
+    assert report["answer_agreement"] == 1.0
+    assert len(pipeline_calls) == len(samples) * 3
+    # Parity windows are sized to the tokenizer's 16-token limit.
+    assert reference.backend.batch_sizes[0] > 1
+    assert reference.backend.widths[0] <= 16
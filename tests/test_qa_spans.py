@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+from app.nlp.qa_spans import best_spans, build_context_windows, split_long_span
+
+
+def test_build_context_windows_overlap_by_stride():
+    token_ids = list(range(10))
+    offsets = [(index * 2, index * 2 + 1) for index in range(10)]
+
+    windows = build_context_windows(token_ids, offsets, max_tokens=4, stride=1)
+
+    assert [window.token_ids for window in windows] == [
+        [0, 1, 2, 3],
+        [3, 4, 5, 6],
+        [6, 7, 8, 9],
+    ]
+    assert windows[1].offsets[0] == (6, 7)
+
+
+def test_build_context_windows_rejects_invalid_stride():
+    with pytest.raises(ValueError):
+        build_context_windows([1, 2], [(0, 1), (1, 2)], max_tokens=2, stride=2)
+
+
+def test_best_spans_only_considers_context_positions():
+    # Positions 0-2 hold [CLS] question [SEP]; the context starts at 3.
+    start_logits = [9.0, 9.0, 9.0, 0.0, 5.0, 0.0, 0.0]
+    end_logits = [9.0, 9.0, 9.0, 0.0, 0.0, 5.0, 0.0]
+    offsets = [(0, 4), (5, 9), (10, 14), (15, 19)]
+
+    spans = best_spans(
+        start_logits, end_logits, context_start=3, offsets=offsets, top_k=2
+    )
+
+    assert (spans[0].start, spans[0].end) == (5, 14)
+    assert spans[0].score > spans[1].score
+    assert 0.0 < spans[0].score <= 1.0
+
+
+def test_best_spans_respects_max_answer_tokens():
+    start_logits = [5.0, 0.0, 0.0, 0.0]
+    end_logits = [0.0, 0.0, 0.0, 5.0]
+    offsets = [(0, 1), (2, 3), (4, 5), (6, 7)]
+
+    spans = best_spans(
+        start_logits, end_logits, context_start=0, offsets=offsets, max_answer_tokens=2
+    )
+
+    assert all(span.end - span.start <= 3 for span in spans)
+
+
+def test_split_long_span_cuts_on_whitespace_with_overlap():
+    text = "prefix " + " ".join(f"w{index:02d}" for index in range(30))
+    start = len("prefix ")
+
+    pieces = list(split_long_span(text, start, len(text), max_chars=20, overlap=4))
+
+    assert pieces[0][0] == start and pieces[-1][1] == len(text)
+    for (_, previous_end), (next_start, _) in zip(pieces, pieces[1:]):
+        assert previous_end - next_start == 4
+    for piece_start, piece_end in pieces:
+        assert piece_end - piece_start <= 20
+    # Every word is whole in at least one piece.
+    for match in re.finditer(r"w\d\d", text):
+        assert any(s <= match.start() and match.end() <= e for s, e in pieces)
+
+
+def test_split_long_span_keeps_short_spans_whole():
+    assert list(split_long_span("short text", 0, 10, max_chars=20)) == [(0, 10)]
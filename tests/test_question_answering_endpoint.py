@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.v1.endpoints import question_answering  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.inference_executor import InferenceOverloadedError  # noqa: E402
+from app.services.model_registry import ModelNotAvailableError  # noqa: E402
+
+
+class FakeCorpusQA:
+    def __init__(self, *, fail_at):
+        self.fail_at = fail_at
+
+    async def stream_answers(self, question, *, top_n, batch_size):
+        if self.fail_at == 0:
+            raise ModelNotAvailableError("Model 'embedder' failed to load")
+        yield {"type": "answers", "batch": 1, "answers": [{"article": "มาตรา 10"}]}
+        raise InferenceOverloadedError("Inference queue is full, please retry shortly.")
+
+
+@pytest.fixture
+def client_for(monkeypatch):
+    def build(corpus_qa):
+        monkeypatch.setattr(settings, "CORPUS_QA_ENABLED", True)
+        monkeypatch.setattr(
+            question_answering, "get_corpus_qa_service", lambda qa_service, executor: corpus_qa
+        )
+        app = FastAPI()
+        app.include_router(question_answering.router, prefix="/api/v1/qa")
+        app.dependency_overrides[question_answering.get_qa_service] = lambda: object()
+        app.dependency_overrides[question_answering.get_inference_executor] = lambda: None
+        app.dependency_overrides[question_answering.get_qa_batch_scheduler] = lambda: None
+        return TestClient(app)
+
+    return build
+
+
+def test_corpus_stream_failure_before_first_event_is_a_503(client_for):
+    client = client_for(FakeCorpusQA(fail_at=0))
+
+    response = client.post("/api/v1/qa/ask", json={"question": "ห้ามนายจ้างเรียกหลักประกันจากใคร"})
+
+    assert response.status_code == 503
+    assert "embedder" in response.json()["detail"]
+
+
+def test_corpus_stream_failure_mid_stream_ends_with_an_error_event(client_for):
+    client = client_for(FakeCorpusQA(fail_at=1))
+
+    response = client.post("/api/v1/qa/ask", json={"question": "ห้ามนายจ้างเรียกหลักประกันจากใคร"})
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["answers", "error"]
+    assert events[-1]["status"] == 503
+
+
+def test_corpus_stream_error_event_over_sse(client_for):
+    client = client_for(FakeCorpusQA(fail_at=1))
+
+    response = client.post(
+        "/api/v1/qa/ask",
+        json={"question": "ห้ามนายจ้างเรียกหลักประกันจากใคร"},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block for block in response.text.split("\n\n") if block]
+    assert blocks[-1].startswith("event: error\ndata: ")
+    assert json.loads(blocks[-1].split("data: ", 1)[1])["status"] == 503
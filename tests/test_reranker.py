@@ -0,0 +1,99 @@
+import asyncio
+
+from app.services.hybrid_search import HybridSearchService, cross_encoder_stage
+from app.services.inference_executor import InferenceExecutor
+from app.services.reranker import CrossEncoderReranker, PairScoreCache, pair_score_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCrossEncoder:
+    """Scores a pair by passage length; every batch takes 30 ms on the fake clock."""
+
+    def __init__(self, clock=None):
+        self.clock = clock
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32):
+        self.batches.append(list(pairs))
+        if self.clock is not None:
+            self.clock.now += 0.030
+        return [float(len(text)) for _, text in pairs]
+
+
+def _candidates(count):
+    return [{"article": str(position)} for position in range(count)]
+
+
+def test_rerank_stops_at_budget_and_keeps_retrieval_order_for_the_tail():
+    clock = FakeClock()
+    model = FakeCrossEncoder(clock)
+    reranker = CrossEncoderReranker(model, batch_size=2, budget_ms=70.0, clock=clock)
+    texts = ["a", "aaa", "aa", "aaaa", "aaaaa", "a", "aaaaaa", "aa"]
+
+    reranked, stats = reranker.rerank("q", _candidates(8), texts)
+
+    # Two 30 ms batches fit; a third would end at 90 ms.
+    assert len(model.batches) == 2
+    assert [item["article"] for item in reranked] == ["3", "1", "2", "0", "4", "5", "6", "7"]
+    assert [item["rerank_score"] for item in reranked[4:]] == [None] * 4
+    assert stats["scored"] == 4 and stats["budget_exhausted"] is True
+
+
+def test_rerank_caches_pair_scores_and_skips_missing_text_and_overflow():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model, max_candidates=3, cache=PairScoreCache(max_entries=16))
+    texts = ["aa", None, "aaa", "aaaa"]
+
+    first, _ = reranker.rerank("ลูกจ้าง", _candidates(4), texts)
+    second, stats = reranker.rerank("ลูกจ้าง", _candidates(4), texts)
+
+    assert [item["article"] for item in first] == ["2", "0", "1", "3"]
+    assert second == first
+    assert len(model.batches) == 1 and stats["cached"] == 2 and stats["batches"] == 0
+
+
+def test_pair_score_cache_keys_on_the_exact_query_and_expires():
+    clock = FakeClock()
+    cache = PairScoreCache(max_entries=2, ttl_seconds=10.0, clock=clock)
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model, cache=cache)
+
+    reranker.rerank("ID card", _candidates(1), ["aa"])
+    _, stats = reranker.rerank("id card", _candidates(1), ["aa"])
+
+    assert pair_score_key("ID card", "aa", "m") != pair_score_key("id card", "aa", "m")
+    assert stats["cached"] == 0 and len(model.batches) == 2
+
+    clock.now = 11.0
+    _, stats = reranker.rerank("ID card", _candidates(1), ["aa"])
+    assert stats["cached"] == 0 and cache.stats()["entries"] == 2
+
+
+def test_hybrid_search_reranks_fused_results_before_paginating():
+    async def retriever(query, k):
+        return [{"id": "article::1_th"}, {"id": "article::2_th"}, {"id": "article::3_th"}]
+
+    executor = InferenceExecutor(max_workers=1)
+    service = HybridSearchService(
+        {"bm25": retriever},
+        reranker=cross_encoder_stage(
+            CrossEncoderReranker(FakeCrossEncoder()),
+            executor,
+            {"1": "a", "2": "aaa", "3": "aa"},
+        ),
+    )
+    try:
+        response = asyncio.run(service.search("q", page_size=2))
+    finally:
+        executor.shutdown()
+
+    assert [result["article"] for result in response["results"]] == ["2", "3"]
+    assert response["results"][0]["rerank_score"] == 3.0
+    assert response["timings"]["rerank"]["scored"] == 3
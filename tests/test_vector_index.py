@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+
+from app.services.vector_index import IVFVectorStorage, metadata_matches, recall_at_k
+from app.services.vector_store import MemmapVectorStorage
+
+
+def _clustered_vectors(count=600, dimension=16, seed=3):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(12, dimension))
+    labels = rng.integers(0, len(centers), size=count)
+    return centers[labels] + 0.3 * rng.normal(size=(count, dimension))
+
+
+def _records(vectors):
+    return [
+        {"id": f"v{i}", "vector": vector.tolist(), "metadata": {"parity": i % 2}}
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def test_ivf_trains_after_threshold_and_inserts_incrementally(tmp_path):
+    vectors = _clustered_vectors()
+    index = IVFVectorStorage(min_train_size=200, nlist=16, nprobe=4)
+
+    index.add_vectors(_records(vectors[:150]))
+    assert not index.is_trained
+    index.add_vectors(_records(vectors[:300]))
+    assert index.is_trained and index.count() == 300
+
+    index.add_vectors(_records(vectors)[300:])
+    stats = index.stats()
+    assert stats["vectors"] == 600 and stats["nlist"] == 16
+
+    hits = index.search(vectors[42], k=3, nprobe=16)
+    assert hits[0]["id"] == "v42" and abs(hits[0]["score"] - 1.0) < 1e-5
+    assert all(hit["metadata"]["parity"] == 1 for hit in index.search(vectors[42], k=5, filter={"parity": 1}))
+
+    index.delete(["v42"])
+    assert "v42" not in {hit["id"] for hit in index.search(vectors[42], k=5, nprobe=16)}
+
+
+def test_ivf_save_load_round_trip(tmp_path):
+    vectors = _clustered_vectors(count=300)
+    path = str(tmp_path / "ivf.npz")
+    index = IVFVectorStorage(path, min_train_size=100, nlist=8)
+    index.add_vectors(_records(vectors))
+    index.add_vector("v0", vectors[1].tolist(), {"replaced": True})
+    assert not os.path.exists(path)  # inserts are buffered until flush()
+    index.flush()
+
+    reopened = IVFVectorStorage(path, nlist=8)
+    assert reopened.is_trained and reopened.count() == 300
+    assert reopened.search(vectors[5], k=1, nprobe=8)[0]["id"] == "v5"
+    assert reopened.search(vectors[1], k=2, nprobe=8, filter={"replaced": True})[0]["id"] == "v0"
+
+
+def test_recall_at_k_against_exact_search(tmp_path):
+    vectors = _clustered_vectors()
+    exact = MemmapVectorStorage(str(tmp_path / "exact"))
+    exact.add_vectors(_records(vectors))
+    index = IVFVectorStorage(min_train_size=100, nlist=16)
+    index.add_vectors(_records(vectors))
+
+    queries = (vectors[:40] + 0.05).tolist()
+    full = recall_at_k(index, exact, queries, k=10, nprobe=16)
+    narrow = recall_at_k(index, exact, queries, k=10, nprobe=1)
+
+    # Probing every list is exhaustive; only float16 rounding in the exact store differs.
+    assert full["recall"] >= 0.99 and full["queries"] == 40
+    assert narrow["recall"] <= full["recall"]
+    assert narrow["search_options"] == {"nprobe": 1}
+
+
+def test_metadata_matches_lists_as_any_of():
+    assert metadata_matches({"language": "th"}, {"language": ["th", "en"]})
+    assert not metadata_matches({"language": "fr"}, {"language": "th"})
+
+
+def test_service_saves_flush_buffered_index_writes(tmp_path):
+    from app.services.vector_store import VectorStoreService
+
+    path = str(tmp_path / "ivf.npz")
+    index = IVFVectorStorage(path, min_train_size=100)
+
+    VectorStoreService(index).save_vectors(_records(_clustered_vectors(count=20)))
+
+    assert IVFVectorStorage(path).count() == 20
@@ -0,0 +1,138 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService, SQLiteEmbeddingCache
+from app.services.vector_store import MemmapVectorStorage, VectorStoreService, chroma_where
+
+
+class RecordingStorage:
+    def __init__(self) -> None:
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.searches: List[Dict[str, Any]] = []
+
+    def add_vectors(self, records):
+        self.batches.append(list(records))
+        return len(records)
+
+    def search(self, query_vector, k=10, filter: Optional[Dict[str, Any]] = None):
+        self.searches.append({"vector": list(query_vector), "k": k, "filter": filter})
+        return [{"id": "article::10", "score": 0.9, "metadata": {"language": "th"}}]
+
+    def delete(self, ids):
+        pass
+
+
+class FakeEmbedder:
+    def encode(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeModel:
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.asarray([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_chroma_where_translates_metadata_filters():
+    assert chroma_where(None) is None
+    assert chroma_where({"language": "th"}) == {"language": "th"}
+    assert chroma_where({"article_number": "10", "language": ["th", "en"]}) == {
+        "$and": [{"article_number": "10"}, {"language": {"$in": ["th", "en"]}}]
+    }
+
+
+def test_service_embeds_text_queries_and_batches_saves():
+    storage = RecordingStorage()
+    service = VectorStoreService(storage, embedder=FakeEmbedder())
+
+    service.save_vectors([{"id": "a", "vector": [0.1, 0.2]}, {"id": "b", "vector": [0.3, 0.4]}])
+    hits = service.search("ลูกจ้าง", k=3, filter={"language": "th"})
+
+    assert len(storage.batches) == 1 and len(storage.batches[0]) == 2
+    assert storage.searches == [{"vector": [7.0, 1.0], "k": 3, "filter": {"language": "th"}}]
+    assert hits[0]["id"] == "article::10"
+
+
+def test_service_embeds_text_queries_without_the_persistent_cache(tmp_path):
+    cache = SQLiteEmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    storage = RecordingStorage()
+    embedder = EmbeddingService(FakeModel(), model_id="m1", cache=cache)
+
+    VectorStoreService(storage, embedder=embedder).search("ลูกจ้าง", k=1)
+
+    assert storage.searches[0]["vector"] == [7.0, 1.0]
+    assert cache.count() == 0
+
+
+def test_memmap_storage_ranks_filters_and_persists(tmp_path):
+    storage = MemmapVectorStorage(str(tmp_path))
+    storage.add_vectors(
+        [
+            {"id": "a", "vector": [1.0, 0.0], "metadata": {"language": "th"}},
+            {"id": "b", "vector": [0.0, 2.0], "metadata": {"language": "en"}},
+            {"id": "c", "vector": [3.0, 3.0], "metadata": {"language": "th"}},
+        ]
+    )
+    storage.flush()
+
+    hits = storage.search([1.0, 0.1], k=2)
+    assert [hit["id"] for hit in hits] == ["a", "c"]
+    assert abs(hits[0]["score"] - 0.995) < 1e-2
+
+    assert [hit["id"] for hit in storage.search([0.0, 1.0], k=5, filter={"language": "th"})] == [
+        "c",
+        "a",
+    ]
+    batch = storage.search_batch([[0.0, 1.0], [1.0, 0.0]], k=1)
+    assert [hits[0]["id"] for hits in batch] == ["b", "a"]
+
+    matrix = np.load(tmp_path / MemmapVectorStorage.MATRIX_FILE, mmap_mode="r")
+    assert matrix.dtype == np.float16
+    assert np.allclose(np.linalg.norm(matrix[:3].astype(np.float32), axis=1), 1.0, atol=1e-3)
+
+    reopened = MemmapVectorStorage(str(tmp_path))
+    assert reopened.count() == 3
+    assert reopened.search([0.0, 1.0], k=1)[0]["metadata"] == {"language": "en"}
+
+
+def test_memmap_storage_upserts_and_deletes_visible_to_other_readers(tmp_path):
+    writer = MemmapVectorStorage(str(tmp_path))
+    reader = MemmapVectorStorage(str(tmp_path))
+    writer.add_vectors([{"id": "a", "vector": [1.0, 0.0]}, {"id": "b", "vector": [0.0, 1.0]}])
+    assert writer.count() == 2 and reader.count() == 0  # published by flush()
+    writer.flush()
+    assert reader.count() == 2
+
+    writer.add_vector("a", [0.0, 1.0], {"version": 2})
+    writer.delete(["b"])
+
+    assert reader.count() == 1
+    hits = reader.search([0.0, 1.0], k=3)
+    assert hits == [{"id": "a", "score": hits[0]["score"], "metadata": {"version": 2}}]
+    assert hits[0]["score"] > 0.99
+
+
+def test_memmap_storage_fills_preallocated_rows_without_copying(tmp_path):
+    storage = MemmapVectorStorage(str(tmp_path))
+    storage.add_vectors([{"id": "v0", "vector": [1.0, 0.0]}])
+    storage.flush()
+    inode = os.stat(tmp_path / MemmapVectorStorage.MATRIX_FILE).st_ino
+
+    for index in range(1, 50):
+        storage.add_vector(f"v{index}", [1.0, float(index)])
+    storage.flush()
+
+    assert os.stat(tmp_path / MemmapVectorStorage.MATRIX_FILE).st_ino == inode
+    assert MemmapVectorStorage(str(tmp_path)).count() == 50
+
+    storage.add_vectors(
+        [{"id": f"w{index}", "vector": [0.0, 1.0]} for index in range(MemmapVectorStorage.MIN_CAPACITY)]
+    )
+    storage.flush()
+
+    matrix = np.load(tmp_path / MemmapVectorStorage.MATRIX_FILE, mmap_mode="r")
+    assert matrix.shape[0] >= 50 + MemmapVectorStorage.MIN_CAPACITY
+    reopened = MemmapVectorStorage(str(tmp_path))
+    assert reopened.count() == 50 + MemmapVectorStorage.MIN_CAPACITY
+    assert reopened.search([1.0, 0.0], k=1)[0]["id"] == "v0"